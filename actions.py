@@ -0,0 +1,275 @@
+import datetime
+import functools
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import webbrowser
+from pathlib import Path
+
+import config
+from command_executor import CommandResult, _new_process_group
+
+KNOWN_FOLDERS = {
+    'home': '~', 'downloads': '~/Downloads', 'documents': '~/Documents', 'desktop': '~/Desktop',
+    'pictures': '~/Pictures', 'music': '~/Music', 'videos': '~/Videos',
+}
+
+
+class ActionError(Exception):
+    """A handler could not do what was asked on this machine"""
+
+
+class Action:
+    def __init__(self, name, handler, params, description):
+        self.name = name
+        self.handler = handler
+        self.params = params
+        self.description = description
+
+    def signature(self):
+        return f"{self.name}({', '.join(self.params)})"
+
+
+class ActionRegistry:
+    """Named Python handlers the model can pick instead of writing a shell command.
+
+    A handler takes the reply's ``args`` as keyword arguments (all strings) and
+    returns a short message to show and speak, or None. It raises ActionError
+    when it can't do the job here.
+    """
+
+    def __init__(self):
+        self.actions = {}
+
+    def register(self, name, params=(), description=""):
+        def decorator(handler):
+            self.actions[name] = Action(name, handler, tuple(params), description)
+            return handler
+        return decorator
+
+    def get(self, name):
+        return self.actions.get(name)
+
+    def names(self):
+        return list(self.actions)
+
+    def params(self):
+        """Every argument any handler takes, for the response schema"""
+        return sorted({param for action in self.actions.values() for param in action.params})
+
+    def describe(self):
+        """One line per action for the system instruction"""
+        return "\n".join(f"- {action.signature()}: {action.description}" for action in self.actions.values())
+
+
+registry = ActionRegistry()
+_NO_ACTIONS = ActionRegistry()
+
+# Program lookups are remembered so repeat launches skip the PATH scan
+_which = functools.lru_cache(maxsize=128)(shutil.which)
+
+
+def _spawn(argv):
+    """Start a program directly (no shell) and don't wait for it"""
+    try:
+        subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         close_fds=True, **_new_process_group())
+    except OSError as e:
+        raise ActionError(f"could not start {argv[0]}: {e}") from e
+
+
+def _run(argv, timeout=5):
+    """Run a short helper program directly (no shell) and check that it worked"""
+    try:
+        completed = subprocess.run(argv, stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.SubprocessError) as e:
+        raise ActionError(f"{argv[0]} failed: {e}") from e
+    if completed.returncode != 0:
+        raise ActionError(f"{argv[0]} exited with {completed.returncode}: {completed.stderr.strip()[:200]}")
+
+
+def _open_with_system(target):
+    """Open a file, folder or URL with the desktop's default handler"""
+    if os.name == 'nt':
+        os.startfile(target)  # ShellExecute, in this process
+    elif sys.platform == 'darwin':
+        _spawn(['open', target])
+    else:
+        opener = _which('xdg-open')
+        if not opener:
+            raise ActionError("xdg-open is not installed")
+        _spawn([opener, target])
+
+
+@registry.register('open_url', ['url'], "open a website or a web search URL in the default browser")
+def open_url(url=""):
+    url = url.strip()
+    if not url:
+        raise ActionError("no URL given")
+    if "://" not in url:
+        url = "https://" + url
+    if not webbrowser.open(url):
+        raise ActionError(f"no browser could open {url}")
+
+
+@registry.register('open_folder', ['path'], "open a folder in the file manager; home, downloads, documents, "
+                                            "desktop, pictures, music and videos work as names")
+def open_folder(path="home"):
+    path = path.strip()
+    folder = Path(os.path.expanduser(KNOWN_FOLDERS.get(path.lower(), path or '~')))
+    if not folder.exists():
+        raise ActionError(f"{folder} does not exist")
+    _open_with_system(str(folder))
+
+
+@registry.register('launch_app', ['app'], "start an installed application by its program name, "
+                                          "e.g. notepad, calc, code, firefox, chrome")
+def launch_app(app=""):
+    app = app.strip()
+    if not app:
+        raise ActionError("no application given")
+    if sys.platform == 'darwin':
+        _spawn(['open', '-a', app])
+        return
+    path = _which(app)
+    if path:
+        _spawn([path])
+    elif os.name == 'nt':
+        # Apps registered under App Paths (chrome, winword) aren't on PATH
+        try:
+            os.startfile(app)
+        except OSError as e:
+            raise ActionError(f"could not start {app}: {e}") from e
+    else:
+        raise ActionError(f"{app} is not installed")
+
+
+@registry.register('current_time', [], "say the current time and date")
+def current_time():
+    now = datetime.datetime.now()
+    return f"It is {now.strftime('%I:%M %p').lstrip('0')} on {now.strftime('%A')}, {now.day} {now.strftime('%B')}"
+
+
+@registry.register('set_volume', ['level'], "set the speaker volume, level 0 to 100")
+def set_volume(level="50"):
+    try:
+        level = max(0, min(100, int(float(level))))
+    except (TypeError, ValueError):
+        raise ActionError(f"not a volume level: {level!r}")
+    if os.name == 'nt':
+        try:
+            from ctypes import POINTER, cast
+
+            import comtypes
+            from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+        except ImportError as e:
+            raise ActionError("pycaw is not installed") from e
+        comtypes.CoInitialize()  # handlers run on their own thread
+        try:
+            interface = AudioUtilities.GetSpeakers().Activate(IAudioEndpointVolume._iid_, comtypes.CLSCTX_ALL, None)
+            cast(interface, POINTER(IAudioEndpointVolume)).SetMasterVolumeLevelScalar(level / 100, None)
+        finally:
+            comtypes.CoUninitialize()
+    elif sys.platform == 'darwin':
+        _run(['osascript', '-e', f"set volume output volume {level}"])
+    elif _which('pactl'):
+        _run(['pactl', 'set-sink-volume', '@DEFAULT_SINK@', f"{level}%"])
+    elif _which('amixer'):
+        _run(['amixer', '-q', 'sset', 'Master', f"{level}%"])
+    else:
+        raise ActionError("no volume control found (pactl or amixer)")
+    return f"Volume set to {level} percent"
+
+
+def describe(reply):
+    """Short text for what a command or action reply will do"""
+    if reply.get('type') == 'action':
+        args = " ".join(str(value) for value in (reply.get('args') or {}).values() if value not in (None, ""))
+        return f"{reply['action']} {args}".strip()
+    return reply.get('command', '')
+
+
+class ActionRunner:
+    """Runs command and action replies: registered actions in-process, the rest through the shell.
+
+    ``run`` keeps the CommandExecutor contract: it returns at once, output lines
+    go to ``on_output`` and ``on_exit`` gets a CommandResult (with ``message``
+    set when an action has something to say). An action whose handler fails
+    falls back to the reply's shell ``command`` when the model gave one.
+    """
+
+    def __init__(self, executor, registry=registry):
+        self.executor = executor
+        self.registry = registry
+        self.lock = threading.Lock()
+        self.stats = {'handled': 0, 'shell': 0, 'fallbacks': 0, 'failed': 0}
+
+    def run(self, reply, on_output=None, on_exit=None):
+        action = self.registry.get(reply.get('action')) if reply.get('type') == 'action' else None
+        if action is None:
+            command = (reply.get('command') or '').strip()
+            if not command:
+                # Nothing to run; never report an empty shell command as a success
+                return self._fail(CommandResult(describe(reply)), ActionError("nothing to run"), on_exit)
+            self._count('shell')
+            return self.executor.run(command, on_output=on_output, on_exit=on_exit)
+        result = CommandResult(describe(reply))
+        threading.Thread(target=self._handle, args=(action, reply, result, on_output, on_exit),
+                         name=f"action-{action.name}", daemon=True).start()
+        return result
+
+    def _handle(self, action, reply, result, on_output, on_exit):
+        args = {name: str(value) for name, value in (reply.get('args') or {}).items()
+                if name in action.params and value not in (None, "")}
+        result.started = time.perf_counter()
+        try:
+            message = action.handler(**args)
+        except Exception as e:
+            command = (reply.get('command') or '').strip()
+            if not command:
+                self._fail(result, e, on_exit)
+                return
+            print(f"⚠️ {action.name} failed ({e}), running the shell command instead")
+            self._count('fallbacks')
+            self.executor.run(command, on_output=on_output, on_exit=on_exit)
+            return
+        result.returncode = 0
+        result.message = message
+        if message:
+            result.first_output = time.perf_counter()
+            result.output_tail.append(message)
+            if on_output:
+                on_output('stdout', message)
+        self._count('handled')
+        self._finish(result, on_exit)
+
+    def _fail(self, result, error, on_exit):
+        result.error = error
+        self._count('failed')
+        self._finish(result, on_exit)
+        return result
+
+    def _finish(self, result, on_exit):
+        result.finished = time.perf_counter()
+        if on_exit:
+            try:
+                on_exit(result)
+            except Exception as e:
+                print(f"Action exit handler error: {e}")
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+
+def enabled_registry():
+    """The actions in use: all of them, or none with MIA_ACTIONS off"""
+    return registry if config.ACTIONS else _NO_ACTIONS
+
+
+def from_config(executor):
+    """Runner for ``executor``; with MIA_ACTIONS off every reply goes to the shell"""
+    return ActionRunner(executor, enabled_registry())
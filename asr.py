@@ -0,0 +1,242 @@
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+
+import config
+
+SAMPLE_RATE = 16000
+
+
+class AsrError(Exception):
+    """The recognizer could not run at all (network down, service error)"""
+
+
+def _to_bytes(pcm):
+    """Copy PCM bytes or an int16 array (possibly a ring buffer view) into bytes"""
+    return pcm.tobytes() if isinstance(pcm, np.ndarray) else bytes(pcm)
+
+
+class AsrStream:
+    """One utterance fed to a backend frame by frame while it is being captured.
+
+    This default buffers the audio and recognizes it all in ``finish``;
+    streaming backends decode as frames arrive and report partial text.
+    """
+
+    def __init__(self, backend, sample_rate):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.chunks = []
+
+    def feed(self, pcm):
+        """Add audio; returns the partial transcript when it changed, else None"""
+        self.chunks.append(_to_bytes(pcm))
+        return None
+
+    def finish(self, on_partial=None):
+        """Final transcript, '' when nothing was understood"""
+        return self.backend.transcribe(b"".join(self.chunks), self.sample_rate, on_partial)
+
+
+class AsrBackend:
+    """Speech to text for one utterance of 16-bit mono PCM"""
+
+    name = 'base'
+    # Partial transcripts arrive while audio is still being fed
+    streams_partials = False
+
+    def transcribe(self, pcm, sample_rate, on_partial=None):
+        """Transcript of a whole utterance, '' when nothing was understood; raises AsrError"""
+        raise NotImplementedError
+
+    def start_stream(self, sample_rate):
+        return AsrStream(self, sample_rate)
+
+    def warm_up(self, sample_rate=SAMPLE_RATE):
+        """Run a short silent clip so the first real command doesn't pay for lazy setup"""
+        self.transcribe(np.zeros(sample_rate // 2, dtype=np.int16), sample_rate)
+
+    def close(self):
+        pass
+
+
+class GoogleAsr(AsrBackend):
+    """speech_recognition's Google Web Speech API; uploads every utterance"""
+
+    name = 'google'
+
+    def __init__(self, recognizer=None, language=None):
+        import speech_recognition as sr
+
+        self.sr = sr
+        self.recognizer = recognizer or sr.Recognizer()
+        self.language = language or config.ASR_LANGUAGE
+
+    def transcribe(self, pcm, sample_rate, on_partial=None):
+        audio = self.sr.AudioData(_to_bytes(pcm), sample_rate, 2)
+        try:
+            return self.recognizer.recognize_google(audio, language=self.language)
+        except self.sr.UnknownValueError:
+            return ""
+        except self.sr.RequestError as e:
+            raise AsrError(str(e)) from e
+
+    def warm_up(self, sample_rate=SAMPLE_RATE):
+        pass  # nothing local to warm, and it would cost a request
+
+
+class VoskStream(AsrStream):
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.segments = []
+        self.partial = ""
+
+    def feed(self, pcm):
+        if self.recognizer.AcceptWaveform(_to_bytes(pcm)):
+            # Vosk closed a segment at a pause
+            text = json.loads(self.recognizer.Result()).get('text', '')
+            if text:
+                self.segments.append(text)
+            current = ""
+        else:
+            current = json.loads(self.recognizer.PartialResult()).get('partial', '')
+        text = " ".join(self.segments + ([current] if current else []))
+        if text == self.partial:
+            return None
+        self.partial = text
+        return text
+
+    def finish(self, on_partial=None):
+        text = json.loads(self.recognizer.FinalResult()).get('text', '')
+        return " ".join(self.segments + ([text] if text else []))
+
+
+class VoskAsr(AsrBackend):
+    """Vosk (Kaldi) on the CPU; the model stays loaded and decodes while the command is spoken"""
+
+    name = 'vosk'
+    streams_partials = True
+
+    def __init__(self, model_path=None):
+        import vosk
+
+        model_path = Path(model_path or config.VOSK_MODEL_PATH)
+        if not model_path.exists():
+            raise FileNotFoundError(f"no Vosk model at {model_path}")
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        self.model = vosk.Model(str(model_path))
+
+    def start_stream(self, sample_rate):
+        return VoskStream(self.vosk.KaldiRecognizer(self.model, sample_rate))
+
+    def transcribe(self, pcm, sample_rate, on_partial=None):
+        stream = self.start_stream(sample_rate)
+        data = _to_bytes(pcm)
+        step = sample_rate // 2  # quarter-second chunks of 16-bit samples
+        for start in range(0, len(data), step):
+            partial = stream.feed(data[start:start + step])
+            if partial and on_partial:
+                on_partial(partial)
+        return stream.finish()
+
+
+class WhisperAsr(AsrBackend):
+    """faster-whisper (whisper.cpp-class CTranslate2 runtime) on the CPU with int8 weights.
+
+    Whisper needs the whole utterance, so partial text arrives per decoded
+    segment once capture has ended.
+    """
+
+    name = 'whisper'
+
+    def __init__(self, model=None, compute_type=None, language=None):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(model or config.WHISPER_MODEL, device='cpu',
+                                  compute_type=compute_type or config.WHISPER_COMPUTE_TYPE,
+                                  download_root=str(config.DATA_DIR / "whisper"))
+        self.language = (language or config.ASR_LANGUAGE).split('-')[0]
+
+    def transcribe(self, pcm, sample_rate, on_partial=None):
+        samples = np.frombuffer(_to_bytes(pcm), dtype=np.int16).astype(np.float32) / 32768.0
+        if sample_rate != SAMPLE_RATE and len(samples):
+            duration = len(samples) / sample_rate
+            target = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+            samples = np.interp(target, np.arange(len(samples)) / sample_rate, samples).astype(np.float32)
+        segments, _ = self.model.transcribe(samples, language=self.language, beam_size=1,
+                                            condition_on_previous_text=False)
+        parts = []
+        for segment in segments:
+            parts.append(segment.text.strip())
+            if on_partial:
+                on_partial(" ".join(parts))
+        return " ".join(parts)
+
+
+class DeferredBackend(AsrBackend):
+    """Builds a backend on a background thread so startup doesn't wait for model loading.
+
+    Anything that needs the backend before it is ready blocks until it is.
+    """
+
+    def __init__(self, factory):
+        self.backend = None
+        self.ready = threading.Event()
+        threading.Thread(target=self._load, args=(factory,), name="asr-load", daemon=True).start()
+
+    def _load(self, factory):
+        try:
+            self.backend = factory()
+        except Exception as e:
+            print(f"ASR setup failed: {e}")
+        finally:
+            self.ready.set()
+
+    def _get(self):
+        self.ready.wait()
+        if self.backend is None:
+            raise AsrError("no speech recognition engine available")
+        return self.backend
+
+    @property
+    def name(self):
+        return self.backend.name if self.backend else 'loading'
+
+    @property
+    def streams_partials(self):
+        self.ready.wait()
+        return bool(self.backend and self.backend.streams_partials)
+
+    def transcribe(self, pcm, sample_rate, on_partial=None):
+        return self._get().transcribe(pcm, sample_rate, on_partial)
+
+    def start_stream(self, sample_rate):
+        return self._get().start_stream(sample_rate)
+
+    def warm_up(self, sample_rate=SAMPLE_RATE):
+        pass  # the factory already warmed it
+
+    def close(self):
+        if self.ready.is_set() and self.backend:
+            self.backend.close()
+
+
+def create_backend(engine=None, recognizer=None):
+    """Build and warm the configured ASR backend, falling back to Google"""
+    engine = (engine or config.ASR_ENGINE).lower()
+    try:
+        if engine == 'vosk':
+            backend = VoskAsr()
+        elif engine == 'whisper':
+            backend = WhisperAsr()
+        else:
+            backend = None
+        if backend:
+            backend.warm_up()
+            return backend
+    except Exception as e:
+        print(f"⚠️ Local ASR engine '{engine}' unavailable ({e}), using Google recognition")
+    return GoogleAsr(recognizer)
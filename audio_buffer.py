@@ -0,0 +1,279 @@
+import threading
+import time
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Fixed-size, preallocated ring of 16-bit mono PCM shared by every audio consumer.
+
+    Each sample is written twice (at ``i`` and ``i + capacity``) so any window up
+    to ``capacity`` samples long is contiguous and can be handed out as a numpy
+    view without copying. Positions are absolute sample counts since start.
+    """
+
+    def __init__(self, sample_rate, frame_length, seconds=30):
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        frames = max(1, int(seconds * sample_rate / frame_length))
+        self.capacity = frames * frame_length
+        self.samples = np.zeros(2 * self.capacity, dtype=np.int16)
+        self.write_pos = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def write(self, pcm):
+        """Append raw PCM bytes (or an int16 array) from the capture thread"""
+        data = np.frombuffer(pcm, dtype=np.int16) if not isinstance(pcm, np.ndarray) else pcm
+        written = len(data)
+        # Only the newest ``capacity`` samples fit, but positions still count the whole chunk
+        if written > self.capacity:
+            data = data[-self.capacity:]
+        start = (self.write_pos + written - len(data)) % self.capacity
+        head = min(len(data), self.capacity - start)
+        self.samples[start:start + head] = data[:head]
+        self.samples[start + self.capacity:start + self.capacity + head] = data[:head]
+        # Whatever did not fit before the end wraps around to the front
+        tail = data[head:]
+        if len(tail):
+            self.samples[:len(tail)] = tail
+            self.samples[self.capacity:self.capacity + len(tail)] = tail
+        with self.condition:
+            self.write_pos += written
+            self.condition.notify_all()
+
+    def oldest(self):
+        """Oldest absolute position still held in the buffer"""
+        return max(0, self.write_pos - self.capacity)
+
+    def view(self, start, end):
+        """Zero-copy view of samples [start, end); must still be in the buffer"""
+        start = max(start, self.oldest())
+        offset = start % self.capacity
+        return self.samples[offset:offset + (end - start)]
+
+    def latest(self, count):
+        """View of the most recent ``count`` samples"""
+        end = self.write_pos
+        return self.view(max(0, end - count), end)
+
+    def wait_for(self, position, timeout=None):
+        """Block until ``position`` samples have been written; False on timeout or close"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.write_pos >= position or self.closed, timeout)
+            return self.write_pos >= position
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def reader(self, start=None):
+        """Cursor that walks the buffer frame by frame"""
+        return AudioReader(self, self.write_pos if start is None else start)
+
+
+class AudioReader:
+    """Independent read cursor over an AudioRingBuffer"""
+
+    def __init__(self, ring, position):
+        self.ring = ring
+        self.position = position
+
+    def read(self, timeout=None):
+        """Return the next frame as a view, or None if nothing arrived in time"""
+        ring = self.ring
+        if self.position < ring.oldest():
+            # Fell behind by more than the buffer length: skip to what is left
+            self.position = ring.oldest()
+        end = self.position + ring.frame_length
+        if not ring.wait_for(end, timeout):
+            return None
+        frame = ring.view(self.position, end)
+        self.position = end
+        return frame
+
+    def seconds_to_samples(self, seconds):
+        return int(seconds * self.ring.sample_rate)
+
+    def rewind(self, seconds):
+        """Move the cursor back, e.g. to include a pre-roll"""
+        self.position = max(self.ring.oldest(), self.position - self.seconds_to_samples(seconds))
+
+
+class AudioCapture:
+    """Long-lived capture thread that keeps one microphone stream open"""
+
+    def __init__(self, microphone, seconds=30):
+        self.microphone = microphone
+        self.seconds = seconds
+        self.ring = None
+        self.running = False
+        self.ready = threading.Event()
+        self.error = None
+        self.thread = None
+
+    def start(self, timeout=5):
+        """Open the stream on a background thread and wait until audio flows"""
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+        self.ready.wait(timeout)
+        if self.error:
+            raise self.error
+        return self.ring
+
+    def _capture_loop(self):
+        try:
+            with self.microphone as source:
+                self.ring = AudioRingBuffer(source.SAMPLE_RATE, source.CHUNK, self.seconds)
+                self.ready.set()
+                while self.running:
+                    self.ring.write(source.stream.read(source.CHUNK))
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+            print(f"Audio capture error: {e}")
+        finally:
+            self.running = False
+            if self.ring:
+                self.ring.close()
+
+    def stop(self):
+        self.running = False
+
+
+def frame_rms(frame):
+    """Root-mean-square energy of an int16 frame"""
+    if not len(frame):
+        return 0.0
+    return float(np.sqrt(np.mean(np.square(frame, dtype=np.float32))))
+
+
+class EchoGuard:
+    """Keeps the assistant's own speech from triggering the wake word.
+
+    ``playback_started()`` returns when the current playback began (monotonic)
+    or None when nothing is playing. During playback a detection only counts
+    if the wake segment is ``margin`` times louder than the playback level the
+    microphone picked up just before it, so the user can still talk over the
+    assistant but its echo can't.
+    """
+
+    def __init__(self, ring, playback_started, margin=2.0, min_reference=0.3, reference=2.0):
+        self.ring = ring
+        self.playback_started = playback_started
+        self.margin = margin
+        self.min_reference = min_reference
+        self.reference = reference
+        self.stats = {'checked': 0, 'dropped': 0}
+
+    def allows(self, end, seconds):
+        """Should a detection whose audio is the ``seconds`` before position ``end`` count?"""
+        started = self.playback_started()
+        if started is None:
+            return True
+        self.stats['checked'] += 1
+        ring = self.ring
+        rate = ring.sample_rate
+        segment_start = max(ring.oldest(), end - int(seconds * rate))
+        # Playback level: the audio between playback start and the wake segment
+        playback_start = ring.write_pos - int((time.monotonic() - started) * rate)
+        reference_start = max(ring.oldest(), playback_start, segment_start - int(self.reference * rate))
+        if segment_start - reference_start < self.min_reference * rate:
+            # Too little playback heard to compare against; don't risk the assistant waking itself
+            self.stats['dropped'] += 1
+            return False
+        level = frame_rms(ring.view(reference_start, segment_start))
+        if frame_rms(ring.view(segment_start, end)) > level * self.margin:
+            return True
+        self.stats['dropped'] += 1
+        return False
+
+
+def skip_quiet(reader, energy_threshold, lead_in=0.3):
+    """Move the reader past buffered frames quieter than the threshold, in one vectorized pass.
+
+    Returns True when a loud frame was found; the reader is then left ``lead_in``
+    seconds before it so the start of the phrase is captured.
+    """
+    ring = reader.ring
+    reader.position = max(reader.position, ring.oldest())
+    count = (ring.write_pos - reader.position) // ring.frame_length
+    if count <= 0:
+        return False
+    frames = ring.view(reader.position, reader.position + count * ring.frame_length).reshape(count, ring.frame_length)
+    energies = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    loud = np.flatnonzero(energies > energy_threshold)
+    if not len(loud):
+        reader.position += count * ring.frame_length
+        return False
+    keep = int(np.ceil(lead_in * ring.sample_rate / ring.frame_length))
+    reader.position += max(0, loud[0] - keep) * ring.frame_length
+    return True
+
+
+def calibrate_energy_threshold(reader, seconds=1.0, threshold=300, ratio=1.5, damping=0.15, on_frame=None):
+    """Energy threshold after ``seconds`` of background noise, as ``Recognizer.adjust_for_ambient_noise`` computes it
+
+    ``on_frame`` is handed each frame of background noise, e.g. to build a noise profile.
+    """
+    ring = reader.ring
+    seconds_per_frame = ring.frame_length / ring.sample_rate
+    decay = damping ** seconds_per_frame
+    for _ in range(int(np.ceil(seconds / seconds_per_frame))):
+        frame = reader.read(timeout=1.0)
+        if frame is None:
+            break
+        if on_frame:
+            on_frame(frame)
+        threshold = threshold * decay + frame_rms(frame) * ratio * (1 - decay)
+    return threshold
+
+
+def capture_utterance(reader, energy_threshold, timeout=None, phrase_time_limit=None,
+                      pause_threshold=0.8, non_speaking_duration=0.3, on_frame=None):
+    """Collect one phrase from the ring buffer, like ``Recognizer.listen`` without reopening the stream.
+
+    Returns the phrase as raw PCM bytes, or None if no speech started within ``timeout``.
+    ``on_frame`` is handed the phrase audio as it arrives (lead-in first), e.g. for streaming ASR.
+    """
+    ring = reader.ring
+    seconds_per_frame = ring.frame_length / ring.sample_rate
+    pause_frames = int(np.ceil(pause_threshold / seconds_per_frame))
+    keep_frames = int(np.ceil(non_speaking_duration / seconds_per_frame))
+    limit_frames = int(np.ceil(phrase_time_limit / seconds_per_frame)) if phrase_time_limit else None
+
+    # Wait for the first loud frame, keeping a little lead-in audio
+    # The lead-in never reaches back before where the caller started reading, e.g. into the wake word
+    begin = reader.position
+    waited = 0.0
+    while True:
+        frame = reader.read(timeout=1.0)
+        if frame is None:
+            if ring.closed:
+                return None
+            waited += 1.0
+        else:
+            waited += seconds_per_frame
+            if frame_rms(frame) > energy_threshold:
+                break
+        if timeout and waited > timeout:
+            return None
+
+    start = max(ring.oldest(), begin, reader.position - (keep_frames + 1) * ring.frame_length)
+    if on_frame:
+        on_frame(ring.view(start, reader.position))
+    frames, quiet = 1, 0
+    while quiet < pause_frames and (limit_frames is None or frames < limit_frames):
+        frame = reader.read(timeout=1.0)
+        if frame is None:
+            break
+        if on_frame:
+            on_frame(frame)
+        frames += 1
+        quiet = 0 if frame_rms(frame) > energy_threshold else quiet + 1
+
+    # Drop most of the trailing silence, as Recognizer.listen does
+    end = reader.position - max(0, quiet - keep_frames) * ring.frame_length
+    return ring.view(start, end).tobytes()
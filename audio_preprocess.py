@@ -0,0 +1,238 @@
+import threading
+import time
+
+import numpy as np
+
+import config
+
+TARGET_RATE = 16000
+N_FFT = 512
+HOP = N_FFT // 2
+# sqrt-Hann for analysis and synthesis: their product, a Hann window, sums to one at 50% overlap
+_WINDOW = np.sqrt(np.hanning(N_FFT + 1)[:-1]).astype(np.float32)
+_EPS = 1e-10
+
+
+def to_float(pcm):
+    """Mono float32 samples in [-1, 1] from PCM bytes or an int16 array (channels averaged)"""
+    samples = np.frombuffer(pcm, dtype=np.int16) if isinstance(pcm, (bytes, bytearray, memoryview)) else np.asarray(pcm)
+    if samples.ndim == 2:
+        samples = samples.mean(axis=1)
+    return samples.astype(np.float32) / 32768.0
+
+
+def to_int16(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def resample(samples, rate, target=TARGET_RATE):
+    """FFT resampling; dropping the bins above the new Nyquist frequency is the anti-alias filter"""
+    if rate == target or not len(samples):
+        return samples
+    length = int(round(len(samples) * target / rate))
+    spectrum = np.fft.rfft(samples)
+    bins = length // 2 + 1
+    if bins <= len(spectrum):
+        spectrum = spectrum[:bins]
+    else:
+        spectrum = np.pad(spectrum, (0, bins - len(spectrum)))
+    return (np.fft.irfft(spectrum, length) * (length / len(samples))).astype(np.float32)
+
+
+def frame_energies(samples, frame_length):
+    """RMS of consecutive frames (the last partial frame is dropped)"""
+    n = len(samples) // frame_length
+    if not n:
+        return np.zeros(0, dtype=np.float32)
+    return np.sqrt(np.mean(np.square(samples[:n * frame_length].reshape(n, frame_length)), axis=1))
+
+
+def trim_silence(samples, rate, threshold, pad=0.2, frame_seconds=0.02):
+    """Cut leading and trailing audio quieter than ``threshold`` (float RMS), keeping ``pad`` seconds"""
+    frame_length = int(rate * frame_seconds)
+    loud = np.flatnonzero(frame_energies(samples, frame_length) > threshold)
+    if not len(loud):
+        return samples  # nothing clearly above the noise; let the recognizer decide
+    keep = int(pad * rate)
+    start = max(0, loud[0] * frame_length - keep)
+    end = min(len(samples), (loud[-1] + 1) * frame_length + keep)
+    return samples[start:end]
+
+
+def _spectra(samples):
+    """Windowed STFT frames of float samples (length a multiple of HOP, at least N_FFT)"""
+    n_frames = (len(samples) - N_FFT) // HOP + 1
+    index = np.arange(N_FFT)[None, :] + HOP * np.arange(n_frames)[:, None]
+    return np.fft.rfft(samples[index] * _WINDOW)
+
+
+def _decibels(spectra):
+    return 20 * np.log10(np.abs(spectra) + _EPS)
+
+
+class NoiseProfile:
+    """Mean and spread of the background noise level per frequency bin, in dB"""
+
+    def __init__(self, mean, std):
+        self.mean = mean
+        self.std = std
+
+    @classmethod
+    def from_samples(cls, samples):
+        """Profile of float samples of background noise; None when there isn't enough audio"""
+        if len(samples) < N_FFT + 3 * HOP:
+            return None
+        db = _decibels(_spectra(samples))
+        return cls(db.mean(axis=0), db.std(axis=0))
+
+    @classmethod
+    def from_quietest(cls, samples, share=0.2, min_frames=4):
+        """Profile from the quietest frames of an utterance, when no ambient recording is known"""
+        if len(samples) < N_FFT + (min_frames - 1) * HOP:
+            return None
+        db = _decibels(_spectra(samples))
+        quiet = np.argsort(db.mean(axis=1))[:max(min_frames, int(len(db) * share))]
+        return cls(db[quiet].mean(axis=0), db[quiet].std(axis=0))
+
+
+class SpectralGate:
+    """Spectral-gate noise suppression that can run on a stream of frames.
+
+    Bins less than ``n_std`` deviations above the noise profile are turned down
+    by ``reduction``; the mask is smoothed across frequency to avoid musical
+    noise. Output lines up with the input sample for sample; ``feed`` just
+    holds back the last hop (16 ms) until more input or ``flush`` completes it.
+    Only the very first hop comes out faded in, which ``apply`` avoids.
+    """
+
+    def __init__(self, profile, n_std=1.5, reduction=0.9):
+        self.threshold = profile.mean + n_std * profile.std
+        self.floor = 1.0 - reduction
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.carry = np.zeros(HOP, dtype=np.float32)
+
+    def feed(self, samples):
+        """Gate float samples; returns the output that is complete so far"""
+        buffer = np.concatenate((self.pending, samples))
+        if len(buffer) < N_FFT:
+            self.pending = buffer
+            return np.zeros(0, dtype=np.float32)
+        spectra = _spectra(buffer)
+        n_frames = len(spectra)
+        mask = (_decibels(spectra) > self.threshold).astype(np.float32)
+        mask[:, 1:-1] = 0.25 * mask[:, :-2] + 0.5 * mask[:, 1:-1] + 0.25 * mask[:, 2:]
+        frames = np.fft.irfft(spectra * (self.floor + (1 - self.floor) * mask), N_FFT).astype(np.float32) * _WINDOW
+        # Overlap-add: each frame's second half lines up with the next frame's first half
+        blocks = np.zeros((n_frames + 1, HOP), dtype=np.float32)
+        blocks[:-1] += frames[:, :HOP]
+        blocks[1:] += frames[:, HOP:]
+        blocks[0] += self.carry
+        self.carry = blocks[-1]
+        self.pending = buffer[n_frames * HOP:]
+        return blocks[:-1].ravel()
+
+    def flush(self):
+        """The rest of the output, padding the input with silence"""
+        return self.feed(np.zeros(N_FFT, dtype=np.float32))
+
+    def apply(self, samples):
+        """Gate a whole clip; a hop of silence in front keeps its start from fading in"""
+        gated = np.concatenate((self.feed(np.concatenate((np.zeros(HOP, dtype=np.float32), samples))),
+                                self.flush()))
+        return gated[HOP:HOP + len(samples)]
+
+
+def normalize_gain(samples, target_dbfs=-20.0, max_gain_db=20.0, peak=0.9):
+    """Scale toward a target RMS level, never boosting more than ``max_gain_db`` or past ``peak``"""
+    rms = float(np.sqrt(np.mean(np.square(samples)))) if len(samples) else 0.0
+    if rms < _EPS:
+        return samples
+    gain = min(10 ** (target_dbfs / 20) / rms, 10 ** (max_gain_db / 20))
+    loudest = float(np.max(np.abs(samples)))
+    if loudest * gain > peak:
+        gain = peak / loudest
+    return samples * gain
+
+
+class Preprocessor:
+    """Trim, resample to 16 kHz mono, noise-gate and level each utterance before recognition.
+
+    The noise profile comes from ``set_noise`` (the calibration recording) or,
+    failing that, from the quietest part of each utterance. ``stats`` add up the
+    audio and bytes in and out and the CPU time spent.
+    """
+
+    def __init__(self, trim=True, gate=True, gain=True, target_dbfs=-20.0, noise_std=1.5, reduction=0.9):
+        self.trim = trim
+        self.gate = gate
+        self.gain = gain
+        self.target_dbfs = target_dbfs
+        self.noise_std = noise_std
+        self.reduction = reduction
+        self.noise = None
+        self.lock = threading.Lock()
+        self.stats = {'utterances': 0, 'seconds_in': 0.0, 'seconds_out': 0.0, 'bytes_in': 0, 'bytes_out': 0,
+                      'cpu_s': 0.0}
+
+    def set_noise(self, pcm, sample_rate):
+        """Use a recording of the room's background noise for gating"""
+        self.noise = NoiseProfile.from_samples(resample(to_float(pcm), sample_rate))
+
+    def process(self, pcm, sample_rate, energy_threshold=300):
+        """``(int16 samples at 16 kHz, 16000)`` ready for any ASR backend"""
+        start = time.process_time()
+        samples = to_float(pcm)
+        seconds_in, bytes_in = len(samples) / sample_rate, len(samples) * 2
+        if self.trim:
+            samples = trim_silence(samples, sample_rate, energy_threshold / 32768.0)
+        samples = resample(samples, sample_rate)
+        if self.gate:
+            profile = self.noise or NoiseProfile.from_quietest(samples)
+            if profile:
+                samples = SpectralGate(profile, self.noise_std, self.reduction).apply(samples)
+        if self.gain:
+            samples = normalize_gain(samples, self.target_dbfs)
+        output = to_int16(samples)
+        self._count(seconds_in, bytes_in, len(output) / TARGET_RATE, output.nbytes, time.process_time() - start)
+        return output, TARGET_RATE
+
+    def frame_gate(self, sample_rate):
+        """SpectralGate for a streaming recognizer's frames, or None without a noise profile.
+
+        Streaming audio is already endpointed by capture and can't be levelled
+        before it is heard, so only the gate applies.
+        """
+        if not self.gate or not self.noise or sample_rate != TARGET_RATE:
+            return None
+        return SpectralGate(self.noise, self.noise_std, self.reduction)
+
+    def _count(self, seconds_in, bytes_in, seconds_out, bytes_out, cpu):
+        with self.lock:
+            self.stats['utterances'] += 1
+            self.stats['seconds_in'] += seconds_in
+            self.stats['seconds_out'] += seconds_out
+            self.stats['bytes_in'] += bytes_in
+            self.stats['bytes_out'] += bytes_out
+            self.stats['cpu_s'] += cpu
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats['bytes_saved'] = stats['bytes_in'] - stats['bytes_out']
+        stats['saved_share'] = stats['bytes_saved'] / stats['bytes_in'] if stats['bytes_in'] else 0.0
+        stats['cpu_ms_per_audio_s'] = stats['cpu_s'] * 1000 / stats['seconds_in'] if stats['seconds_in'] else 0.0
+        return stats
+
+    def summary(self):
+        stats = self.snapshot()
+        return (f"🎚️ Preprocessing: {stats['utterances']} utterances, {stats['bytes_saved'] / 1024:.0f} KB "
+                f"({stats['saved_share']:.0%}) less audio sent to recognition, "
+                f"{stats['cpu_ms_per_audio_s']:.1f} ms CPU per second of audio")
+
+
+def from_config():
+    """Preprocessor set up from the environment, None when it is off"""
+    if not config.PREPROCESS:
+        return None
+    return Preprocessor(trim=True, gate=config.PREPROCESS_NOISE_GATE, gain=True,
+                        target_dbfs=config.PREPROCESS_TARGET_DBFS)
@@ -0,0 +1,88 @@
+"""In-process action handlers against the shell commands they replace.
+
+Usage (from the repo root):
+    python -m benchmarks.actions --runs 200
+
+Each case runs the same request both ways through the real execute path,
+actions.ActionRunner versus CommandExecutor (shell=True), and times run()
+until on_exit fires. Only cases with no visible side effect are run: telling
+the time, and launching a program that exits at once (as a stand-in for an
+app). CPU includes the spawned processes.
+"""
+import argparse
+import os
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+
+import actions
+import command_executor
+
+if os.name == 'nt':
+    CASES = [
+        ("time", {'type': 'action', 'action': 'current_time', 'args': {}}, "echo %TIME%"),
+        ("launch", {'type': 'action', 'action': 'launch_app', 'args': {'app': 'hostname'}}, "start \"\" hostname"),
+    ]
+else:
+    CASES = [
+        ("time", {'type': 'action', 'action': 'current_time', 'args': {}}, "date"),
+        ("launch", {'type': 'action', 'action': 'launch_app', 'args': {'app': 'true'}}, "true &"),
+    ]
+
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def measure(run, runs):
+    """(latencies, CPU seconds per run, failures) for ``runs`` calls of ``run(on_exit)``"""
+    latencies, failures = [], 0
+    cpu_start = cpu_seconds()
+    for _ in range(runs):
+        done = threading.Event()
+        outcome = {}
+
+        def on_exit(result):
+            outcome['ok'] = result.ok
+            done.set()
+
+        start = time.perf_counter()
+        run(on_exit)
+        done.wait(30)
+        latencies.append(time.perf_counter() - start)
+        failures += not outcome.get('ok')
+    return np.array(latencies), (cpu_seconds() - cpu_start) / runs, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Action handler vs shell benchmark")
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+
+    executor = command_executor.CommandExecutor(max_concurrent=1, timeout=10)
+    runner = actions.ActionRunner(executor)
+    print(f"{args.runs} runs per case")
+    print(f"{'case':<8} {'path':<7} {'p50 ms':>8} {'p95 ms':>8} {'cpu ms':>8} {'failed':>7}")
+    for name, reply, shell in CASES:
+        program = reply['args'].get('app')
+        if program and not shutil.which(program):
+            print(f"{name:<8} skipped, {program} not found")
+            continue
+        for path, run in (("action", lambda on_exit: runner.run(reply, on_exit=on_exit)),
+                          ("shell", lambda on_exit: executor.run(shell, on_exit=on_exit))):
+            run(lambda result: None)  # warm up imports and lookups
+            time.sleep(0.2)
+            latencies, cpu, failures = measure(run, args.runs)
+            p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+            print(f"{name:<8} {path:<7} {p50:>8.2f} {p95:>8.2f} {cpu * 1000:>8.2f} {failures:>7}")
+    print(f"runner: {runner.stats}")
+    if runner.stats['fallbacks']:
+        print("some actions fell back to the shell; their numbers include the shell spawn", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
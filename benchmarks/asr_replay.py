@@ -0,0 +1,131 @@
+"""Real-time factor and word error rate of each ASR backend on the same clips.
+
+Usage (from the repo root):
+    python -m benchmarks.asr_replay --fixtures clips/commands --engines google,vosk,whisper
+
+Every WAV needs its reference transcript in a .txt file next to it (else the
+file name is used). Clips are fed frame by frame, as the assistant does while
+capturing, so streaming engines are measured the way they run live:
+  RTF        processing time / audio time (wall and CPU); below 1 is faster than real time
+  WER        word edits needed to reach the reference / reference words
+  finish     time from the end of the audio to the final transcript, the delay the user feels
+  partial    how far into the clip the first partial transcript appeared
+
+With --preprocess every clip first goes through audio_preprocess, as the
+assistant does before recognition, so WER can be compared with and without it.
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+
+import asr
+import audio_preprocess
+import wake_word
+from benchmarks.e2e_replay import load_fixtures
+
+
+def words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """Levenshtein distance between two word lists"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+def replay(backend, samples, rate, frame_length=wake_word.FRAME_LENGTH):
+    """Feed one clip; returns (text, wall seconds, finish seconds, audio second of first partial)"""
+    first_partial = None
+    start = time.perf_counter()
+    stream = backend.start_stream(rate)
+    for offset in range(0, len(samples), frame_length):
+        if stream.feed(samples[offset:offset + frame_length]) and first_partial is None:
+            first_partial = min(offset + frame_length, len(samples)) / rate
+    finishing = time.perf_counter()
+    text = stream.finish()
+    done = time.perf_counter()
+    return text, done - start, done - finishing, first_partial
+
+
+def run(engine, fixtures, rate):
+    load_start = time.perf_counter()
+    backend = asr.create_backend(engine)
+    if backend.name != engine:
+        return None
+    backend.warm_up(rate)
+    load_seconds = time.perf_counter() - load_start
+
+    audio_seconds = wall = 0.0
+    edits = reference_words = failures = 0
+    finishes, partials = [], []
+    cpu_start = time.process_time()
+    for reference, samples in fixtures:
+        audio_seconds += len(samples) / rate
+        try:
+            text, seconds, finish, first_partial = replay(backend, samples, rate)
+        except asr.AsrError as e:
+            print(f"  {engine}: {e}")
+            failures += 1
+            continue
+        wall += seconds
+        finishes.append(finish)
+        if first_partial is not None:
+            partials.append(first_partial)
+        expected = words(reference)
+        edits += word_errors(expected, words(text))
+        reference_words += len(expected)
+    cpu = time.process_time() - cpu_start
+    backend.close()
+
+    return {
+        'load_s': load_seconds,
+        'rtf_wall': wall / audio_seconds if audio_seconds else 0.0,
+        'rtf_cpu': cpu / audio_seconds if audio_seconds else 0.0,
+        'wer': edits / reference_words if reference_words else 0.0,
+        'finish_p50_ms': float(np.percentile(finishes, 50)) * 1000 if finishes else 0.0,
+        'finish_p95_ms': float(np.percentile(finishes, 95)) * 1000 if finishes else 0.0,
+        'first_partial_s': float(np.mean(partials)) if partials else None,
+        'failures': failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ASR backend benchmark")
+    parser.add_argument('--fixtures', required=True, help="directory of WAVs with .txt reference transcripts")
+    parser.add_argument('--engines', default="google,vosk,whisper", help="comma separated engines to compare")
+    parser.add_argument('--preprocess', action='store_true', help="trim, denoise and level clips first")
+    args = parser.parse_args()
+
+    rate = asr.SAMPLE_RATE
+    fixtures = load_fixtures(args.fixtures, rate)
+    if not fixtures:
+        parser.error(f"no WAV files in {args.fixtures}")
+    if args.preprocess:
+        preprocessor = audio_preprocess.Preprocessor()
+        fixtures = [(reference, preprocessor.process(samples, rate)[0]) for reference, samples in fixtures]
+        print(preprocessor.summary())
+    total = sum(len(samples) for _, samples in fixtures) / rate
+    print(f"{len(fixtures)} clips, {total:.1f} s of audio")
+    print(f"{'engine':<8} {'load s':>7} {'RTF wall':>9} {'RTF cpu':>8} {'WER':>6} "
+          f"{'finish p50':>11} {'finish p95':>11} {'1st partial':>12} {'failed':>7}")
+    for engine in args.engines.split(","):
+        result = run(engine.strip(), fixtures, rate)
+        if result is None:
+            print(f"{engine:<8} unavailable")
+            continue
+        partial = f"{result['first_partial_s']:.2f} s" if result['first_partial_s'] is not None else "-"
+        print(f"{engine:<8} {result['load_s']:>7.2f} {result['rtf_wall']:>9.3f} {result['rtf_cpu']:>8.3f} "
+              f"{result['wer']:>6.1%} {result['finish_p50_ms']:>9.0f}ms {result['finish_p95_ms']:>9.0f}ms "
+              f"{partial:>12} {result['failures']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""End-to-end replay benchmark against a local Gemini stand-in.
+
+Usage (from the repo root):
+    python -m benchmarks.e2e_replay --turns 50
+    python -m benchmarks.e2e_replay --fixtures clips/commands --json before.json
+    python -m benchmarks.e2e_replay --json after.json --compare before.json
+
+Targets:
+  assistant  ModernVoiceAssistant with no Tk window, microphone or speaker.
+             Each turn writes a command clip into the capture ring and fires
+             the wake word handler, so capture, ASR, LLM and execute stages
+             run on the real pipeline. Recognition is replaced by the clip's
+             transcript (a .txt next to the WAV, else the file name) after a
+             fixed --asr-latency, unless --asr picks a real engine. With
+             --partials it also streams the transcript word by word, so
+             speculative requests on partial transcripts are exercised.
+  cli        main.py in a subprocess, fed the same commands on stdin, with
+             its --profile trace read back for the stage timings.
+
+Without --fixtures, noise bursts stand in for speech. Every run uses the stub
+in benchmarks/gemini_stub.py, so results only move when the code does.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+import asr
+import audio_buffer
+import audio_preprocess
+import config
+import speculation
+import tracing
+import wake_word
+from benchmarks.gemini_stub import GeminiStub
+from conversation_memory import ConversationMemory
+from intent_cache import IntentCache
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COMMANDS = [
+    "open notepad", "what time is it", "tell me a joke", "open my downloads folder",
+    "who are you", "close chrome", "open youtube", "explain what a linked list is",
+]
+
+
+def load_fixtures(directory, rate=wake_word.SAMPLE_RATE):
+    """(transcript, samples) for every WAV in ``directory``"""
+    fixtures = []
+    for path in sorted(Path(directory).glob("*.wav")):
+        label = path.with_suffix(".txt")
+        transcript = label.read_text(encoding="utf-8").strip() if label.exists() else path.stem.replace("_", " ")
+        fixtures.append((transcript, wake_word.read_wav(path, rate)))
+    return fixtures
+
+
+def synthetic_fixtures(commands, rate=wake_word.SAMPLE_RATE, seed=0):
+    """Noise bursts about as long as saying each command"""
+    rng = np.random.default_rng(seed)
+    fixtures = []
+    for command in commands:
+        seconds = 0.4 + 0.08 * len(command.split())
+        samples = rng.normal(0, 2000, int(seconds * rate)).clip(-32768, 32767).astype(np.int16)
+        fixtures.append((command, samples))
+    return fixtures
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size in MB (of this process or its largest child), None on Windows"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def byte_stats(sizes):
+    if not sizes:
+        return {'mean': 0, 'p50': 0, 'max': 0}
+    return {'mean': float(np.mean(sizes)), 'p50': float(np.percentile(sizes, 50)), 'max': int(max(sizes))}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class ScriptedStream(asr.AsrStream):
+    """Reveals the transcript word by word as the clip's audio is fed, like a streaming engine"""
+
+    def __init__(self, backend, sample_rate):
+        super().__init__(backend, sample_rate)
+        self.fed = 0
+        self.partial = ""
+
+    def feed(self, pcm):
+        self.fed += len(pcm)
+        words = self.backend.transcript.split()
+        heard = min(1.0, self.fed / self.backend.samples) if self.backend.samples else 1.0
+        partial = " ".join(words[:int(len(words) * heard)])
+        if partial == self.partial:
+            return None
+        self.partial = partial
+        return partial
+
+    def finish(self, on_partial=None):
+        time.sleep(self.backend.latency)
+        return self.backend.transcript
+
+
+class ScriptedAsr(asr.AsrBackend):
+    """Answers with the current clip's transcript after a fixed delay"""
+
+    name = 'scripted'
+
+    def __init__(self, latency, partials=False):
+        self.latency = latency
+        self.streams_partials = partials
+        self.transcript = ""
+        self.samples = 0  # length of the clip, so partials can track how much was heard
+
+    def transcribe(self, pcm, sample_rate, on_partial=None):
+        time.sleep(self.latency)
+        return self.transcript
+
+    def start_stream(self, sample_rate):
+        return ScriptedStream(self, sample_rate) if self.streams_partials else super().start_stream(sample_rate)
+
+
+class _Thresholds:
+    """The Recognizer settings capture_command reads"""
+
+    energy_threshold = 300
+    pause_threshold = 0.8
+
+
+class _NullRoot:
+    """Enough of a Tk root for UiChannel; nothing is ever drawn"""
+
+    def after(self, ms, fn=None, *args):
+        return None
+
+
+def headless_assistant(asr_latency, use_intent_cache, asr_engine=None, partials=False):
+    """Build a ModernVoiceAssistant whose UI, microphone and speaker are stand-ins"""
+    import modern_voice_assistant
+
+    class HeadlessAssistant(modern_voice_assistant.ModernVoiceAssistant):
+        def __init__(self):
+            self.turn_done = threading.Event()
+            self.messages = 0
+            super().__init__()
+            # Nothing from earlier sessions, so every run starts from the same state
+            self.memory = ConversationMemory(token_budget=config.MEMORY_TOKEN_BUDGET)
+            self.intent_cache = IntentCache(config.INTENT_CACHE_SIZE, config.INTENT_CACHE_TTL) if use_intent_cache else None
+
+        def setup_tts(self):
+            self.tts = None
+
+        def setup_speech_recognition(self):
+            self.recognizer = _Thresholds()
+            self.asr = asr.create_backend(asr_engine) if asr_engine else ScriptedAsr(asr_latency, partials)
+            self.wake_detector = None
+            self.audio = audio_buffer.AudioRingBuffer(wake_word.SAMPLE_RATE, wake_word.FRAME_LENGTH, seconds=60)
+
+        def create_modern_ui(self):
+            self.root = _NullRoot()
+            self.transcript = None
+            self.accent_color = self.success_color = self.warning_color = self.error_color = None
+
+        def start_wake_word_detection(self):
+            pass
+
+        def show_window(self):
+            pass
+
+        def hide_window(self):
+            pass
+
+        def update_status(self, text, color):
+            pass
+
+        def add_to_chat(self, message, sender="Assistant"):
+            self.messages += 1
+
+        def begin_chat_message(self):
+            self.messages += 1
+
+        def append_to_chat(self, text):
+            pass
+
+        def end_chat_message(self):
+            pass
+
+        def add_command_output(self, line):
+            pass
+
+        def animate_listening(self):
+            pass
+
+        def finish_turn(self, turn):
+            tracing.record('turn.total', time.perf_counter() - turn.started, turn=turn.id)
+            self.turn_done.set()
+
+        def shutdown(self):
+            self.pipeline.stop()
+            self.audio.close()
+
+    return HeadlessAssistant()
+
+
+def run_assistant(stub, fixtures, turns, asr_latency, use_intent_cache, asr_engine=None, partials=False,
+                  turn_timeout=30, verbose=False):
+    """Replay ``turns`` clips through the headless assistant"""
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        assistant = headless_assistant(asr_latency, use_intent_cache, asr_engine, partials)
+        ring = assistant.audio
+        silence = np.zeros(ring.sample_rate, dtype=np.int16)
+        timeouts = 0
+
+        def play(transcript, samples):
+            assistant.asr.transcript = transcript
+            assistant.asr.samples = len(samples)
+            assistant.turn_done.clear()
+            ring.write(silence[:ring.sample_rate // 2])
+            assistant.wake_position = ring.write_pos
+            ring.write(samples)
+            # Enough trailing quiet for the pause detector to end the phrase
+            ring.write(silence)
+            assistant.handle_wake_word()
+            return assistant.turn_done.wait(turn_timeout)
+
+        # One warm-up turn so connection setup and first imports stay out of the numbers
+        play(*fixtures[0])
+        tracing.tracer.reset()
+        if assistant.speculator:
+            assistant.speculator = speculation.from_config()
+        if assistant.preprocessor:
+            assistant.preprocessor = audio_preprocess.from_config()
+        stub_sizes = len(stub.request_bytes)
+
+        start = time.perf_counter()
+        for index in range(turns):
+            if not play(*fixtures[index % len(fixtures)]):
+                timeouts += 1
+        wall = time.perf_counter() - start
+        assistant.shutdown()
+
+    return {
+        'turns': turns,
+        'timeouts': timeouts,
+        'turns_per_sec': turns / wall,
+        'peak_rss_mb': peak_rss_mb(),
+        'prompt_bytes': byte_stats(stub.request_bytes[stub_sizes:]),
+        'stages': tracing.tracer.snapshot(),
+        'speculation': assistant.speculator.snapshot() if assistant.speculator else None,
+        'gemini': assistant.prompter.caller.snapshot() if assistant.prompter else None,
+        'preprocess': assistant.preprocessor.snapshot() if assistant.preprocessor else None,
+    }
+
+
+def run_cli(stub, commands, turns, timeout=600):
+    """Drive main.py's input loop with scripted commands"""
+    with tempfile.TemporaryDirectory() as tmp:
+        trace = Path(tmp) / "trace.jsonl"
+        env = dict(os.environ, MIA_GEMINI_BASE_URL=stub.url, MIA_DATA_DIR=tmp, MIA_MEMORY_PERSIST="0",
+                   GEMINI_API_KEY=os.environ.get('GEMINI_API_KEY') or "stub", PYTHONIOENCODING="utf-8")
+        script = "".join(commands[index % len(commands)] + "\n" for index in range(turns))
+        stub_sizes = len(stub.request_bytes)
+        completed = subprocess.run([sys.executable, str(ROOT / "main.py"), "--profile", str(trace)],
+                                   input=script, text=True, encoding="utf-8", capture_output=True,
+                                   env=env, cwd=ROOT, timeout=timeout)
+        if completed.returncode != 0:
+            raise RuntimeError(f"main.py exited with {completed.returncode}:\n{completed.stderr[-2000:]}")
+
+        # Rebuild the histograms from the trace; wall time runs from the first turn to the last
+        replayed = tracing.Tracer()
+        first_start = last_end = None
+        with open(trace, encoding="utf-8") as events:
+            for line in events:
+                event = json.loads(line)
+                replayed.record(event['name'], event['ms'] / 1000, trace=False)
+                if event['name'] == 'main.turn':
+                    began = event['end'] - event['ms'] / 1000
+                    first_start = began if first_start is None else min(first_start, began)
+                    last_end = event['end'] if last_end is None else max(last_end, event['end'])
+
+    stages = replayed.snapshot()
+    done = stages.get('main.turn', {}).get('count', 0)
+    wall = (last_end - first_start) if done else 0
+    return {
+        'turns': turns,
+        'timeouts': turns - done,
+        'turns_per_sec': done / wall if wall else 0.0,
+        'peak_rss_mb': peak_rss_mb(children=True),
+        'prompt_bytes': byte_stats(stub.request_bytes[stub_sizes:]),
+        'stages': stages,
+    }
+
+
+def report(name, result):
+    rss = f"{result['peak_rss_mb']:.1f} MB" if result['peak_rss_mb'] is not None else "n/a"
+    prompt = result['prompt_bytes']
+    print(f"== {name}")
+    print(f"turns {result['turns']} ({result['timeouts']} unfinished), {result['turns_per_sec']:.2f} turns/sec, "
+          f"peak RSS {rss}")
+    print(f"prompt bytes per turn: mean {prompt['mean']:.0f}, p50 {prompt['p50']:.0f}, max {prompt['max']}")
+    calls = result.get('gemini')
+    if calls and (calls['retries'] or calls['hedges'] or calls['fallbacks'] or calls['errors']):
+        print(f"gemini: {calls['retries']} retries, {calls['hedges']} hedges ({calls['hedge_wins']} won), "
+              f"{calls['fallbacks']} fallbacks ({calls['fallback_wins']} won), {calls['timeouts']} timeouts, "
+              f"{calls['errors']} failed calls")
+    guesses = result.get('speculation')
+    if guesses and guesses['dispatched']:
+        print(f"speculation: {guesses['dispatched']} sent, {guesses['hits']} hits, {guesses['misses']} misses, "
+              f"{guesses['cancelled']} cancelled, hit rate {guesses['hit_rate']:.0%}, "
+              f"{guesses['saved_per_hit_s'] * 1000:.0f} ms saved per hit")
+    cleaned = result.get('preprocess')
+    if cleaned and cleaned['utterances']:
+        print(f"preprocessing: {cleaned['utterances']} utterances, {cleaned['saved_share']:.0%} fewer bytes to ASR, "
+              f"{cleaned['cpu_ms_per_audio_s']:.1f} ms CPU per audio second")
+    stages = result['stages']
+    if stages:
+        width = max(len(stage) for stage in stages)
+        print(f"{'stage':<{width}} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for stage, row in sorted(stages.items()):
+            print(f"{stage:<{width}} {row['count']:>7} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+    print()
+
+
+def compare(previous, current):
+    """Print the change in headline numbers against a saved run"""
+    print(f"== compared with {previous.get('commit') or 'previous run'}")
+
+    def line(label, old, new, lower_is_better=True):
+        if old in (None, 0) or new is None:
+            return
+        change = (new - old) / old * 100
+        better = (change < 0) == lower_is_better
+        print(f"{label:<40} {old:>10.1f} {new:>10.1f} {change:>+8.1f}% {'better' if better else 'worse'}")
+
+    for target, result in current['results'].items():
+        before = previous.get('results', {}).get(target)
+        if not before:
+            continue
+        line(f"{target} turns/sec", before['turns_per_sec'], result['turns_per_sec'], lower_is_better=False)
+        line(f"{target} peak RSS MB", before['peak_rss_mb'], result['peak_rss_mb'])
+        line(f"{target} prompt bytes (mean)", before['prompt_bytes']['mean'], result['prompt_bytes']['mean'])
+        for stage, row in sorted(result['stages'].items()):
+            old = before['stages'].get(stage)
+            if old:
+                line(f"{target} {stage} p95 ms", old['p95_ms'], row['p95_ms'])
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end replay benchmark")
+    parser.add_argument('--target', choices=['assistant', 'cli', 'both'], default='both')
+    parser.add_argument('--turns', type=int, default=30)
+    parser.add_argument('--fixtures', help="directory of command WAVs (transcripts in matching .txt files)")
+    parser.add_argument('--latency', type=float, default=0.3, help="stub seconds before the first chunk")
+    parser.add_argument('--chunk-interval', type=float, default=0.02, help="stub seconds between chunks")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of stub requests failing with 503")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="share of stub requests stalled by --slow-latency")
+    parser.add_argument('--slow-latency', type=float, default=5.0)
+    parser.add_argument('--asr-latency', type=float, default=0.2, help="seconds the stand-in recognizer takes")
+    parser.add_argument('--asr', help="real ASR engine (google, vosk, whisper) instead of the clip transcripts")
+    parser.add_argument('--partials', action='store_true',
+                        help="stand-in recognizer streams partial transcripts (enables speculative requests)")
+    parser.add_argument('--intent-cache', action='store_true', help="let repeated commands use a fresh intent cache")
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--compare', help="results file from an earlier run to diff against")
+    parser.add_argument('--verbose', action='store_true', help="keep the assistant's own output")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else synthetic_fixtures(COMMANDS)
+    if not fixtures:
+        parser.error(f"no WAV files in {args.fixtures}")
+    commands = [transcript for transcript, _ in fixtures]
+
+    stub = GeminiStub(latency=args.latency, chunk_interval=args.chunk_interval, error_rate=args.error_rate,
+                      slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    config.GEMINI_BASE_URL = stub.start()
+    os.environ.setdefault('GEMINI_API_KEY', "stub")
+
+    results = {}
+    try:
+        # main.py goes first: children forked later by the assistant's executor would
+        # carry this process's RSS into the children's peak
+        if args.target in ('cli', 'both'):
+            results['cli'] = run_cli(stub, commands, args.turns)
+            report("cli (main.py)", results['cli'])
+        if args.target in ('assistant', 'both'):
+            results['assistant'] = run_assistant(stub, fixtures, args.turns, args.asr_latency, args.intent_cache,
+                                                 asr_engine=args.asr, partials=args.partials, verbose=args.verbose)
+            report("assistant", results['assistant'])
+    finally:
+        stub.stop()
+
+    run = {
+        'commit': git_commit(),
+        'settings': {'turns': args.turns, 'latency': args.latency, 'chunk_interval': args.chunk_interval,
+                     'error_rate': args.error_rate, 'slow_rate': args.slow_rate, 'slow_latency': args.slow_latency,
+                     'asr_latency': args.asr_latency, 'asr': args.asr or "scripted", 'partials': args.partials,
+                     'intent_cache': args.intent_cache,
+                     'fixtures': args.fixtures or "synthetic", 'streaming': config.STREAMING},
+        'results': results,
+    }
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), run)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Local stand-in for the Gemini API.
+
+Usage (from the repo root):
+    python -m benchmarks.gemini_stub --port 8765 --latency 0.3
+    MIA_GEMINI_BASE_URL=http://127.0.0.1:8765 GEMINI_API_KEY=stub python main.py
+
+Answers generateContent and streamGenerateContent (SSE) with canned JSON
+replies after a configurable delay, accepts cachedContents uploads, can fail
+or stall a share of requests, and records the size of every request so
+the benchmarks can report prompt bytes per turn.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# First keyword found in the user's command picks the reply
+DEFAULT_REPLIES = [
+    ("open", {"type": "command", "command": "echo opening", "fail_audio": "Could not open that"}),
+    ("close", {"type": "command", "command": "echo closing", "fail_audio": "Could not close that"}),
+    ("time", {"type": "action", "action": "current_time", "args": {}, "command": "date",
+              "fail_audio": "Could not tell the time"}),
+    ("joke", {"type": "response", "content": "Why do programmers mix up Halloween and Christmas? "
+                                             "Because Oct 31 equals Dec 25."}),
+]
+FALLBACK_REPLY = {"type": "response", "content": "Mera name Mia bhai! I can open apps, run commands "
+                                                 "and answer questions. Ask me anything you like."}
+
+
+class GeminiStub:
+    """Threaded HTTP server speaking just enough of the Gemini REST API for the app"""
+
+    def __init__(self, latency=0.3, chunk_interval=0.02, chunk_chars=24, replies=None,
+                 host="127.0.0.1", port=0, error_rate=0.0, slow_rate=0.0, slow_latency=5.0, seed=0):
+        self.latency = latency
+        # Faults for exercising retries, hedging and model fallback
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.random = random.Random(seed)
+        self.chunk_interval = chunk_interval
+        self.chunk_chars = chunk_chars
+        self.replies = replies or DEFAULT_REPLIES
+        self.lock = threading.Lock()
+        self.request_bytes = []
+        self.caches = 0
+        self.server = _Server((host, port), _Handler)
+        self.server.stub = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="gemini-stub", daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset(self):
+        with self.lock:
+            self.request_bytes = []
+
+    def reply_for(self, request):
+        """Canned reply text for a generateContent request body"""
+        contents = request.get("contents") or [{}]
+        last = contents[-1] if isinstance(contents, list) else contents
+        parts = last.get("parts", []) if isinstance(last, dict) else []
+        text = " ".join(part.get("text", "") for part in parts if isinstance(part, dict))
+        # Older prompts wrapped the command in a template that repeats "open"
+        command = text.split("user asked", 1)[1].split(",", 1)[0] if "user asked" in text else text
+        for keyword, reply in self.replies:
+            if keyword in command.lower():
+                # A string reply is sent verbatim, e.g. to exercise malformed output
+                return reply if isinstance(reply, str) else json.dumps(reply)
+        return json.dumps(FALLBACK_REPLY)
+
+    def _record(self, size):
+        with self.lock:
+            self.request_bytes.append(size)
+
+    def fault(self):
+        """'error', 'slow' or None for the next request"""
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.error_rate:
+            return 'error'
+        if roll < self.error_rate + self.slow_rate:
+            return 'slow'
+        return None
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open hundreds of connections at once
+    request_queue_size = 1024
+
+
+def _chunk(text, model, last):
+    chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}],
+             "modelVersion": model}
+    if last:
+        chunk["candidates"][0]["finishReason"] = "STOP"
+    return chunk
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        stub._record(len(body))
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"code": 400, "message": "invalid JSON", "status": "INVALID_ARGUMENT"}})
+            return
+
+        # Paths look like /v1beta/models/gemini-2.5-flash:streamGenerateContent?alt=sse
+        path = self.path.split("?", 1)[0]
+        if path.endswith("/cachedContents"):
+            with stub.lock:
+                stub.caches += 1
+                name = f"cachedContents/stub-{stub.caches}"
+            self._send_json(200, {"name": name, "model": request.get("model", ""),
+                                  "expireTime": "2100-01-01T00:00:00Z"})
+            return
+        model, _, method = path.rsplit("/", 1)[-1].partition(":")
+        text = stub.reply_for(request)
+        fault = stub.fault()
+        if fault == 'error':
+            time.sleep(stub.latency / 2)
+            self._send_json(503, {"error": {"code": 503, "message": "stub overloaded", "status": "UNAVAILABLE"}})
+            return
+        time.sleep(stub.slow_latency if fault == 'slow' else stub.latency)
+
+        if method == "generateContent":
+            self._send_json(200, _chunk(text, model, last=True))
+        elif method == "streamGenerateContent":
+            self._stream(stub, text, model)
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": f"unknown method {method}", "status": "NOT_FOUND"}})
+
+    def _stream(self, stub, text, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pieces = [text[i:i + stub.chunk_chars] for i in range(0, len(text), stub.chunk_chars)] or [""]
+        try:
+            for index, piece in enumerate(pieces):
+                if index:
+                    time.sleep(stub.chunk_interval)
+                event = f"data: {json.dumps(_chunk(piece, model, last=index == len(pieces) - 1))}\r\n\r\n".encode()
+                self.wfile.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading: a cancelled turn or a hedged request that lost
+            self.close_connection = True
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Gemini API stand-in")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.3, help="seconds before the first chunk")
+    parser.add_argument('--chunk-interval', type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="share of requests delayed by --slow-latency")
+    parser.add_argument('--slow-latency', type=float, default=5.0)
+    args = parser.parse_args()
+
+    stub = GeminiStub(latency=args.latency, chunk_interval=args.chunk_interval, host=args.host, port=args.port,
+                      error_rate=args.error_rate, slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    print(f"Gemini stub listening on {stub.url}")
+    print(f"Run the app with MIA_GEMINI_BASE_URL={stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Cost of the always-on wake loop with the listen scheduler on and off.
+
+Usage (from the repo root):
+    python -m benchmarks.listening --seconds 30
+
+The popup assistant runs headless with the online wake path (phrases sent to
+the recognizer) while a feeder writes background noise into the capture ring
+in real time, with a loud burst every --burst-every seconds standing in for
+speech that isn't the wake word. Recognition is the scripted stand-in from
+e2e_replay, so every burst that gets through is one recognition call. The
+report is the scheduler's own metrics: duty cycle (share of the time the wake
+thread was not sleeping), wake thread CPU, recognition calls per minute and
+the energy threshold it ended on.
+"""
+import argparse
+import contextlib
+import io
+import threading
+import time
+
+import numpy as np
+
+import listen_scheduler
+from benchmarks.e2e_replay import headless_assistant
+
+
+def feed(ring, seconds, burst_every, burst_rms, noise_rms, stop, seed=0):
+    """Write noise with periodic bursts into the ring at the capture rate"""
+    rng = np.random.default_rng(seed)
+    frame_seconds = ring.frame_length / ring.sample_rate
+    start = time.perf_counter()
+    written = 0
+    while written * frame_seconds < seconds and not stop.is_set():
+        at = written * frame_seconds
+        frame = rng.normal(0, noise_rms, ring.frame_length)
+        if burst_every and at % burst_every < 0.6:
+            t = at + np.arange(ring.frame_length) / ring.sample_rate
+            frame += burst_rms * np.sqrt(2) * np.sin(2 * np.pi * 300 * t)
+        ring.write(np.clip(frame, -32768, 32767).astype(np.int16))
+        written += 1
+        delay = start + written * frame_seconds - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run(adaptive, seconds, burst_every, burst_rms, noise_rms, asr_latency):
+    with contextlib.redirect_stdout(io.StringIO()):
+        assistant = headless_assistant(asr_latency, use_intent_cache=False)
+        scheduler = assistant.scheduler = listen_scheduler.ListenScheduler(adaptive=adaptive)
+        ring = assistant.audio
+        stop = threading.Event()
+
+        def wake_loop():
+            while not stop.is_set():
+                assistant.wait_for_wake_word_online()
+
+        listener = threading.Thread(target=wake_loop, daemon=True)
+        listener.start()
+        feed(ring, seconds, burst_every, burst_rms, noise_rms, stop)
+        stop.set()
+        stats = scheduler.snapshot()
+        scheduler.close()
+        assistant.shutdown()
+        listener.join(5)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wake loop scheduling benchmark")
+    parser.add_argument('--seconds', type=float, default=30, help="audio fed per mode, in real time")
+    parser.add_argument('--burst-every', type=float, default=3.0, help="seconds between loud non-wake bursts")
+    parser.add_argument('--burst-rms', type=float, default=800.0, help="burst level, e.g. a TV across the room")
+    parser.add_argument('--noise-rms', type=float, default=100.0, help="background noise level (int16 RMS)")
+    parser.add_argument('--asr-latency', type=float, default=0.3, help="seconds the stand-in recognizer takes")
+    args = parser.parse_args()
+
+    print(f"{args.seconds:.0f} s of audio per mode, a burst every {args.burst_every:g} s")
+    print(f"{'mode':<10} {'duty':>6} {'cpu':>7} {'calls/min':>10} {'false':>6} {'threshold':>10}")
+    for name, adaptive in (("fixed", False), ("adaptive", True)):
+        stats = run(adaptive, args.seconds, args.burst_every, args.burst_rms, args.noise_rms,
+                    args.asr_latency)
+        print(f"{name:<10} {stats['duty_cycle']:>6.0%} {stats['cpu_share']:>7.2%} "
+              f"{stats['recognitions_per_min']:>10.1f} {stats['false_triggers']:>6} {stats['energy_threshold']:>10}")
+
+
+if __name__ == "__main__":
+    main()
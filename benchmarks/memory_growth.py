@@ -0,0 +1,76 @@
+"""Show that per-turn prompt size stays flat with ConversationMemory.
+
+Usage (from the repo root):
+    python -m benchmarks.memory_growth --turns 500
+
+Replays a synthetic session and compares the bytes of conversation history
+sent per request against the old approach of pasting the repr of the whole
+history list into the prompt.
+"""
+import argparse
+import json
+import random
+import time
+
+from conversation_memory import ConversationMemory
+
+COMMANDS = [
+    "open the browser", "open my downloads folder", "what time is it",
+    "tell me a joke about programmers", "open notepad", "how is the weather usually in delhi in june",
+    "explain what a linked list is in two lines", "open youtube", "close chrome", "who are you",
+]
+
+
+def fake_reply(command, rng):
+    if command.startswith(("open", "close")):
+        return {"type": "command", "command": f"start {command.split()[-1]}", "fail_audio": "Could not do that"}
+    words = rng.randint(10, 80)
+    return {"type": "response", "content": " ".join(rng.choice(COMMANDS).split()[0] for _ in range(words))}
+
+
+def run(turns, token_budget, seed=0):
+    rng = random.Random(seed)
+    memory = ConversationMemory(token_budget=token_budget)
+    legacy_history = []
+    rows = []
+    add_seconds = 0.0
+
+    for turn in range(1, turns + 1):
+        command = rng.choice(COMMANDS)
+        history_bytes = len(json.dumps(memory.contents(""), ensure_ascii=False).encode())
+        legacy_bytes = len(repr(legacy_history).encode())
+        rows.append((turn, history_bytes, legacy_bytes))
+
+        reply = fake_reply(command, rng)
+        start = time.perf_counter()
+        memory.add('user', command)
+        memory.add('model', reply)
+        add_seconds += time.perf_counter() - start
+        legacy_history.append({'role': 'user', 'content': command})
+        legacy_history.append({'role': 'system', 'content': reply})
+
+    return rows, add_seconds / turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversation memory growth benchmark")
+    parser.add_argument('--turns', type=int, default=500)
+    parser.add_argument('--budget', type=int, default=1500, help="history token budget")
+    args = parser.parse_args()
+
+    rows, add_cost = run(args.turns, args.budget)
+    print(f"{'turn':>6} {'memory bytes':>13} {'legacy bytes':>13}")
+    step = max(1, args.turns // 10)
+    for turn, history_bytes, legacy_bytes in rows:
+        if turn == 1 or turn % step == 0:
+            print(f"{turn:>6} {history_bytes:>13} {legacy_bytes:>13}")
+
+    tail = [history_bytes for _, history_bytes, _ in rows[len(rows) // 2:]]
+    print()
+    print(f"memory history bytes, second half of session: min {min(tail)}, max {max(tail)}")
+    print(f"legacy history bytes at last turn: {rows[-1][2]}")
+    print(f"bookkeeping cost per turn: {add_cost * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
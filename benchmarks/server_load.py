@@ -0,0 +1,142 @@
+"""Load test for server.py against the local Gemini stub.
+
+Usage (from the repo root):
+    python -m benchmarks.server_load --sessions 1,10,50,100,200,400 --turns 5
+    python -m benchmarks.server_load --mode ws --concurrency 128
+
+For each session count a fresh server is started in a subprocess and every
+session sends ``--turns`` commands one after another (over HTTP, or one
+WebSocket per session). Reports throughput, client-side latency percentiles,
+503s and the server's own queue metrics.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import tornado.httpclient
+import tornado.websocket
+
+from benchmarks.gemini_stub import GeminiStub
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COMMANDS = ["open notepad", "what time is it", "tell me a joke", "close chrome", "who are you"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(stub_url, concurrency, max_queue):
+    port = free_port()
+    env = dict(os.environ, MIA_GEMINI_BASE_URL=stub_url, GEMINI_API_KEY=os.environ.get('GEMINI_API_KEY') or "stub",
+               PYTHONIOENCODING="utf-8")
+    process = subprocess.Popen([sys.executable, str(ROOT / "server.py"), "--port", str(port),
+                                "--concurrency", str(concurrency), "--max-queue", str(max_queue)],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process, f"127.0.0.1:{port}"
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"server exited:\n{process.stderr.read().decode(errors='replace')}")
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+async def http_session(address, index, turns, latencies, outcomes, client):
+    session_id = f"load-{index}"
+    for turn in range(turns):
+        body = json.dumps({'session': session_id, 'command': COMMANDS[(index + turn) % len(COMMANDS)]})
+        start = time.perf_counter()
+        response = await client.fetch(f"http://{address}/v1/ask", method="POST", body=body,
+                                      raise_error=False, request_timeout=120)
+        latencies.append(time.perf_counter() - start)
+        outcomes[response.code] = outcomes.get(response.code, 0) + 1
+
+
+async def ws_session(address, index, turns, latencies, outcomes, client=None):
+    connection = await tornado.websocket.websocket_connect(f"ws://{address}/v1/stream?session=load-{index}")
+    await connection.read_message()  # session id
+    for turn in range(turns):
+        start = time.perf_counter()
+        await connection.write_message(json.dumps({'command': COMMANDS[(index + turn) % len(COMMANDS)]}))
+        while True:
+            message = await connection.read_message()
+            if message is None:
+                outcomes['closed'] = outcomes.get('closed', 0) + 1
+                return
+            event = json.loads(message)['event']
+            if event != 'text':
+                break
+        latencies.append(time.perf_counter() - start)
+        outcomes[event] = outcomes.get(event, 0) + 1
+    connection.close()
+
+
+async def run_level(address, sessions, turns, mode):
+    latencies, outcomes = [], {}
+    client = tornado.httpclient.AsyncHTTPClient(force_instance=True, max_clients=sessions + 1)
+    worker = http_session if mode == 'http' else ws_session
+    # Spread session starts over a few milliseconds, as real clients would arrive
+    async def staggered(index):
+        await asyncio.sleep(random.random() * 0.05)
+        await worker(address, index, turns, latencies, outcomes, client)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(staggered(index) for index in range(sessions)))
+    wall = time.perf_counter() - start
+    metrics = json.loads((await client.fetch(f"http://{address}/metrics")).body)
+    client.close()
+    return latencies, outcomes, wall, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="server.py load test")
+    parser.add_argument('--sessions', default="1,10,50,100,200,400", help="comma separated session counts")
+    parser.add_argument('--turns', type=int, default=5, help="commands per session")
+    parser.add_argument('--mode', choices=['http', 'ws'], default='http')
+    parser.add_argument('--concurrency', type=int, default=64, help="server's concurrent model calls")
+    parser.add_argument('--max-queue', type=int, default=1024)
+    parser.add_argument('--latency', type=float, default=0.3, help="stub seconds before the first chunk")
+    args = parser.parse_args()
+
+    stub = GeminiStub(latency=args.latency)
+    stub.start()
+    print(f"{args.mode}, server concurrency {args.concurrency}, stub latency {args.latency:.2f}s")
+    print(f"{'sessions':>8} {'turns':>6} {'turns/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'503s':>5} {'errors':>6} {'peak queue':>10} {'queue p95 ms':>12}")
+    try:
+        for sessions in [int(count) for count in args.sessions.split(",")]:
+            process, address = start_server(stub.url, args.concurrency, args.max_queue)
+            try:
+                latencies, outcomes, wall, metrics = asyncio.run(run_level(address, sessions, args.turns, args.mode))
+            finally:
+                process.terminate()
+                process.wait(timeout=10)
+            ok = outcomes.get(200, 0) + outcomes.get('reply', 0)
+            busy = outcomes.get(503, 0) + outcomes.get('busy', 0)
+            errors = sum(outcomes.values()) - ok - busy
+            queue_wait = metrics['latency'].get('server.queue_wait', {}).get('p95_ms', 0.0)
+            p50, p95, p99 = (np.percentile(latencies, [50, 95, 99]) * 1000) if latencies else (0, 0, 0)
+            print(f"{sessions:>8} {len(latencies):>6} {ok / wall:>8.1f} {p50:>8.0f} {p95:>8.0f} {p99:>8.0f} "
+                  f"{busy:>5} {errors:>6} {metrics['llm']['peak_queued']:>10} {queue_wait:>12.0f}")
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
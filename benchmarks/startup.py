@@ -0,0 +1,113 @@
+"""Import time and time-to-listening of the popup assistant.
+
+Usage (from the repo root):
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --imports-only   # no microphone or display needed
+
+Import time comes from ``python -X importtime``, run in fresh interpreters.
+Time-to-listening launches modern_voice_assistant.py with MIA_FAST_START on
+and off and waits for the wake listener to report in; that part needs a
+microphone and a display. Each launch after the first reuses the calibration
+and voice saved by the one before, as a normal restart would.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Loaded lazily by the app now; imported here only to show what that saves
+DEFERRED = ["speech_recognition", "pyttsx3", "google.genai"]
+
+
+def import_time(statement):
+    """(total seconds, {module: cumulative seconds} of what it imports directly) in a fresh interpreter"""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT,
+                               capture_output=True, text=True, timeout=120)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    total, children, pending = 0.0, {}, {}
+    for line in completed.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( +)(\S+)", line)
+        if not match:
+            continue
+        seconds, depth, name = int(match.group(1)) / 1e6, (len(match.group(2)) - 1) // 2, match.group(3)
+        # Children are printed before their parent
+        if depth == 1:
+            pending[name] = seconds
+        elif depth == 0:
+            if name not in ("site", "encodings") and not name.startswith("_"):
+                total += seconds
+                children.update(pending)
+            pending = {}
+    return total, children
+
+
+def launch(fast, timeout=60):
+    """Seconds until the wake listener starts, as (wall from spawn, reported by the app)"""
+    env = dict(os.environ, MIA_FAST_START="1" if fast else "0", PYTHONIOENCODING="utf-8", PYTHONUNBUFFERED="1")
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, str(ROOT / "modern_voice_assistant.py")], cwd=ROOT, env=env,
+                               stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, encoding="utf-8", errors="replace")
+    tail = []
+    try:
+        deadline = start + timeout
+        for line in process.stdout:
+            match = re.search(r"\(([\d.]+)s after launch\)", line)
+            if match:
+                return time.perf_counter() - start, float(match.group(1))
+            tail.append(line.rstrip())
+            if time.perf_counter() > deadline:
+                break
+    finally:
+        process.kill()
+        process.wait()
+    raise RuntimeError("assistant never started listening:\n" + "\n".join(tail[-10:]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--imports-only', action='store_true', help="skip launching the app")
+    args = parser.parse_args()
+
+    totals, breakdown = [], {}
+    for _ in range(args.runs):
+        total, modules = import_time("import modern_voice_assistant")
+        totals.append(total)
+        for name, seconds in modules.items():
+            breakdown.setdefault(name, []).append(seconds)
+    print(f"import modern_voice_assistant: median {np.median(totals) * 1000:.0f} ms")
+    heaviest = sorted(breakdown.items(), key=lambda item: -np.median(item[1]))[:8]
+    for name, samples in heaviest:
+        print(f"  {name:<28} {np.median(samples) * 1000:>7.1f} ms")
+    try:
+        deferred = np.median([import_time("import " + ", ".join(DEFERRED))[0] for _ in range(args.runs)])
+        print(f"deferred until first use ({', '.join(DEFERRED)}): median {deferred * 1000:.0f} ms")
+    except RuntimeError as e:
+        print(f"deferred imports not measured: {e}")
+
+    if args.imports_only:
+        return
+    print()
+    print(f"{'mode':<6} {'wall p50':>9} {'wall max':>9} {'in-app p50':>11}")
+    for fast in (True, False):
+        try:
+            results = [launch(fast) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{'fast' if fast else 'eager':<6} failed: {e}")
+            continue
+        wall = [seconds for seconds, _ in results]
+        reported = [seconds for _, seconds in results]
+        print(f"{'fast' if fast else 'eager':<6} {np.median(wall):>8.2f}s {max(wall):>8.2f}s {np.median(reported):>10.2f}s")
+
+
+if __name__ == "__main__":
+    main()
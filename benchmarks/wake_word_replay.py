@@ -0,0 +1,105 @@
+"""Replay WAV files through a local wake word detector.
+
+Usage (from the repo root):
+    python -m benchmarks.wake_word_replay --positive clips/bhai --negative clips/noise
+
+Positive clips contain the wake word; negative clips must not trigger it.
+An optional labels JSON maps positive file names to the second the wake word
+ends, so detection latency is measured from there instead of the clip start.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+import wake_word
+
+
+def replay(detector, samples):
+    """Feed a clip frame by frame; return the sample offsets where the detector fired"""
+    detections = []
+    frame_length = detector.frame_length
+    detector.reset()
+    for start in range(0, len(samples) - frame_length + 1, frame_length):
+        if detector.process(samples[start:start + frame_length]):
+            detections.append(start + frame_length)
+            detector.reset()
+    # Flush a trailing segment the way a following silence would
+    silence = np.zeros(frame_length, dtype=np.int16)
+    for _ in range(getattr(detector.gate, 'hangover_frames', 0) + 1):
+        if detector.process(silence):
+            detections.append(len(samples))
+            break
+    return detections
+
+
+def run(detector, positives, negatives, labels):
+    """Replay every clip and collect latency, false accepts and CPU time"""
+    rate = detector.sample_rate
+    latencies, missed = [], []
+    false_accepts = 0
+    audio_seconds = 0.0
+    negative_seconds = 0.0
+    cpu_start = time.process_time()
+
+    for path in positives:
+        samples = wake_word.read_wav(path, rate)
+        audio_seconds += len(samples) / rate
+        detections = replay(detector, samples)
+        if not detections:
+            missed.append(path.name)
+            continue
+        keyword_end = labels.get(path.name, 0.0)
+        latencies.append(detections[0] / rate - keyword_end)
+
+    for path in negatives:
+        samples = wake_word.read_wav(path, rate)
+        audio_seconds += len(samples) / rate
+        negative_seconds += len(samples) / rate
+        false_accepts += len(replay(detector, samples))
+
+    cpu_seconds = time.process_time() - cpu_start
+    audio_hours = audio_seconds / 3600 or float('nan')
+    return {
+        'positives': len(positives),
+        'detected': len(latencies),
+        'missed': missed,
+        'latency_ms_mean': float(np.mean(latencies) * 1000) if latencies else None,
+        'latency_ms_p95': float(np.percentile(latencies, 95) * 1000) if latencies else None,
+        'false_accepts': false_accepts,
+        'false_accepts_per_hour': false_accepts / (negative_seconds / 3600) if negative_seconds else None,
+        'audio_seconds': audio_seconds,
+        'cpu_seconds': cpu_seconds,
+        'cpu_seconds_per_audio_hour': cpu_seconds / audio_hours,
+        'frames_seen': detector.frames_seen,
+        'frames_scored': detector.frames_scored,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wake word replay harness")
+    parser.add_argument('--engine', default=None, help="template or porcupine (default: MIA_WAKE_ENGINE)")
+    parser.add_argument('--positive', type=Path, help="directory of clips containing the wake word")
+    parser.add_argument('--negative', type=Path, help="directory of clips without the wake word")
+    parser.add_argument('--labels', type=Path, help="JSON of {file name: wake word end in seconds}")
+    args = parser.parse_args()
+
+    detector = wake_word.create_detector(args.engine)
+    if detector is None:
+        raise SystemExit("No local wake word engine could be created")
+
+    positives = sorted(args.positive.glob("*.wav")) if args.positive else []
+    negatives = sorted(args.negative.glob("*.wav")) if args.negative else []
+    labels = json.loads(args.labels.read_text()) if args.labels else {}
+
+    try:
+        report = run(detector, positives, negatives, labels)
+    finally:
+        detector.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
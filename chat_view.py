@@ -0,0 +1,134 @@
+import time
+import tkinter as tk
+from collections import deque
+
+
+class ChatView:
+    """Keeps only the newest messages in the chat Text widget.
+
+    Every message is appended to the transcript store; the widget holds at most
+    ``max_messages`` of them. Scrolling to the top pulls older ones back from
+    the store a page at a time.
+    """
+
+    def __init__(self, text, scrollbar, store=None, max_messages=200, page_size=50,
+                 user_color="#58a6ff", assistant_color="#238636", output_color="#8b949e"):
+        self.text = text
+        self.scrollbar = scrollbar
+        self.store = store
+        self.max_messages = max_messages
+        self.page_size = page_size
+        # (message id, number of lines it occupies) for each message in the widget
+        self.blocks = deque()
+        self.streaming = None  # [sender, parts] while a streamed reply is arriving
+        self.loading = False
+        self.history_exhausted = store is None
+
+        # Configure text tags once
+        self.text.tag_config("user", foreground=user_color)
+        self.text.tag_config("assistant", foreground=assistant_color)
+        self.text.tag_config("output", foreground=output_color)
+        self.text.config(yscrollcommand=self._on_scroll)
+
+        if store:
+            for message_id, ts, sender, message in store.recent(page_size):
+                self._insert_block(message_id, ts, sender, message, at_top=False)
+            self.text.see(tk.END)
+
+    @staticmethod
+    def _format(ts, sender, message):
+        timestamp = time.strftime("%H:%M", time.localtime(ts))
+        name = "You" if sender == "You" else "Mia Bhai"
+        return f"[{timestamp}] {name}: {message}\n\n"
+
+    def _insert_block(self, message_id, ts, sender, message, at_top):
+        chunk = self._format(ts, sender, message)
+        tag = "user" if sender == "You" else "assistant"
+        lines = chunk.count("\n")
+        if at_top:
+            self.text.insert("1.0", chunk, tag)
+            self.blocks.appendleft([message_id, lines])
+        else:
+            self.text.insert(tk.END, chunk, tag)
+            self.blocks.append([message_id, lines])
+
+    def add(self, message, sender="Assistant"):
+        """Append a complete message"""
+        ts = time.time()
+        message_id = self.store.append(sender, message, ts) if self.store else None
+        self._insert_block(message_id, ts, sender, message, at_top=False)
+        self._trim()
+        self.text.see(tk.END)
+
+    def begin_stream(self, sender="Assistant"):
+        """Start a message whose text arrives in pieces"""
+        ts = time.time()
+        self.streaming = [sender, [], ts]
+        header = self._format(ts, sender, "")[:-2]
+        self.text.insert(tk.END, header, "assistant")
+        self.blocks.append([None, 0])
+
+    def append_stream(self, text):
+        if self.streaming is None:
+            self.begin_stream()
+        self.streaming[1].append(text)
+        self.text.insert(tk.END, text, "assistant")
+        self.blocks[-1][1] += text.count("\n")
+        self.text.see(tk.END)
+
+    def end_stream(self):
+        """Finish the streamed message and record it in the transcript"""
+        if self.streaming is None:
+            return
+        sender, parts, ts = self.streaming
+        self.streaming = None
+        self.text.insert(tk.END, "\n\n", "assistant")
+        self.blocks[-1][1] += 2
+        if self.store:
+            self.blocks[-1][0] = self.store.append(sender, "".join(parts), ts)
+        self._trim()
+
+    def add_output(self, line):
+        """Command output belongs to the message above it and is not stored"""
+        self.text.insert(tk.END, f"    {line}\n", "output")
+        if self.blocks:
+            self.blocks[-1][1] += 1
+        else:
+            self.blocks.append([None, 1])
+        self.text.see(tk.END)
+
+    def _trim(self):
+        # Leave extra history alone while the user is reading it
+        if self.text.yview()[1] < 1.0 and len(self.blocks) <= 2 * self.max_messages:
+            return
+        while len(self.blocks) > self.max_messages:
+            _, lines = self.blocks.popleft()
+            self.text.delete("1.0", f"{lines + 1}.0")
+        if self.store:
+            self.history_exhausted = False
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(first) <= 0.0 and not self.loading and not self.history_exhausted:
+            self.loading = True
+            self.text.after_idle(self.load_older)
+
+    def load_older(self):
+        """Prepend the page of history just above the oldest message shown"""
+        try:
+            oldest = next((block[0] for block in self.blocks if block[0] is not None), None)
+            if oldest is None:
+                self.history_exhausted = True
+                return
+            self.store.flush()
+            rows = self.store.before(oldest, self.page_size)
+            if not rows:
+                self.history_exhausted = True
+                return
+            # Keep the previously top line in place so the view doesn't jump
+            for message_id, ts, sender, message in reversed(rows):
+                self._insert_block(message_id, ts, sender, message, at_top=True)
+            added = sum(block[1] for block in list(self.blocks)[:len(rows)])
+            self.text.yview(f"{added + 1}.0")
+        finally:
+            self.loading = False
@@ -0,0 +1,186 @@
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+
+import config
+
+
+class CommandResult:
+    """Outcome and timings of one shell command"""
+
+    def __init__(self, command):
+        self.command = command
+        self.returncode = None
+        self.timed_out = False
+        self.detached = False
+        self.error = None
+        self.queued = time.perf_counter()
+        self.started = None
+        self.first_output = None
+        self.finished = None
+        self.output_tail = deque(maxlen=20)
+        self.message = None  # what an in-process action has to say, see actions.py
+
+    @property
+    def ok(self):
+        return self.error is None and not self.timed_out and self.returncode == 0
+
+    @property
+    def time_to_first_output(self):
+        return self.first_output - self.started if self.first_output and self.started else None
+
+    @property
+    def runtime(self):
+        return self.finished - self.started if self.finished and self.started else None
+
+    def summary(self):
+        parts = []
+        if self.time_to_first_output is not None:
+            parts.append(f"first output {self.time_to_first_output:.2f}s")
+        if self.runtime is not None:
+            parts.append(f"total {self.runtime:.2f}s")
+        if self.timed_out:
+            parts.append("timed out" + (", left running" if self.detached else ", killed"))
+        elif self.returncode is not None:
+            parts.append(f"exit {self.returncode}")
+        return "⏱️ " + ", ".join(parts)
+
+
+class CommandExecutor:
+    """Runs shell commands off the caller's thread with timeouts and a concurrency cap.
+
+    ``run`` returns immediately. Output lines are streamed to ``on_output`` as
+    they appear and ``on_exit`` receives the CommandResult once the command
+    finishes, fails to start or times out. A command that outlives its timeout
+    is left running (unless ``kill_on_timeout``) and moves from its run slot to
+    one of ``max_detached`` slots of its own until it exits; once those are
+    taken, timed-out commands are killed instead.
+    """
+
+    def __init__(self, max_concurrent=2, timeout=30, kill_on_timeout=False, max_output_lines=200,
+                 max_detached=4):
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.detached = threading.BoundedSemaphore(max_detached)
+        self.timeout = timeout
+        self.kill_on_timeout = kill_on_timeout
+        self.max_output_lines = max_output_lines
+        self.lock = threading.Lock()
+        self.stats = {'launched': 0, 'succeeded': 0, 'failed': 0, 'timed_out': 0, 'running': 0,
+                      'detached': 0}
+
+    def run(self, command, on_output=None, on_exit=None, timeout=None):
+        result = CommandResult(command)
+        thread = threading.Thread(target=self._execute, daemon=True,
+                                  args=(result, on_output, on_exit, timeout or self.timeout))
+        thread.start()
+        return result
+
+    def _execute(self, result, on_output, on_exit, timeout):
+        with self.slots:
+            result.started = time.perf_counter()
+            self._count('launched', 'running')
+            try:
+                process = subprocess.Popen(
+                    result.command, shell=True, stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                    text=True, errors='replace', bufsize=1,
+                    **_new_process_group(),
+                )
+            except Exception as e:
+                result.error = e
+                result.finished = time.perf_counter()
+                self._finish(result, on_exit)
+                return
+
+            readers = [threading.Thread(target=self._pump, daemon=True,
+                                        args=(stream, name, result, on_output))
+                       for stream, name in ((process.stdout, 'stdout'), (process.stderr, 'stderr'))]
+            for reader in readers:
+                reader.start()
+
+            try:
+                result.returncode = process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                result.timed_out = True
+                # Probably a GUI app that stays open; leave it be while there's room to keep track of it
+                if not self.kill_on_timeout and self.detached.acquire(blocking=False):
+                    result.detached = True
+                    self._count('detached')
+                    threading.Thread(target=self._reap, daemon=True, args=(process, readers)).start()
+                else:
+                    _kill_tree(process)
+                    result.returncode = process.wait()
+            result.finished = time.perf_counter()
+            if not result.detached:
+                for reader in readers:
+                    reader.join(timeout=1)
+        self._finish(result, on_exit)
+
+    def _reap(self, process, readers):
+        """Wait out a detached command and give its slot back"""
+        process.wait()
+        for reader in readers:
+            reader.join(timeout=1)
+        with self.lock:
+            self.stats['detached'] -= 1
+        self.detached.release()
+
+    def _pump(self, stream, name, result, on_output):
+        lines = 0
+        for line in stream:
+            if result.first_output is None:
+                result.first_output = time.perf_counter()
+            line = line.rstrip()
+            result.output_tail.append(line)
+            lines += 1
+            if on_output and lines <= self.max_output_lines:
+                on_output(name, line)
+        stream.close()
+
+    def _finish(self, result, on_exit):
+        if result.timed_out:
+            outcome = 'timed_out'
+        else:
+            outcome = 'succeeded' if result.ok else 'failed'
+        with self.lock:
+            self.stats['running'] -= 1
+            self.stats[outcome] += 1
+        if on_exit:
+            try:
+                on_exit(result)
+            except Exception as e:
+                print(f"Command exit handler error: {e}")
+
+    def _count(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.stats[key] += 1
+
+
+def _new_process_group():
+    """Start shell commands in their own group so a timeout can kill the whole tree"""
+    if os.name == 'nt':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+def _kill_tree(process):
+    try:
+        if os.name == 'nt':
+            subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        process.kill()
+
+
+def from_config():
+    """Executor limits taken from the environment"""
+    return CommandExecutor(max_concurrent=config.COMMAND_MAX_CONCURRENT,
+                           timeout=config.COMMAND_TIMEOUT,
+                           kill_on_timeout=config.COMMAND_KILL_ON_TIMEOUT,
+                           max_detached=config.COMMAND_MAX_DETACHED)
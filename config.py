@@ -0,0 +1,148 @@
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment
+load_dotenv()
+
+
+def env_str(name, default=None):
+    """Read a string setting from the environment"""
+    value = os.environ.get(name)
+    return value if value not in (None, "") else default
+
+
+def env_int(name, default):
+    """Read an integer setting from the environment"""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_float(name, default):
+    """Read a float setting from the environment"""
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_bool(name, default=False):
+    """Read an on/off setting from the environment"""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Where Mia Bhai keeps templates, caches and history between runs
+DATA_DIR = Path(env_str('MIA_DATA_DIR', Path.home() / ".mia_bhai"))
+
+# Open the microphone and start listening first; calibrate, load speech models
+# and start TTS in the background (0 waits for all of it like before)
+FAST_START = env_bool('MIA_FAST_START', True)
+
+# Wake word engine: "template" (local MFCC matcher), "porcupine" or "google"
+WAKE_ENGINE = env_str('MIA_WAKE_ENGINE', 'template')
+WAKE_TEMPLATE_DIR = Path(env_str('MIA_WAKE_TEMPLATE_DIR', DATA_DIR / "wake_templates"))
+# DTW distance a template match must beat; 0 derives it from the templates' spread
+WAKE_TEMPLATE_THRESHOLD = env_float('MIA_WAKE_TEMPLATE_THRESHOLD', 0)
+# While the assistant is talking, a wake word only counts when it is this many
+# times louder than the assistant's own voice at the microphone
+WAKE_ECHO_MARGIN = env_float('MIA_WAKE_ECHO_MARGIN', 2.0)
+PORCUPINE_ACCESS_KEY = env_str('PICOVOICE_ACCESS_KEY')
+PORCUPINE_KEYWORD_PATH = env_str('MIA_PORCUPINE_KEYWORD')
+PORCUPINE_SENSITIVITY = env_float('MIA_PORCUPINE_SENSITIVITY', 0.6)
+
+# Always-on wake loop: sleep between checks of the buffered audio, longer the
+# longer it stays quiet (MIA_LISTEN_MAX_POLL caps the extra delay before a wake
+# word is noticed), back off exponentially on recognition errors and re-measure
+# the noise floor every MIA_RECALIBRATE_EVERY seconds while idle
+LISTEN_ADAPTIVE = env_bool('MIA_LISTEN_ADAPTIVE', True)
+LISTEN_MIN_POLL = env_float('MIA_LISTEN_MIN_POLL', 0.1)
+LISTEN_MAX_POLL = env_float('MIA_LISTEN_MAX_POLL', 1.0)
+LISTEN_MAX_BACKOFF = env_float('MIA_LISTEN_MAX_BACKOFF', 30)
+RECALIBRATE_EVERY = env_float('MIA_RECALIBRATE_EVERY', 300)
+
+# Speech to text: "google" (online), "vosk" or "whisper" (local, on the CPU)
+ASR_ENGINE = env_str('MIA_ASR_ENGINE', 'google')
+ASR_LANGUAGE = env_str('MIA_ASR_LANGUAGE', 'en-US')
+VOSK_MODEL_PATH = Path(env_str('MIA_VOSK_MODEL', DATA_DIR / "vosk-model"))
+WHISPER_MODEL = env_str('MIA_WHISPER_MODEL', 'base.en')
+WHISPER_COMPUTE_TYPE = env_str('MIA_WHISPER_COMPUTE_TYPE', 'int8')
+
+# Clean up recorded commands before recognition: trim silence, resample to
+# 16 kHz mono, suppress steady background noise (profiled during calibration)
+# and level the volume
+PREPROCESS = env_bool('MIA_PREPROCESS', True)
+PREPROCESS_NOISE_GATE = env_bool('MIA_PREPROCESS_NOISE_GATE', True)
+PREPROCESS_TARGET_DBFS = env_float('MIA_PREPROCESS_TARGET_DBFS', -20)
+
+# Gemini model used for every request
+GEMINI_MODEL = env_str('MIA_GEMINI_MODEL', 'gemini-2.5-flash')
+
+# Static rules go in a system instruction, cached server-side when it is long
+# enough for the API to accept (Gemini's minimum is about 1024 tokens)
+PROMPT_CACHE = env_bool('MIA_PROMPT_CACHE', True)
+PROMPT_CACHE_MIN_TOKENS = env_int('MIA_PROMPT_CACHE_MIN_TOKENS', 1024)
+PROMPT_CACHE_TTL = env_int('MIA_PROMPT_CACHE_TTL', 3600)
+# Extra attempts when a reply doesn't match the response schema
+REPLY_RETRIES = env_int('MIA_REPLY_RETRIES', 1)
+
+# Gemini calls give up when no reply has started within the deadline; transient
+# failures are retried with jittered backoff until then. Past the fallback budget
+# the lighter model is raced in. Hedging sends a duplicate request once the
+# recent p95 time to first output passes (MIA_LLM_HEDGE_AFTER until known).
+LLM_DEADLINE = env_float('MIA_LLM_DEADLINE', 20)
+LLM_RETRIES = env_int('MIA_LLM_RETRIES', 3)
+LLM_FALLBACK_MODEL = env_str('MIA_LLM_FALLBACK_MODEL', 'gemini-2.5-flash-lite')
+LLM_FALLBACK_AFTER = env_float('MIA_LLM_FALLBACK_AFTER', 5)
+LLM_HEDGE = env_bool('MIA_LLM_HEDGE', False)
+LLM_HEDGE_AFTER = env_float('MIA_LLM_HEDGE_AFTER', 2)
+
+# Stream Gemini replies into the chat and speak them sentence by sentence
+STREAMING = env_bool('MIA_STREAMING', True)
+
+# Ask Gemini on a partial transcript that has stopped changing while the user is
+# still talking (streaming ASR engines only); the reply is used if the final
+# transcript matches, otherwise the request is cancelled and sent again
+SPECULATE = env_bool('MIA_SPECULATE', True)
+SPECULATE_STABLE_SECONDS = env_float('MIA_SPECULATE_STABLE_SECONDS', 0.3)
+SPECULATE_MIN_WORDS = env_int('MIA_SPECULATE_MIN_WORDS', 2)
+SPECULATE_MAX_REQUESTS = env_int('MIA_SPECULATE_MAX_REQUESTS', 3)
+
+# Conversation history sent with each request
+MEMORY_TOKEN_BUDGET = env_int('MIA_MEMORY_TOKENS', 1500)
+MEMORY_PERSIST = env_bool('MIA_MEMORY_PERSIST', False)
+
+# Local cache of commands that already ran successfully
+INTENT_CACHE = env_bool('MIA_INTENT_CACHE', True)
+INTENT_CACHE_SIZE = env_int('MIA_INTENT_CACHE_SIZE', 500)
+INTENT_CACHE_TTL = env_int('MIA_INTENT_CACHE_TTL', 7 * 24 * 3600)
+
+# Common requests (open a URL, folder or app, the time, volume) run as Python
+# handlers in actions.py instead of a shell; off sends everything to the shell
+ACTIONS = env_bool('MIA_ACTIONS', True)
+
+# Shell commands suggested by the model
+COMMAND_TIMEOUT = env_float('MIA_COMMAND_TIMEOUT', 30)
+COMMAND_MAX_CONCURRENT = env_int('MIA_COMMAND_MAX_CONCURRENT', 2)
+COMMAND_KILL_ON_TIMEOUT = env_bool('MIA_COMMAND_KILL_ON_TIMEOUT', False)
+# Timed-out commands left running at once; past this they are killed
+COMMAND_MAX_DETACHED = env_int('MIA_COMMAND_MAX_DETACHED', 4)
+
+# Chat history: everything goes to disk, only the newest messages stay in the window
+TRANSCRIPT = env_bool('MIA_TRANSCRIPT', True)
+CHAT_MAX_MESSAGES = env_int('MIA_CHAT_MAX_MESSAGES', 200)
+
+# Point the Gemini client somewhere else, e.g. the local stub in benchmarks/gemini_stub.py
+GEMINI_BASE_URL = env_str('MIA_GEMINI_BASE_URL')
+
+# server.py: many sessions sharing one process and one Gemini client
+SERVER_HOST = env_str('MIA_SERVER_HOST', '127.0.0.1')
+SERVER_PORT = env_int('MIA_SERVER_PORT', 8080)
+SERVER_LLM_CONCURRENCY = env_int('MIA_SERVER_LLM_CONCURRENCY', 16)
+SERVER_MAX_QUEUE = env_int('MIA_SERVER_MAX_QUEUE', 512)
+SERVER_MAX_SESSIONS = env_int('MIA_SERVER_MAX_SESSIONS', 5000)
+SERVER_SESSION_IDLE = env_int('MIA_SERVER_SESSION_IDLE', 30 * 60)
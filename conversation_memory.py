@@ -0,0 +1,120 @@
+import json
+import threading
+from pathlib import Path
+
+import config
+import json_file
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for Gemini)"""
+    return len(text) // 4 + 1
+
+
+def turn_text(content):
+    """Compact text for a turn; replies are kept as the JSON the model produced"""
+    if isinstance(content, dict):
+        return json.dumps(content, ensure_ascii=False, separators=(',', ':'))
+    return str(content)
+
+
+def extractive_summary(summary, turns, max_tokens):
+    """Default summarizer: one short line per folded turn, oldest lines dropped first"""
+    lines = summary.splitlines() if summary else []
+    for turn in turns:
+        speaker = "User" if turn['role'] == 'user' else "Mia Bhai"
+        text = " ".join(turn['text'].split())
+        lines.append(f"{speaker}: {text[:117] + '...' if len(text) > 120 else text}")
+    while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ConversationMemory:
+    """Conversation history kept under a token budget.
+
+    Recent turns are sent to the model as structured user/model turns; once the
+    budget is exceeded the oldest turns are folded into a rolling summary.
+    Optionally persisted to a JSON file so a conversation survives restarts.
+    """
+
+    def __init__(self, token_budget=1500, summary_budget=300, min_recent=2,
+                 max_turn_chars=2000, path=None, summarizer=None):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.min_recent = min_recent
+        self.max_turn_chars = max_turn_chars
+        self.path = Path(path) if path else None
+        self.summarizer = summarizer or extractive_summary
+        self.summary = ""
+        self.turns = []
+        self.total_turns = 0
+        self.lock = threading.Lock()
+        if self.path and self.path.exists():
+            self.load()
+
+    def add(self, role, content):
+        """Record a turn; role is 'user' or 'model'"""
+        text = turn_text(content)[:self.max_turn_chars]
+        with self.lock:
+            self.turns.append({'role': role, 'text': text})
+            self.total_turns += 1
+            self._fold()
+            snapshot = self._snapshot() if self.path else None
+        if snapshot:
+            self._write(snapshot)
+
+    def tokens(self):
+        return estimate_tokens(self.summary) + sum(estimate_tokens(t['text']) for t in self.turns)
+
+    def _fold(self):
+        """Move the oldest turns into the summary until the history fits the budget"""
+        folded = []
+        while self.tokens() - estimate_tokens(self.summary) > self.token_budget - self.summary_budget \
+                and len(self.turns) > self.min_recent:
+            folded.append(self.turns.pop(0))
+        if folded:
+            self.summary = self.summarizer(self.summary, folded, self.summary_budget)
+
+    def contents(self, prompt):
+        """Gemini ``contents``: summary and recent turns, then the new prompt as the last user turn"""
+        with self.lock:
+            turns = list(self.turns)
+            summary = self.summary
+
+        contents = []
+        if summary:
+            contents.append({'role': 'user', 'parts': [{'text': f"Summary of our earlier conversation:\n{summary}"}]})
+            contents.append({'role': 'model', 'parts': [{'text': "Noted."}]})
+        for turn in turns:
+            contents.append({'role': turn['role'], 'parts': [{'text': turn['text']}]})
+        contents.append({'role': 'user', 'parts': [{'text': prompt}]})
+        return contents
+
+    def _snapshot(self):
+        return {'summary': self.summary, 'turns': list(self.turns), 'total_turns': self.total_turns}
+
+    def _write(self, snapshot):
+        """Atomically replace the memory file"""
+        try:
+            json_file.write(self.path, snapshot)
+        except OSError as e:
+            print(f"Could not save conversation memory: {e}")
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            print(f"Could not load conversation memory: {e}")
+            return
+        with self.lock:
+            self.summary = data.get('summary', "")
+            self.turns = data.get('turns', [])
+            self.total_turns = data.get('total_turns', len(self.turns))
+            self._fold()
+
+
+def from_config(name):
+    """Memory sized and (optionally) persisted according to the environment"""
+    path = config.DATA_DIR / f"{name}_memory.json" if config.MEMORY_PERSIST else None
+    return ConversationMemory(token_budget=config.MEMORY_TOKEN_BUDGET, path=path)
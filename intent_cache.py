@@ -0,0 +1,216 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import config
+import json_file
+
+_FILLER_WORDS = {
+    'please', 'pls', 'plz', 'can', 'could', 'would', 'you', 'will', 'kindly', 'just',
+    'mia', 'miya', 'bhai', 'hey', 'ok', 'okay', 'for', 'me', 'the', 'an',
+}
+_INFLECTIONS = ('ing', 'ed', 'es', 's', 'e')
+
+
+def normalize(utterance):
+    """Lowercase, drop sentence punctuation and filler words so close phrasings share a key.
+
+    Punctuation inside a word is kept, so file names, paths and names like
+    ``notepad++`` stay distinct.
+    """
+    words = [w.strip(".,!?;:\"'()") for w in utterance.lower().split()]
+    words = [w for w in words if w]
+    kept = [w for w in words if w not in _FILLER_WORDS]
+    return " ".join(kept or words)
+
+
+def _stem(word):
+    for suffix in _INFLECTIONS:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def signature(text):
+    """What a normalized utterance must share with a cached one to reuse its command.
+
+    The words have to be the same; only the leading verb may be inflected
+    differently ("opening notepad" for "open notepad"). None when the text has
+    literal arguments (file names, paths, symbols), which only match exactly.
+    """
+    words = text.split()
+    if not words or re.search(r"[^\w\s']", text):
+        return None
+    return (_stem(words[0]),) + tuple(words[1:])
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Jaccard similarity of character trigram sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class IntentCache:
+    """LRU + TTL cache of validated command replies, keyed by normalized utterance and OS.
+
+    Exact matches are a dict lookup; near matches go through a trigram inverted
+    index so only entries sharing trigrams with the query are scored, and are
+    only used when their words are the same (see ``signature``).
+    """
+
+    def __init__(self, max_entries=500, ttl=7 * 24 * 3600, min_similarity=0.5, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.min_similarity = min_similarity
+        self.path = Path(path) if path else None
+        self.entries = OrderedDict()  # key -> {'result', 'stored', 'grams'}
+        self.index = {}  # trigram -> set of keys
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'fuzzy_hits': 0, 'misses': 0, 'expired': 0, 'stores': 0}
+        if self.path and self.path.exists():
+            self.load()
+
+    @staticmethod
+    def make_key(utterance, operating_system):
+        return f"{operating_system}|{normalize(utterance)}"
+
+    def get(self, utterance, operating_system):
+        """Return a cached command result, or None"""
+        key = self.make_key(utterance, operating_system)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and self._expired(entry, now):
+                self._remove(key)
+                self.stats['expired'] += 1
+                entry = None
+            if entry:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return dict(entry['result'])
+
+            match = self._fuzzy_match(key, now)
+            if match:
+                self.entries.move_to_end(match)
+                self.stats['fuzzy_hits'] += 1
+                return dict(self.entries[match]['result'])
+
+            self.stats['misses'] += 1
+            return None
+
+    def _fuzzy_match(self, key, now):
+        prefix, text = key.split("|", 1)
+        wanted = signature(text)
+        if wanted is None:
+            return None
+        grams = trigrams(text)
+        candidates = set()
+        for gram in grams:
+            candidates |= self.index.get(gram, set())
+
+        best, best_score = None, self.min_similarity
+        for candidate in candidates:
+            if not candidate.startswith(prefix + "|"):
+                continue
+            # Similar spelling isn't enough: "volume" vs "volume up", "folder" vs "folders"
+            if signature(candidate.split("|", 1)[1]) != wanted:
+                continue
+            entry = self.entries[candidate]
+            if self._expired(entry, now):
+                continue
+            score = similarity(grams, entry['grams'])
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def put(self, utterance, operating_system, result):
+        """Remember a command or action reply that has already run successfully"""
+        if result.get('type') == 'command' and result.get('command'):
+            entry = {'type': 'command', 'command': result['command']}
+        elif result.get('type') == 'action' and result.get('action'):
+            entry = {'type': 'action', 'action': result['action'], 'args': result.get('args') or {},
+                     'command': result.get('command', '')}
+        else:
+            return
+        entry['fail_audio'] = result.get('fail_audio', 'Command failed')
+        key = self.make_key(utterance, operating_system)
+        with self.lock:
+            self._insert(key, entry, time.time())
+            self.stats['stores'] += 1
+            snapshot = self._snapshot() if self.path else None
+        if snapshot:
+            self._write(snapshot)
+
+    def _insert(self, key, result, stored):
+        if key in self.entries:
+            self._remove(key)
+        grams = trigrams(key.split("|", 1)[1])
+        self.entries[key] = {'result': result, 'stored': stored, 'grams': grams}
+        for gram in grams:
+            self.index.setdefault(gram, set()).add(key)
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        for gram in entry['grams']:
+            keys = self.index.get(gram)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self.index[gram]
+
+    def _expired(self, entry, now):
+        return self.ttl and now - entry['stored'] > self.ttl
+
+    def invalidate(self, utterance, operating_system):
+        """Forget an entry, e.g. when a cached command stops working"""
+        key = self.make_key(utterance, operating_system)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            snapshot = self._snapshot() if self.path else None
+        if snapshot:
+            self._write(snapshot)
+
+    def _snapshot(self):
+        return [[key, entry['result'], entry['stored']] for key, entry in self.entries.items()]
+
+    def _write(self, snapshot):
+        try:
+            json_file.write(self.path, snapshot)
+        except OSError as e:
+            print(f"Could not save intent cache: {e}")
+
+    def load(self):
+        try:
+            snapshot = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            print(f"Could not load intent cache: {e}")
+            return
+        now = time.time()
+        with self.lock:
+            for key, result, stored in snapshot:
+                if not (self.ttl and now - stored > self.ttl):
+                    self._insert(key, result, stored)
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['fuzzy_hits'] + self.stats['misses']
+        return (self.stats['hits'] + self.stats['fuzzy_hits']) / lookups if lookups else 0.0
+
+
+def from_config():
+    """Intent cache sized and stored according to the environment"""
+    if not config.INTENT_CACHE:
+        return None
+    return IntentCache(max_entries=config.INTENT_CACHE_SIZE, ttl=config.INTENT_CACHE_TTL,
+                       path=config.DATA_DIR / "intent_cache.json")
@@ -0,0 +1,26 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+
+def write(path, data):
+    """Atomically replace ``path`` with ``data`` as JSON; raises OSError when it can't.
+
+    Every save goes through its own temporary file next to the target, so two
+    threads saving at once can't write into the same half-finished file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=path.parent, prefix=path.name + '.',
+                                      suffix='.tmp', delete=False)
+    try:
+        with tmp:
+            json.dump(data, tmp, ensure_ascii=False)
+        os.replace(tmp.name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp.name)
+        except OSError:
+            pass
+        raise
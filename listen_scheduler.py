@@ -0,0 +1,176 @@
+import random
+import threading
+import time
+
+import config
+
+
+class ListenScheduler:
+    """Paces the always-on wake loop by the noise floor and what it has heard lately.
+
+    Between checks the wake thread sleeps ``poll`` seconds; the ring buffer keeps
+    the audio meanwhile, so nothing is lost, it is only looked at later. Each
+    quiet check doubles the poll from ``min_poll`` up to ``max_poll`` and any
+    sound drops it back. Failed recognition backs off exponentially with jitter
+    up to ``max_backoff``. Phrases sent for recognition that held no wake word
+    raise the wake threshold a step at a time; the raise fades with a
+    ``raise_half_life`` and is dropped after ``max_raised`` seconds however
+    busy the room stays, so background talk can't leave it deaf. ``wait_for_recalibration``
+    tells the background recalibration when the noise floor should be measured
+    again. With ``adaptive`` off it listens continuously like before and only
+    keeps the counters.
+    """
+
+    def __init__(self, energy_threshold=300, adaptive=True, min_poll=0.1, max_poll=1.0, max_backoff=30.0,
+                 recalibrate_every=300.0, min_threshold=300, false_trigger_step=1.25, max_raise=4.0,
+                 raise_half_life=30.0, max_raised=120.0):
+        self.adaptive = adaptive
+        self.min_poll = min_poll if adaptive else 0.0
+        self.max_poll = max_poll if adaptive else 0.0
+        self.max_backoff = max_backoff
+        self.recalibrate_every = recalibrate_every if adaptive else 0.0
+        self.min_threshold = min_threshold
+        self.false_trigger_step = false_trigger_step
+        self.max_raise = max_raise
+        self.raise_half_life = raise_half_life
+        self.max_raised = max_raised
+        self.baseline = max(min_threshold, energy_threshold)
+        self.raised = 1.0
+        self.raised_at = self.raised_since = 0.0
+        self.poll = self.min_poll
+        self.errors = 0
+        self.failed_at = 0.0
+        self.started = self.calibrated_at = time.monotonic()
+        self.thread_cpu = None
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        self.stats = {'checks': 0, 'slept_s': 0.0, 'cpu_s': 0.0, 'recognitions': 0, 'recognition_errors': 0,
+                      'false_triggers': 0, 'wakes': 0, 'recalibrations': 0}
+
+    @property
+    def energy_threshold(self):
+        """Loudness a sound needs to be worth sending for wake word recognition"""
+        return self.baseline * self._raise(time.monotonic())
+
+    def _raise(self, now):
+        """The false-trigger raise as it stands now, faded since it was last bumped"""
+        if self.raised == 1.0 or now - self.raised_since >= self.max_raised:
+            return 1.0
+        return 1.0 + (self.raised - 1.0) * 0.5 ** ((now - self.raised_at) / self.raise_half_life)
+
+    def calibrated(self, measured, max_rise=None):
+        """Take a new noise measurement; returns the threshold for capturing commands.
+
+        ``max_rise`` limits how far one measurement can lift the threshold, so
+        someone talking during a background recalibration can't deafen the loop.
+        """
+        with self.lock:
+            if max_rise:
+                measured = min(measured, self.baseline * max_rise)
+            self.baseline = max(self.min_threshold, measured)
+            self.raised = 1.0
+            self.calibrated_at = time.monotonic()
+            self.stats['recalibrations'] += 1
+            return self.baseline
+
+    def wait(self, seconds):
+        """Sleep on the wake thread; False once the scheduler is closed"""
+        if seconds > 0:
+            self.stopped.wait(seconds)
+            with self.lock:
+                self.stats['slept_s'] += seconds
+        return not self.stopped.is_set()
+
+    def tick(self):
+        """Called by the wake thread once per check, to count it and its CPU time"""
+        now = time.thread_time()
+        with self.lock:
+            if self.thread_cpu is not None:
+                self.stats['cpu_s'] += now - self.thread_cpu
+            self.thread_cpu = now
+            self.stats['checks'] += 1
+
+    def idle(self):
+        """A check found nothing worth listening to"""
+        self.poll = min(self.max_poll, max(self.min_poll, self.poll * 2))
+
+    def heard(self):
+        """Something loud came in; check often again"""
+        self.poll = self.min_poll
+
+    def recognized(self, woke):
+        """A phrase went to the recognizer and came back (``woke``: it held the wake word)"""
+        self.errors = 0
+        with self.lock:
+            self.stats['recognitions'] += 1
+            if woke:
+                self.stats['wakes'] += 1
+                self.raised = 1.0
+            else:
+                self.stats['false_triggers'] += 1
+                if self.adaptive:
+                    now = time.monotonic()
+                    current = self._raise(now)
+                    if current == 1.0:
+                        self.raised_since = now
+                    self.raised = min(self.max_raise, current * self.false_trigger_step)
+                    self.raised_at = now
+
+    def failed(self, recognition=True):
+        """Seconds to back off after an error (``recognition``: it was a recognizer call)"""
+        now = time.monotonic()
+        # Errors in a row back off further; one long after the last starts over
+        if now - self.failed_at > 2 * self.max_backoff:
+            self.errors = 0
+        self.errors += 1
+        self.failed_at = now
+        with self.lock:
+            if recognition:
+                self.stats['recognitions'] += 1
+                self.stats['recognition_errors'] += 1
+        if not self.adaptive:
+            return 1.0
+        return min(self.max_backoff, 2 ** (self.errors - 1)) * random.uniform(0.5, 1.0)
+
+    def wait_for_recalibration(self):
+        """Block until the noise floor is due to be measured again; False once closed (or never due)"""
+        while self.recalibrate_every and not self.stopped.is_set():
+            remaining = self.calibrated_at + self.recalibrate_every - time.monotonic()
+            if remaining <= 0:
+                return True
+            self.stopped.wait(remaining)
+        return False
+
+    def defer_recalibration(self, seconds):
+        """Try again in ``seconds``, e.g. while the user is talking to the assistant"""
+        self.calibrated_at = time.monotonic() - self.recalibrate_every + seconds
+
+    def close(self):
+        self.stopped.set()
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        elapsed = time.monotonic() - self.started
+        stats['elapsed_s'] = elapsed
+        # Share of the time the wake thread was listening rather than asleep
+        stats['duty_cycle'] = max(0.0, 1 - stats['slept_s'] / elapsed) if elapsed else 1.0
+        stats['cpu_share'] = stats['cpu_s'] / elapsed if elapsed else 0.0
+        stats['recognitions_per_min'] = stats['recognitions'] * 60 / elapsed if elapsed else 0.0
+        stats['energy_threshold'] = round(self.energy_threshold)
+        stats['poll_s'] = self.poll
+        return stats
+
+    def summary(self):
+        stats = self.snapshot()
+        return (f"👂 Listening: awake {stats['duty_cycle']:.0%} of the time, wake thread CPU "
+                f"{stats['cpu_share']:.1%}, {stats['recognitions_per_min']:.1f} recognition calls/min "
+                f"({stats['recognition_errors']} failed, {stats['false_triggers']} without the wake word), "
+                f"{stats['recalibrations']} calibrations, threshold {stats['energy_threshold']}")
+
+
+def from_config(energy_threshold=300):
+    """Scheduler starting from the last known threshold; MIA_LISTEN_ADAPTIVE=0 listens continuously"""
+    return ListenScheduler(energy_threshold, adaptive=config.LISTEN_ADAPTIVE, min_poll=config.LISTEN_MIN_POLL,
+                           max_poll=config.LISTEN_MAX_POLL, max_backoff=config.LISTEN_MAX_BACKOFF,
+                           recalibrate_every=config.RECALIBRATE_EVERY)
@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import config
+import llm_stream
+import tracing
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def shared_client(api_key=None, max_connections=None):
+    """One kept-alive Gemini client per API key for the whole process"""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = llm_stream.create_client(api_key, max_connections=max_connections)
+        return client
+
+
+class LlmTimeout(Exception):
+    """No reply started before the deadline"""
+
+
+def is_transient(error):
+    """Errors worth retrying: rate limits, server errors and dropped connections"""
+    try:
+        import httpx
+        from google.genai import errors
+    except ImportError:
+        return False
+    if isinstance(error, errors.APIError):
+        return error.code in (408, 429) or error.code >= 500
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+class _Race:
+    """Attempts at the same request; the first to produce output wins and the rest stop"""
+
+    def __init__(self, should_stop=None):
+        self.should_stop = should_stop
+        self.cond = threading.Condition()
+        self.winner = None
+        self.done = {}  # attempt -> (result, error)
+        self.abandoned = False
+
+    def claim(self, attempt):
+        with self.cond:
+            if self.winner is None and not self.abandoned:
+                self.winner = attempt
+                self.cond.notify_all()
+            return self.winner == attempt
+
+    def stopper(self, attempt):
+        """should_stop for one attempt: the caller's, or another attempt got there first"""
+        def should_stop():
+            if self.should_stop and self.should_stop():
+                return True
+            return not self.claim(attempt)
+        return should_stop
+
+    def finish(self, attempt, result=None, error=None):
+        if error is None:
+            self.claim(attempt)  # a non-streaming reply arrives all at once
+        with self.cond:
+            self.done[attempt] = (result, error)
+            self.cond.notify_all()
+
+
+class ResilientCaller:
+    """Runs Gemini requests with deadline-aware retries, optional hedging and a lighter fallback model.
+
+    ``call(request)`` invokes ``request(model, should_stop)``, which must poll
+    ``should_stop`` once output starts (stream_reply does) and return
+    ``(result, timings)``. Within one attempt a duplicate request is sent
+    after the recent p95 time to first output when hedging is on, and the
+    fallback model is raced in once ``fallback_after`` passes without output;
+    whichever answers first is used. Failed attempts are retried with jittered
+    exponential backoff (tenacity) until ``deadline``, switching to the
+    fallback model once the budget is spent. Output already handed to the
+    caller is never retried.
+    """
+
+    def __init__(self, model=None, fallback_model=None, deadline=20.0, retries=3, hedge=False,
+                 hedge_after=2.0, fallback_after=5.0, window=200):
+        self.model = model or config.GEMINI_MODEL
+        self.fallback_model = fallback_model if fallback_model != self.model else None
+        self.deadline = deadline
+        self.retries = retries
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.fallback_after = fallback_after
+        self.latencies = deque(maxlen=window)  # seconds to first output of winning attempts
+        self.lock = threading.Lock()
+        self.stats = {'calls': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0, 'fallbacks': 0,
+                      'fallback_wins': 0, 'timeouts': 0, 'errors': 0}
+
+    def hedge_delay(self):
+        """Recent p95 time to first output, or the configured delay until there is enough history"""
+        with self.lock:
+            samples = list(self.latencies)
+        if len(samples) < 20:
+            return self.hedge_after
+        return float(np.percentile(samples, 95))
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def call(self, request, should_stop=None):
+        import tenacity
+
+        start = time.monotonic()
+        delivered = []  # set once any attempt started handing output to the caller
+
+        def use_fallback():
+            return bool(self.fallback_model) and time.monotonic() - start >= self.fallback_after
+
+        def attempt():
+            return self._attempt(request, self.fallback_model if use_fallback() else self.model,
+                                 should_stop, start, delivered)
+
+        def before_sleep(state):
+            self._count('retries')
+            print(f"⚠️ Gemini request failed ({state.outcome.exception()}), retrying")
+
+        self._count('calls')
+        retrying = tenacity.Retrying(
+            stop=tenacity.stop_after_attempt(self.retries + 1) | tenacity.stop_after_delay(self.deadline),
+            wait=tenacity.wait_random_exponential(multiplier=0.25, max=4),
+            retry=tenacity.retry_if_exception(lambda e: not delivered and is_transient(e)),
+            before_sleep=before_sleep,
+            reraise=True,
+        )
+        try:
+            return retrying(attempt)
+        except LlmTimeout:
+            self._count('timeouts')
+            raise
+        except Exception:
+            self._count('errors')
+            raise
+
+    def _attempt(self, request, model, should_stop, call_start, delivered):
+        race = _Race(should_stop)
+        started = time.monotonic()
+        deadline = call_start + self.deadline
+        models = {}
+
+        def launch(model):
+            index = len(models)
+            models[index] = model
+
+            def run():
+                try:
+                    result = request(model, race.stopper(index))
+                except Exception as e:
+                    race.finish(index, error=e)
+                else:
+                    race.finish(index, result)
+            threading.Thread(target=run, name=f"llm-attempt-{index}", daemon=True).start()
+
+        launch(model)
+        hedge_at = started + self.hedge_delay() if self.hedge else None
+        fallback_at = None
+        if self.fallback_model and model != self.fallback_model:
+            fallback_at = call_start + self.fallback_after
+
+        with race.cond:
+            while race.winner is None:
+                now = time.monotonic()
+                if len(race.done) == len(models) and race.done:
+                    # Everything sent so far failed before any output; let the retry policy decide
+                    raise race.done[max(race.done)][1]
+                if now >= deadline:
+                    race.abandoned = True
+                    raise LlmTimeout(f"no reply within {self.deadline:.0f}s")
+                if hedge_at and now >= hedge_at:
+                    hedge_at = None
+                    self._count('hedges')
+                    launch(model)
+                    continue
+                if fallback_at and now >= fallback_at:
+                    fallback_at = None
+                    self._count('fallbacks')
+                    launch(self.fallback_model)
+                    continue
+                wake = min(t for t in (deadline, hedge_at, fallback_at) if t)
+                race.cond.wait(wake - now)
+
+            winner = race.winner
+            delivered.append(winner)
+            first_output = time.monotonic() - started
+            while winner not in race.done:
+                race.cond.wait()
+            result, error = race.done[winner]
+
+        with self.lock:
+            self.latencies.append(first_output)
+        if winner:
+            self._count('fallback_wins' if models[winner] == self.fallback_model else 'hedge_wins')
+            tracing.record('llm.hedged', first_output, model=models[winner])
+        if error is not None:
+            raise error
+        reply, timings = result
+        timings['model'] = models[winner]
+        return reply, timings
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats['hedge_after_s'] = round(self.hedge_delay(), 3)
+        return stats
+
+
+def from_config(model=None):
+    return ResilientCaller(model=model, fallback_model=config.LLM_FALLBACK_MODEL or None,
+                           deadline=config.LLM_DEADLINE, retries=config.LLM_RETRIES, hedge=config.LLM_HEDGE,
+                           hedge_after=config.LLM_HEDGE_AFTER, fallback_after=config.LLM_FALLBACK_AFTER)
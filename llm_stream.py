@@ -0,0 +1,221 @@
+import json
+import os
+import re
+import time
+
+import config
+import tracing
+
+_CONTENT_KEY = re.compile(r'"content"\s*:\s*"')
+_TYPE_KEY = re.compile(r'"type"\s*:\s*"(\w+)"')
+# Replies that run something rather than say something; their content isn't shown or spoken
+_SILENT_TYPES = ('command', 'action')
+_SENTENCE_END = re.compile(r'[.!?।]+["\')\]]*\s+')
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def strip_code_fence(text):
+    """Remove a ```json ... ``` wrapper the model sometimes adds"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+
+class ReplyError(ValueError):
+    """The model's reply is not the JSON object the prompt asked for"""
+
+
+def parse_reply(text, strict=False):
+    """Parse the model's JSON reply, falling back to treating it as plain content.
+
+    With ``strict`` anything but a JSON object raises ReplyError instead.
+    """
+    try:
+        result = json.loads(strip_code_fence(text))
+        if isinstance(result, dict):
+            return result
+    except ValueError:
+        pass
+    if strict:
+        raise ReplyError(f"not a JSON object: {text[:80]!r}")
+    return {"type": "response", "content": text}
+
+
+class StreamingReplyParser:
+    """Incrementally decodes the "content" string of a streamed JSON reply.
+
+    ``feed`` returns only the newly decoded content characters, so they can be
+    shown and spoken while the rest of the reply is still arriving. Replies that
+    are not JSON at all are streamed through verbatim.
+    """
+
+    def __init__(self):
+        self.raw = ""
+        self.mode = None  # None until decided, then "json" or "text"
+        self.reply_type = None
+        self.content_pos = None  # index in raw where undecoded content begins
+        self.content_done = False
+
+    def feed(self, chunk):
+        self.raw += chunk
+        if self.mode is None:
+            head = self.raw.lstrip()
+            if not head or (head.startswith("`") and "\n" not in head):
+                return ""
+            self.mode = "json" if head.startswith(("{", "```")) else "text"
+            if self.mode == "text":
+                return self.raw
+        if self.mode == "text":
+            return chunk
+
+        if self.reply_type is None:
+            match = _TYPE_KEY.search(self.raw)
+            if match:
+                self.reply_type = match.group(1)
+        if self.content_pos is None:
+            match = _CONTENT_KEY.search(self.raw)
+            if not match:
+                return ""
+            self.content_pos = match.end()
+        if self.content_done:
+            return ""
+        return self._decode()
+
+    def _decode(self):
+        """Decode as much of the JSON string as is complete"""
+        out = []
+        raw, i = self.raw, self.content_pos
+        while i < len(raw):
+            ch = raw[i]
+            if ch == '"':
+                self.content_done = True
+                i += 1
+                break
+            if ch != '\\':
+                out.append(ch)
+                i += 1
+                continue
+            # Escape sequences may be split across chunks; wait for the rest
+            if i + 1 >= len(raw):
+                break
+            code = raw[i + 1]
+            if code == 'u':
+                if i + 6 > len(raw):
+                    break
+                out.append(chr(int(raw[i + 2:i + 6], 16)))
+                i += 6
+            else:
+                out.append(_ESCAPES.get(code, code))
+                i += 2
+        self.content_pos = i
+        return "".join(out)
+
+    def result(self, strict=False):
+        """Final parsed reply once the stream is finished"""
+        return parse_reply(self.raw, strict)
+
+
+class SentenceSplitter:
+    """Buffers streamed text and releases it one complete sentence at a time"""
+
+    def __init__(self, min_length=12):
+        self.min_length = min_length
+        self.pending = ""
+
+    def feed(self, text):
+        self.pending += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self.pending):
+            # Keep very short fragments ("e.g. ", "1. ") attached to what follows
+            if match.end() - start < self.min_length:
+                continue
+            sentences.append(self.pending[start:match.end()].strip())
+            start = match.end()
+        self.pending = self.pending[start:]
+        return sentences
+
+    def flush(self):
+        rest, self.pending = self.pending.strip(), ""
+        return [rest] if rest else []
+
+
+def create_client(api_key=None, max_connections=None):
+    """Gemini client, sent to ``MIA_GEMINI_BASE_URL`` instead of Google when that is set.
+
+    ``max_connections`` sizes the keep-alive pool for callers that share one
+    client across many threads.
+    """
+    from google import genai
+
+    options = {}
+    if config.GEMINI_BASE_URL:
+        options['base_url'] = config.GEMINI_BASE_URL
+    if max_connections:
+        import httpx
+        options['client_args'] = {'limits': httpx.Limits(max_connections=max_connections,
+                                                         max_keepalive_connections=max_connections)}
+    kwargs = {'http_options': genai.types.HttpOptions(**options)} if options else {}
+    return genai.Client(api_key=api_key or os.environ.get('GEMINI_API_KEY'), **kwargs)
+
+
+def stream_reply(client, model, contents, on_text=None, on_sentence=None, config=None, should_stop=None,
+                 strict=False):
+    """Stream a Gemini reply, pushing content text and whole sentences to callbacks.
+
+    Returns ``(result, timings)`` where timings holds seconds from the request to
+    the first token, the first sentence handed to TTS and the end of the stream.
+    ``should_stop`` is polled between chunks so a cancelled turn stops early.
+    ``strict`` makes a reply that isn't JSON raise ReplyError, unless it was cut short.
+    """
+    parser = StreamingReplyParser()
+    splitter = SentenceSplitter()
+    timings = {'first_token': None, 'first_audio': None, 'total': None}
+    start = time.perf_counter()
+
+    def emit_sentences(sentences):
+        for sentence in sentences:
+            if timings['first_audio'] is None:
+                timings['first_audio'] = time.perf_counter() - start
+            on_sentence(sentence)
+
+    kwargs = {'config': config} if config is not None else {}
+    stopped = False
+    for chunk in client.models.generate_content_stream(model=model, contents=contents, **kwargs):
+        if should_stop and should_stop():
+            stopped = True
+            break
+        text = chunk.text or ""
+        if not text:
+            continue
+        if timings['first_token'] is None:
+            timings['first_token'] = time.perf_counter() - start
+        delta = parser.feed(text)
+        if delta and parser.reply_type not in _SILENT_TYPES:
+            if on_text:
+                on_text(delta)
+            if on_sentence:
+                emit_sentences(splitter.feed(delta))
+
+    if on_sentence and parser.reply_type not in _SILENT_TYPES:
+        emit_sentences(splitter.flush())
+    timings['total'] = time.perf_counter() - start
+    if timings['first_token'] is not None:
+        tracing.record('llm.first_token', timings['first_token'])
+    if timings['first_audio'] is not None:
+        tracing.record('llm.first_audio', timings['first_audio'])
+    with tracing.span('llm.parse'):
+        result = parser.result(strict and not stopped)
+    return result, timings
+
+
+def format_timings(timings):
+    """One-line summary of stream_reply timings"""
+    parts = []
+    for key, label in (('first_token', 'first token'), ('first_audio', 'first audio'), ('total', 'total')):
+        if timings.get(key) is not None:
+            parts.append(f"{label} {timings[key]:.2f}s")
+    return "⏱️ " + ", ".join(parts)
@@ -1,7 +1,14 @@
-from google import genai
-import json
-import os
+import time
+import argparse
 from dotenv import load_dotenv
+import llm_stream
+import llm_client
+import config
+import prompts
+import conversation_memory
+import command_executor
+import actions
+import tracing
 
 import platform
 
@@ -9,55 +16,89 @@ operating_system = platform.platform()
 
 load_dotenv()
 
-conversation_history = []
 
-
-while True:
-
-    user_command  = input('What to do: ')
-
-    conversation_history.append({'role':'user', 'content':user_command})
-
-
-    client = genai.Client(api_key=os.environ.get('GEMINI_API_KEY'))
-
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=f"""user asked {user_command},
-
-        user have asked to do something and you have to answer the query
-        and if the user have asked to open something that time you just have to provide the commmand to run in the terminal of the {operating_system},
-        and also make sure that if you are giving the command to run in terminal that time the response must not include any single markdown text.
-        also if the user is commanding to do something in the system that time you need to just provide the terminal command in such a way that they get executed directly and this response should also not include any type of single markdown content
-        but make sure that you are returning the dictionary as the response if response is command that time the result must be, all the following stuructures have to follow strictly:
-        "type":"command", "command":"command", "fail_audio":"msg to show if command faild"
-
-        if there is only result as response:
-        "type":"response", "content":"content"
-
-        now there is one more condition and that is
-        is the user prompt is not starting with the 'mia bhai' or it can me 'miya bhai' but you have to understand 'mia bhai' by default that time it should just say 'Mera name Mia bhai! ha to Mia bhai bhi use kro....' else it  must work normally
-        and the response must be in form:
-        "type":"response", "content":"content"
-
-
-
-        one more condition you are also provided with the all the privious conversation history also and all the history is:
-        {conversation_history} so you need to also respond according to that.
-
-        """,
-    )
-
-    result = json.loads(response.text)
-    conversation_history.append({'role':'system', 'content':result})
-
-
-    if result['type'] == 'command':
-        try:
-            os.system(result['command'])
-        except:
-            print(result['fail_audio'])
-        
-    else:
-        print(result['content'])
-        print()
\ No newline at end of file
+def create_prompter(client, operating_system=operating_system, caller=None):
+    """Prompter carrying the terminal assistant's rules for one OS"""
+    return prompts.Prompter(client, prompts.system_instruction(operating_system, require_name=True), caller=caller)
+
+
+def ask(prompter, memory, user_command, on_text=None):
+    """One turn: returns the validated reply dict and the request timings"""
+    contents = memory.contents(user_command)
+    memory.add('user', user_command)
+
+    with tracing.span('main.llm', streaming=config.STREAMING):
+        result, timings = prompter.ask(contents, on_text=on_text)
+    memory.add('model', result)
+    return result, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mia Bhai in the terminal")
+    tracing.add_profile_argument(parser)
+    args = parser.parse_args()
+    if args.profile:
+        tracing.tracer.enable_profile(args.profile)
+
+    memory = conversation_memory.from_config('main')
+    runner = actions.from_config(command_executor.from_config())
+    prompter = create_prompter(llm_client.shared_client())
+
+    try:
+        while True:
+
+            user_command  = input('What to do: ')
+            turn_start = time.perf_counter()
+
+            streamed = []
+            def on_text(delta):
+                streamed.append(delta)
+                print(delta, end='', flush=True)
+
+            try:
+                result, timings = ask(prompter, memory, user_command, on_text=on_text)
+            except llm_stream.ReplyError as e:
+                print(f"\nSorry, the reply could not be understood ({e})\n")
+                continue
+            except Exception as e:
+                # Retries and the fallback model are already used up; keep the session alive
+                print(f"\nSorry, Gemini is not answering right now ({e})\n")
+                continue
+            if streamed:
+                print()
+                print(llm_stream.format_timings(timings))
+                if not timings['streamed']:
+                    # The stream was malformed; this is the retried reply
+                    streamed = []
+
+
+            if result['type'] in ('command', 'action'):
+                def on_exit(outcome, fail_audio=result.get('fail_audio', 'Command failed')):
+                    if not outcome.ok and not outcome.detached:
+                        print(fail_audio)
+                    print(outcome.summary())
+                    if outcome.runtime is not None:
+                        tracing.record('main.execute', outcome.runtime, ok=outcome.ok)
+
+                # Runs in the background so the next question can be asked right away
+                runner.run(result, on_output=lambda stream, line: print(f"  {line}"), on_exit=on_exit)
+
+            elif streamed:
+                print()
+            else:
+                print(result['content'])
+                print()
+
+            tracing.record('main.turn', time.perf_counter() - turn_start)
+    except (KeyboardInterrupt, EOFError):
+        print()
+    finally:
+        if args.profile:
+            print(f"Gemini calls: {prompter.caller.snapshot()}")
+            print(tracing.tracer.summary())
+            print(f"Trace written to {args.profile}")
+            tracing.tracer.close()
+
+
+if __name__ == "__main__":
+    main()
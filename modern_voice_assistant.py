@@ -1,29 +1,66 @@
+import time
+
+# Taken before the other imports so time-to-listening covers them
+STARTED = time.perf_counter()
+
 import tkinter as tk
+import argparse
 from tkinter import ttk
-import speech_recognition as sr
-import pyttsx3
 import threading
-import time
-from google import genai
-import json
 import os
 from dotenv import load_dotenv
 import platform
-import subprocess
-import queue
 import re
 from tkinter import font
+import wake_word
+import asr
+import audio_buffer
+import audio_preprocess
+import llm_stream
+import llm_client
+import prompts
+import config
+import conversation_memory
+import intent_cache
+import listen_scheduler
+import speculation
+import pipeline
+import tts_worker
+import command_executor
+import actions
+import visualizer
+import transcript
+import chat_view
+import tracing
+import startup_profile
 
 # Load environment
 load_dotenv()
 operating_system = platform.platform()
 
+# Audio kept from just before the wake word fired so the command's first syllables survive;
+# local detectors cap it at their detection lag so the capture never starts inside the wake word
+COMMAND_PREROLL_SECONDS = 0.3
+
 class ModernVoiceAssistant:
     def __init__(self):
-        self.conversation_history = []
+        # Noise threshold and TTS voice from the previous start
+        self.profile = startup_profile.from_config()
+        self.memory = conversation_memory.from_config('assistant')
+        self.intent_cache = intent_cache.from_config()
+        self.prompter = None  # built on the first question, once the API key is known
+        self.speculator = speculation.from_config()
+        self.preprocessor = audio_preprocess.from_config()
+        self.scheduler = listen_scheduler.from_config(self.profile.get('energy_threshold', 300))
         self.is_listening = False
         self.is_active = False
         self.is_wake_listening = True
+        self.wake_position = None
+        self.wake_preroll = COMMAND_PREROLL_SECONDS
+        self.echo_guard = None
+        self.pipeline = pipeline.Pipeline()
+        self.executor = command_executor.from_config()
+        self.actions = actions.from_config(self.executor)
         
         # Initialize TTS
         self.setup_tts()
@@ -32,37 +69,122 @@ class ModernVoiceAssistant:
         self.setup_speech_recognition()
         
         self.create_modern_ui()
+        # Worker threads reach Tk only through this channel
+        self.ui = pipeline.UiChannel(self.root)
+        self.ui.start()
+        self.start_pipeline()
         self.start_wake_word_detection()
 
     def setup_tts(self):
-        """Setup Text-to-Speech engine"""
-        try:
-            self.tts_engine = pyttsx3.init()
-            voices = self.tts_engine.getProperty('voices')
+        """Setup Text-to-Speech worker"""
+        self.tts = tts_worker.TtsWorker(self.create_tts_engine,
+                                        cache_dir=config.DATA_DIR / "tts_cache")
+
+        def start():
+            try:
+                self.tts.start()
+            except Exception as e:
+                print(f"TTS setup failed: {e}")
+                self.tts = None
+
+        # Anything said before the engine is up waits in the worker's queue
+        if config.FAST_START:
+            threading.Thread(target=start, name="tts-start", daemon=True).start()
+        else:
+            start()
+
+    def create_tts_engine(self):
+        """Build the pyttsx3 engine (runs on the TTS worker thread that owns it)"""
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        voice_id = self.profile.get('voice_id')
+        if voice_id:
+            try:
+                engine.setProperty('voice', voice_id)
+            except Exception:
+                voice_id = None
+        if not voice_id:
+            # Enumerating voices is slow on some systems, so only do it once
+            voices = engine.getProperty('voices')
             if voices:
                 # Try to set a female voice
                 for voice in voices:
                     if 'female' in voice.name.lower() or 'zira' in voice.name.lower():
-                        self.tts_engine.setProperty('voice', voice.id)
+                        engine.setProperty('voice', voice.id)
                         break
-            self.tts_engine.setProperty('rate', 150)
-            self.tts_engine.setProperty('volume', 0.8)
-        except Exception as e:
-            print(f"TTS setup failed: {e}")
-            self.tts_engine = None
+            self.profile.update(voice_id=engine.getProperty('voice'))
+        engine.setProperty('rate', 150)
+        engine.setProperty('volume', 0.8)
+        return engine
 
     def setup_speech_recognition(self):
         """Setup Speech Recognition"""
         try:
+            import speech_recognition as sr
+
             self.recognizer = sr.Recognizer()
-            self.microphone = sr.Microphone()
-            with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
-            self.recognizer.energy_threshold = 300
-            self.recognizer.dynamic_energy_threshold = True
+            # Last start's calibration until this one's is done
+            self.recognizer.energy_threshold = self.scheduler.baseline
+            # Recalibrated by the listen scheduler instead
+            self.recognizer.dynamic_energy_threshold = False
+            self.wake_detector = wake_word.create_detector()
+            # Capture at the detector's native rate so frames can be fed straight in
+            detector = self.wake_detector or wake_word.WakeWordDetector
+            self.microphone = sr.Microphone(sample_rate=detector.sample_rate,
+                                            chunk_size=detector.frame_length)
+
+            # One long-lived stream feeds wake detection, commands and the visualizer
+            self.capture = audio_buffer.AudioCapture(self.microphone)
+            self.audio = self.capture.start()
+            # Barge-in stays possible, but the assistant's own voice must not wake it
+            self.echo_guard = audio_buffer.EchoGuard(self.audio, self.playback_started,
+                                                     margin=config.WAKE_ECHO_MARGIN)
+
+            calibration = threading.Thread(target=self.calibrate, name="calibrate", daemon=True)
+            calibration.start()
+            # Loaded once and kept warm for every command; in the background when starting fast
+            if config.FAST_START:
+                self.asr = asr.DeferredBackend(lambda: asr.create_backend(recognizer=self.recognizer))
+            else:
+                self.asr = asr.create_backend(recognizer=self.recognizer)
+                calibration.join()
         except Exception as e:
             print(f"Speech recognition setup failed: {e}")
 
+    def playback_started(self):
+        """When the assistant started saying what it is saying now, None while it is quiet"""
+        return self.tts.playback_started() if self.tts else None
+
+    def calibrate(self, span='startup.calibrate', max_rise=None):
+        """Measure background noise from the live stream and keep the threshold for the next start"""
+        noise = []
+        with tracing.span(span):
+            measured = audio_buffer.calibrate_energy_threshold(self.audio.reader(), seconds=1.0,
+                                                               on_frame=noise.append)
+        # A background measurement well above the last floor is someone talking or the TV, not the room
+        steady = max_rise is None or measured <= self.scheduler.baseline * max_rise
+        if self.preprocessor and noise and steady:
+            self.preprocessor.set_noise(b"".join(noise), self.audio.sample_rate)
+        if self.wake_detector and noise and max_rise is None:
+            # The detector's gate starts from this room's background level instead of learning it
+            self.wake_detector.gate.seed(audio_buffer.frame_rms(wake_word.pcm_to_samples(b"".join(noise))))
+        # Quiet rooms keep the usual 300; noisy ones raise it
+        self.recognizer.energy_threshold = self.scheduler.calibrated(measured, max_rise)
+        self.profile.update(energy_threshold=self.recognizer.energy_threshold, calibrated_at=time.time())
+
+    def keep_calibrated(self):
+        """Re-measure the noise floor now and then, while nobody is talking to the assistant"""
+        while self.scheduler.wait_for_recalibration():
+            if self.is_active:
+                self.scheduler.defer_recalibration(30)
+                continue
+            try:
+                self.calibrate('listen.recalibrate', max_rise=2.0)
+            except Exception as e:
+                print(f"Recalibration failed: {e}")
+                self.scheduler.defer_recalibration(60)
+
     def create_modern_ui(self):
         """Create modern popup UI similar to Cortana/Siri"""
         self.root = tk.Tk()
@@ -99,6 +221,7 @@ class ModernVoiceAssistant:
         
         # Hide window initially
         self.root.withdraw()
+        self.fader = visualizer.WindowFader(self.root)
         
         # Bind drag functionality
         self.main_frame.bind('<Button-1>', self.start_drag)
@@ -155,6 +278,7 @@ class ModernVoiceAssistant:
         self.voice_canvas = tk.Canvas(viz_frame, width=400, height=80, 
                                      bg=self.card_color, highlightthickness=0)
         self.voice_canvas.pack()
+        self.visualizer = visualizer.VoiceVisualizer(self.voice_canvas, self.accent_color)
 
     def create_chat_section(self):
         """Create chat display section"""
@@ -162,10 +286,20 @@ class ModernVoiceAssistant:
         chat_frame.pack(fill='both', expand=True, padx=20, pady=10)
         
         # Chat header
-        chat_header = tk.Label(chat_frame, text="Conversation", 
+        header_row = tk.Frame(chat_frame, bg=self.card_color)
+        header_row.pack(fill='x', pady=(0, 10))
+
+        chat_header = tk.Label(header_row, text="Conversation", 
                               font=('Segoe UI', 12, 'bold'), 
                               bg=self.card_color, fg=self.text_color)
-        chat_header.pack(anchor='w', pady=(0, 10))
+        chat_header.pack(side='left')
+
+        # Search over every past conversation
+        self.search_entry = tk.Entry(header_row, bg=self.bg_color, fg=self.text_color,
+                                     font=('Segoe UI', 9), relief='flat', width=18,
+                                     insertbackground=self.text_color)
+        self.search_entry.pack(side='right')
+        self.search_entry.bind('<Return>', lambda event: self.show_search_results(self.search_entry.get()))
         
         # Scrollable chat area
         chat_container = tk.Frame(chat_frame, bg=self.bg_color, relief='flat', bd=1)
@@ -177,11 +311,42 @@ class ModernVoiceAssistant:
         
         scrollbar = tk.Scrollbar(chat_container, command=self.chat_text.yview, 
                                 bg=self.card_color, troughcolor=self.bg_color)
-        self.chat_text.config(yscrollcommand=scrollbar.set)
         
         self.chat_text.pack(side='left', fill='both', expand=True, padx=10, pady=10)
         scrollbar.pack(side='right', fill='y')
 
+        self.transcript = None
+        if config.TRANSCRIPT:
+            try:
+                config.DATA_DIR.mkdir(parents=True, exist_ok=True)
+                self.transcript = transcript.TranscriptStore(config.DATA_DIR / "transcript.db")
+            except Exception as e:
+                print(f"Transcript store unavailable: {e}")
+        self.chat = chat_view.ChatView(self.chat_text, scrollbar, self.transcript,
+                                       max_messages=config.CHAT_MAX_MESSAGES,
+                                       user_color=self.accent_color, assistant_color=self.success_color)
+
+    def show_search_results(self, query):
+        """List past messages matching the query in a small popup"""
+        if not self.transcript or not query.strip():
+            return
+        self.transcript.flush()
+        rows = self.transcript.search(query)
+
+        results = tk.Toplevel(self.root, bg=self.card_color)
+        results.title(f"Search: {query}")
+        results.attributes('-topmost', True)
+        text = tk.Text(results, bg=self.bg_color, fg=self.text_color, font=('Segoe UI', 10),
+                       wrap='word', relief='flat', width=60, height=20)
+        text.pack(fill='both', expand=True, padx=10, pady=10)
+        if not rows:
+            text.insert(tk.END, "No matches")
+        for _, ts, sender, message in rows:
+            when = time.strftime("%d %b %H:%M", time.localtime(ts))
+            name = "You" if sender == "You" else "Mia Bhai"
+            text.insert(tk.END, f"[{when}] {name}: {message}\n\n")
+        text.config(state='disabled')
+
     def create_controls(self):
         """Create control buttons"""
         control_frame = tk.Frame(self.main_frame, bg=self.card_color)
@@ -227,228 +392,443 @@ class ModernVoiceAssistant:
         y = (self.root.winfo_screenheight() // 2) - (height // 2)
         self.root.geometry(f'{width}x{height}+{x}+{y}')
 
+    @pipeline.ui_thread
     def show_window(self):
         """Show popup with animation effect"""
         self.center_window()
+        self.root.attributes('-alpha', 0.0)
         self.root.deiconify()
         self.root.lift()
         self.root.attributes('-topmost', True)
         
         # Fade in animation
-        for alpha in range(0, 96, 5):
-            self.root.attributes('-alpha', alpha/100)
-            self.root.update()
-            time.sleep(0.01)
+        self.fader.fade(0.0, 0.95)
 
+    @pipeline.ui_thread
     def hide_window(self):
         """Hide window with animation"""
+        def hidden():
+            self.root.withdraw()
+            self.is_active = False
+            self.update_status("Say 'Bhai' to activate", self.warning_color)
+
         # Fade out animation
-        for alpha in range(95, 0, -5):
-            self.root.attributes('-alpha', alpha/100)
-            self.root.update()
-            time.sleep(0.01)
-        
-        self.root.withdraw()
-        self.is_active = False
-        self.update_status("Say 'Bhai' to activate", self.warning_color)
+        self.fader.fade(0.95, 0.0, on_done=hidden)
 
     def close_app(self):
         """Close the application"""
         self.is_wake_listening = False
+        self.scheduler.close()
+        if getattr(self, 'capture', None):
+            self.capture.stop()
+        self.pipeline.stop()
+        self.ui.stop()
+        if self.tts:
+            self.tts.stop()
+        print(f"Visualizer: {self.visualizer.stats.report()}")
+        if self.transcript:
+            self.transcript.close()
+        if self.intent_cache:
+            print(f"Intent cache: {self.intent_cache.stats} (hit rate {self.intent_cache.hit_rate():.0%})")
+        if self.prompter:
+            print(f"Gemini calls: {self.prompter.caller.snapshot()}")
+        if self.speculator and self.speculator.stats['dispatched']:
+            print(self.speculator.summary())
+        if self.preprocessor and self.preprocessor.stats['utterances']:
+            print(self.preprocessor.summary())
+        print(self.scheduler.summary())
         self.root.quit()
 
+    @pipeline.ui_thread
     def update_status(self, text, color):
         """Update status with color"""
         self.status_text.config(text=text)
         self.status_indicator.config(fg=color)
 
+    @pipeline.ui_thread
     def add_to_chat(self, message, sender="Assistant"):
         """Add message to chat with styling"""
-        timestamp = time.strftime("%H:%M")
-        if sender == "You":
-            self.chat_text.insert(tk.END, f"[{timestamp}] You: {message}\n\n", "user")
-        else:
-            self.chat_text.insert(tk.END, f"[{timestamp}] Mia Bhai: {message}\n\n", "assistant")
-        
-        # Configure text tags for styling
-        self.chat_text.tag_config("user", foreground="#58a6ff")
-        self.chat_text.tag_config("assistant", foreground="#238636")
-        
-        self.chat_text.see(tk.END)
+        self.chat.add(message, sender)
+
+    @pipeline.ui_thread
+    def begin_chat_message(self):
+        """Start an assistant message that streamed text will be appended to"""
+        self.chat.begin_stream()
+
+    @pipeline.ui_thread
+    def append_to_chat(self, text):
+        """Append streamed text to the current assistant message"""
+        self.chat.append_stream(text)
+
+    @pipeline.ui_thread
+    def end_chat_message(self):
+        """Finish the streamed assistant message"""
+        self.chat.end_stream()
 
+    @pipeline.ui_thread
+    def add_command_output(self, line):
+        """Show one line of a running command's output"""
+        self.chat.add_output(line)
+
+    @pipeline.ui_thread
     def animate_listening(self):
-        """Animate voice bars while listening"""
-        if self.is_listening:
-            self.voice_canvas.delete("all")
-            for i in range(8):
-                height = 10 + (30 * abs(0.5 - ((time.time() * 3 + i * 0.5) % 1)))
-                x = 40 + i * 40
-                self.voice_canvas.create_rectangle(x, 60, x+20, 60-height, 
-                                                 fill=self.accent_color, outline="")
-            self.root.after(50, self.animate_listening)
-        else:
-            self.voice_canvas.delete("all")
-
-    def speak(self, text):
-        """Convert text to speech"""
-        if self.tts_engine:
-            def tts_thread():
-                self.tts_engine.say(text)
-                self.tts_engine.runAndWait()
-            
-            thread = threading.Thread(target=tts_thread)
-            thread.daemon = True
-            thread.start()
+        """Animate voice bars from live microphone levels while listening"""
+        self.visualizer.start(self.audio, lambda: self.is_listening)
 
-    def listen_for_speech(self, timeout=8):
-        """Listen for speech with visual feedback"""
-        try:
-            with self.microphone as source:
-                self.update_status("Listening...", self.success_color)
-                self.is_listening = True
-                self.animate_listening()
-                
-                audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=15)
-                
-                self.is_listening = False
-                self.update_status("Processing...", self.accent_color)
-                
-                text = self.recognizer.recognize_google(audio)
-                return text.lower()
-                
-        except sr.UnknownValueError:
-            self.is_listening = False
-            return "Could not understand audio"
-        except sr.RequestError as e:
-            self.is_listening = False
-            return f"Speech recognition error: {e}"
-        except Exception as e:
-            self.is_listening = False
-            return f"Error: {e}"
+    def speak(self, text, turn, priority=tts_worker.NORMAL):
+        """Convert text to speech for ``turn``; dropped if that turn is cancelled before it is spoken"""
+        if self.tts:
+            self.tts.say(text, priority, turn)
+
+    def start_pipeline(self):
+        """Wire up the ASR → LLM → execute worker stages (TTS has its own worker)"""
+        self.pipeline.add_stage('asr', self.recognize_command)
+        self.pipeline.add_stage('llm', self.process_command)
+        self.pipeline.add_stage('execute', self.execute_command)
+        self.pipeline.start()
+
+    def capture_command(self, timeout=8, turn=None):
+        """Capture stage: collect the spoken command from the ring buffer"""
+        # Pick up right after the wake word instead of opening a new stream
+        reader = self.audio.reader(self.wake_position)
+        reader.rewind(self.wake_preroll)
+
+        self.update_status("Listening...", self.success_color)
+        self.is_listening = True
+        self.animate_listening()
 
-    def process_command(self, command):
-        """Process voice command with AI"""
+        # Streaming engines decode while the user is still talking
+        stream = self.asr.start_stream(self.audio.sample_rate) if self.asr.streams_partials else None
+        # ...so a settled partial can already be sent to Gemini
+        guess = None
+        if stream and self.speculator and self.get_prompter():
+            guess = self.speculator.begin(self.speculate, lambda: turn is not None and turn.cancelled)
+
+        # Noise is gated frame by frame on the way in (trimming and levelling need the whole phrase)
+        gate = self.preprocessor.frame_gate(self.audio.sample_rate) if stream and self.preprocessor else None
+
+        def on_frame(frame):
+            if gate:
+                frame = audio_preprocess.to_int16(gate.feed(audio_preprocess.to_float(frame)))
+            partial = stream.feed(frame)
+            if partial:
+                self.show_partial(partial)
+            if guess:
+                guess.feed(partial, len(frame) / self.audio.sample_rate)
+
+        with tracing.span('capture.command'):
+            pcm = audio_buffer.capture_utterance(reader, self.recognizer.energy_threshold,
+                                                 timeout=timeout, phrase_time_limit=15,
+                                                 pause_threshold=self.recognizer.pause_threshold,
+                                                 on_frame=on_frame if stream else None)
+        if gate:
+            stream.feed(audio_preprocess.to_int16(gate.flush()))
+        self.is_listening = False
+        return pcm, stream, guess
+
+    def show_partial(self, text):
+        """Show what has been recognized so far"""
+        self.update_status(f"Heard: {text}", self.success_color)
+
+    def recognize_command(self, turn, job):
+        """ASR stage: turn captured audio into text"""
+        pcm, stream, guess = job
+        self.update_status("Processing...", self.accent_color)
         try:
-            self.conversation_history.append({'role': 'user', 'content': command})
-            self.add_to_chat(command, "You")
-            
-            # Since wake word "bhai" was already detected, process the command directly
-            # No need to check for prefix in the actual command
-            # Process with AI
+            with tracing.span('asr.recognize', engine=self.asr.name):
+                if stream:
+                    text = stream.finish(on_partial=self.show_partial)
+                else:
+                    text = self.asr.transcribe(*self.prepare_audio(pcm), on_partial=self.show_partial)
+            command = text.strip().lower()
+            if command:
+                print(f"Command: {command}")
+                return command, guess
+            print("Could not understand audio")
+        except asr.AsrError as e:
+            print(f"Speech recognition error: {e}")
+        if guess:
+            guess.cancel()
+        self.speak("I didn't catch that. Please try again.", turn)
+        self.update_status("Say 'Bhai' to activate", self.warning_color)
+        self.finish_turn(turn)
+
+    def prepare_audio(self, pcm):
+        """``(audio, sample rate)`` for the recognizer, cleaned up when preprocessing is on"""
+        if not self.preprocessor:
+            return pcm, self.audio.sample_rate
+        with tracing.span('asr.preprocess'):
+            return self.preprocessor.process(pcm, self.audio.sample_rate, self.recognizer.energy_threshold)
+
+    def get_prompter(self):
+        """The shared Gemini prompter, None while no API key is configured"""
+        if self.prompter is None:
             api_key = os.environ.get('GEMINI_API_KEY')
             if not api_key:
-                error_msg = "API key not configured. Please check your .env file."
-                self.add_to_chat(error_msg)
-                self.speak(error_msg)
-                return
-            
-            client = genai.Client(api_key=api_key)
-            self.update_status("AI is thinking...", self.accent_color)
-            
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=f"""user asked {command},
-
-                user have asked to do something and you have to answer the query
-                and if the user have asked to open something that time you just have to provide the commmand to run in the terminal of the {operating_system},
-                and also make sure that if you are giving the command to run in terminal that time the response must not include any single markdown text.
-                also if the user is commanding to do something in the system that time you need to just provide the terminal command in such a way that they get executed directly and this response should also not include any type of single markdown content
-                but make sure that you are returning the dictionary as the response if response is command that time the result must be, all the following stuructures have to follow strictly:
-                "type":"command", "command":"command", "fail_audio":"msg to show if command faild"
-
-                if there is only result as response:
-                "type":"response", "content":"content"
-
-                one more condition you are also provided with the all the privious conversation history also and all the history is:
-                {self.conversation_history} so you need to also respond according to that.
-                """,
-            )
-            
-            # Parse response safely
-            try:
-                result = json.loads(response.text)
-            except:
-                result = {"type": "response", "content": response.text}
-            
-            self.conversation_history.append({'role': 'system', 'content': result})
+                return None
+            self.prompter = prompts.Prompter(llm_client.shared_client(api_key),
+                                             prompts.system_instruction(operating_system))
+        return self.prompter
+
+    def speculate(self, text, should_stop):
+        """Ask about a partial transcript in the background; nothing is shown or spoken"""
+        result, _ = self.get_prompter().ask(self.memory.contents(text.strip().lower()), should_stop=should_stop)
+        return result
+
+    def ask_ai(self, command, turn=None, guess=None):
+        """Ask Gemini about the command; returns (result, streamed text)"""
+        # Since wake word "bhai" was already detected, process the command directly
+        # No need to check for prefix in the actual command
+        # Process with AI
+        if not self.get_prompter():
+            error_msg = "API key not configured. Please check your .env file."
+            self.add_to_chat(error_msg)
+            self.speak(error_msg, turn)
+            return None, None
+
+        # A request sent while the user was still talking may already have the answer
+        result = guess.resolve(command) if guess else None
+        if turn is not None and turn.cancelled:
+            return None, None
+        if result is not None:
+            print("🔮 Using the reply to the partial transcript")
+            self.memory.add('user', command)
+            return result, []
+
+        self.update_status("AI is thinking...", self.accent_color)
+
+        contents = self.memory.contents(command)
+        self.memory.add('user', command)
+
+        streamed = []
+        # Show and speak the reply sentence by sentence as it arrives
+        def on_text(delta):
+            if not streamed:
+                self.begin_chat_message()
+            streamed.append(delta)
+            self.append_to_chat(delta)
+
+        with tracing.span('llm.generate', streaming=config.STREAMING):
+            result, timings = self.prompter.ask(contents, on_text=on_text,
+                                                on_sentence=lambda sentence: self.speak(sentence, turn),
+                                                should_stop=lambda: turn is not None and turn.cancelled)
+        if config.STREAMING:
+            print(llm_stream.format_timings(timings))
+        if streamed and not timings['streamed']:
+            # The stream was malformed and has been asked again; show the retry in full
+            self.end_chat_message()
+            streamed = []
+        return result, streamed
+
+    def process_command(self, turn, job):
+        """LLM stage: answer the command, forwarding shell commands to the execute stage"""
+        command, guess = job
+        try:
+            self.add_to_chat(command, "You")
+
+            # Repeated commands skip the round-trip to Gemini
+            cached = self.intent_cache.get(command, operating_system) if self.intent_cache else None
+            if cached:
+                print(f"⚡ Intent cache hit: {actions.describe(cached)}")
+                if guess:
+                    guess.cancel()
+                result, streamed = cached, []
+                self.memory.add('user', command)
+            else:
+                result, streamed = self.ask_ai(command, turn, guess)
+                if result is None or turn.cancelled:
+                    return None
+
+            self.memory.add('model', result)
             
             # Handle response
-            if result.get('type') == 'command':
-                command_text = result.get('command', '')
-                self.add_to_chat(f"Executing: {command_text}")
-                self.speak(f"Executing: {command_text}")
-                
-                try:
-                    subprocess.run(command_text, shell=True)
-                    success_msg = "Command executed successfully"
-                    self.add_to_chat(success_msg)
-                    self.speak("Done!")
-                except Exception as e:
-                    error_msg = result.get('fail_audio', 'Command failed')
-                    self.add_to_chat(f"Error: {error_msg}")
-                    self.speak(error_msg)
+            if result.get('type') in ('command', 'action'):
+                return command, result, cached
+            elif streamed:
+                self.end_chat_message()
             else:
                 response_content = result.get('content', 'No response received')
                 self.add_to_chat(response_content)
-                self.speak(response_content)
+                self.speak(response_content, turn)
                 
             self.update_status("Command completed", self.success_color)
             
         except Exception as e:
             error_msg = f"Error: {str(e)}"
             self.add_to_chat(f"System Error: {error_msg}")
-            self.speak("Sorry, there was an error processing your request.")
+            self.speak("Sorry, there was an error processing your request.", turn)
             self.update_status("Error occurred", self.error_color)
+        self.finish_turn(turn)
+
+    def execute_command(self, turn, job):
+        """Execute stage: run the model's action or shell command without waiting for it"""
+        command, result, cached = job
+        command_text = actions.describe(result)
+        self.add_to_chat(f"Executing: {command_text}")
+        self.speak(f"Executing: {command_text}", turn)
+
+        def on_exit(outcome):
+            print(outcome.summary())
+            if outcome.runtime is not None:
+                tracing.record('execute.command', outcome.runtime, ok=outcome.ok)
+            if outcome.time_to_first_output is not None:
+                tracing.record('execute.first_output', outcome.time_to_first_output)
+            if self.intent_cache:
+                if outcome.ok and not cached:
+                    self.intent_cache.put(command, operating_system, result)
+                elif not outcome.ok and not outcome.timed_out and cached:
+                    self.intent_cache.invalidate(command, operating_system)
+
+            if outcome.ok:
+                self.add_to_chat("Command executed successfully")
+                self.speak(outcome.message or "Done!", turn)
+                self.update_status("Command completed", self.success_color)
+            elif outcome.detached:
+                self.add_to_chat("Command is still running in the background")
+                self.update_status("Command running", self.accent_color)
+            else:
+                error_msg = result.get('fail_audio', 'Command failed')
+                detail = outcome.error or (outcome.output_tail[-1] if outcome.output_tail else f"exit code {outcome.returncode}")
+                self.add_to_chat(f"Error: {error_msg} ({detail})")
+                self.speak(error_msg, turn)
+                self.update_status("Command failed", self.error_color)
+            self.finish_turn(turn)
+
+        self.actions.run(result, on_output=lambda stream, line: self.add_command_output(line), on_exit=on_exit)
+
+    def handle_wake_word(self):
+        """Capture stage: start a new turn and hand the spoken command to the ASR stage"""
+        print("🚀 Wake word detected!")
+        turn = self.pipeline.new_turn()
+        self.is_active = True
+        self.show_window()
+        # Barge-in: cut off whatever the previous turn was still saying
+        if self.tts:
+            self.tts.interrupt()
+        self.speak("Yes, I'm listening!", turn, tts_worker.URGENT)
+
+        # Listen for the actual command
+        pcm, stream, guess = self.capture_command(timeout=10, turn=turn)
+        if pcm and not turn.cancelled:
+            self.pipeline['asr'].submit(turn, (pcm, stream, guess))
+        else:
+            if guess:
+                guess.cancel()
+            self.speak("I didn't catch that. Please try again.", turn)
+            self.update_status("Say 'Bhai' to activate", self.warning_color)
+            self.finish_turn(turn)
+
+    def finish_turn(self, turn):
+        """Auto-hide after 5 seconds of inactivity unless a newer turn started"""
+        tracing.record('turn.total', time.perf_counter() - turn.started, turn=turn.id)
+        self.ui.post(self.root.after, 5000, lambda: self.hide_window() if self.pipeline.current is turn else None)
+
+    def is_own_voice(self, end, seconds):
+        """True when a wake word heard during playback isn't clearly louder than the assistant itself"""
+        if not self.echo_guard or self.echo_guard.allows(end, seconds):
+            return False
+        print("🔇 Ignored a wake word while speaking (not louder than the playback)")
+        return True
+
+    def wait_for_wake_word_locally(self):
+        """Stream captured frames through the local detector until it fires"""
+        scheduler = self.scheduler
+        reader = self.audio.reader()
+        self.wake_detector.reset()
+        while self.is_wake_listening:
+            scheduler.tick()
+            # Frames pile up in the ring buffer while the thread sleeps and are scored in one go
+            poll = scheduler.poll
+            if not scheduler.wait(poll):
+                break
+            heard = False
+            frame = reader.read(timeout=1)
+            while frame is not None:
+                with tracing.span('wake.frame', trace=False):
+                    detected = self.wake_detector.process(frame)
+                if detected and self.is_own_voice(reader.position, 1.0):
+                    self.wake_detector.reset()
+                    detected = False
+                if detected:
+                    self.wake_position = reader.position
+                    self.wake_preroll = min(COMMAND_PREROLL_SECONDS, self.wake_detector.detection_lag)
+                    scheduler.heard()
+                    return True
+                heard = heard or self.wake_detector.gate.hangover > 0
+                frame = reader.read(timeout=0) if poll else None
+            if heard:
+                scheduler.heard()
+            else:
+                scheduler.idle()
+        return False
+
+    def wait_for_wake_word_online(self):
+        """Check short phrases for the wake word with the ASR backend"""
+        scheduler = self.scheduler
+        scheduler.tick()
+        reader = self.audio.reader()
+        # Sleep between checks, then look over what came in meanwhile without waking per frame
+        poll = scheduler.poll
+        if not scheduler.wait(poll):
+            return False
+        if poll and not audio_buffer.skip_quiet(reader, scheduler.energy_threshold):
+            scheduler.idle()
+            return False
+        scheduler.heard()
+
+        # Listen for short phrases
+        pcm = audio_buffer.capture_utterance(reader, scheduler.energy_threshold,
+                                             timeout=1, phrase_time_limit=4)
+        if pcm is None:
+            scheduler.idle()
+            return False
+        # The phrase ended on a pause, so the pre-roll only reaches back into that
+        self.wake_position = reader.position
+        self.wake_preroll = COMMAND_PREROLL_SECONDS
+
+        try:
+            with tracing.span('wake.recognize', engine=self.asr.name):
+                text = self.asr.transcribe(*self.prepare_audio(pcm)).lower()
+        except asr.AsrError:
+            # Only the online engine fails like this; give the network a moment
+            scheduler.wait(scheduler.failed())
+            return False
+        # Check for wake words
+        detected = any(wake_word in text for wake_word in ['bhai'])
+        if detected and self.is_own_voice(reader.position, len(pcm) / 2 / self.audio.sample_rate):
+            detected = False
+        scheduler.recognized(detected)
+        if text:
+            print(f"Heard: {text}")
+        return detected
 
     def start_wake_word_detection(self):
         """Background wake word detection"""
         def wake_word_listener():
-            print("🎤 Wake word detection started...")
+            ready = time.perf_counter() - STARTED
+            tracing.record('startup.listening', ready)
+            print(f"🎤 Wake word detection started... ({ready:.2f}s after launch)")
             print("Say 'Bhai' to activate!")
             
             while self.is_wake_listening:
                 try:
-                    if not self.is_active:
-                        with self.microphone as source:
-                            # Listen for short phrases
-                            audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=4)
-                        
-                        try:
-                            text = self.recognizer.recognize_google(audio).lower()
-                            print(f"Heard: {text}")
-                            
-                            # Check for wake words
-                            if any(wake_word in text for wake_word in ['bhai']):
-                                print("🚀 Wake word detected!")
-                                self.is_active = True
-                                self.show_window()
-                                self.speak("Yes, I'm listening!")
-                                
-                                # Listen for the actual command
-                                command = self.listen_for_speech(timeout=10)
-                                if command and "error" not in command.lower():
-                                    print(f"Command: {command}")
-                                    self.process_command(command)
-                                else:
-                                    self.speak("I didn't catch that. Please try again.")
-                                    self.update_status("Say 'Bhai' to activate", self.warning_color)
-                                
-                                # Auto-hide after 5 seconds of inactivity
-                                self.root.after(5000, self.hide_window)
-                                
-                        except sr.UnknownValueError:
-                            pass  # Continue listening
-                        except sr.RequestError:
-                            time.sleep(1)
-                            
+                    # Keeps listening while earlier turns are processed so a new wake word can cancel them
+                    if self.wake_detector:
+                        detected = self.wait_for_wake_word_locally()
+                    else:
+                        detected = self.wait_for_wake_word_online()
+                    if detected:
+                        self.handle_wake_word()
+
                 except Exception as e:
                     print(f"Wake word detection error: {e}")
-                    time.sleep(1)
+                    self.scheduler.wait(self.scheduler.failed(recognition=False))
         
         # Start wake word detection in background
         thread = threading.Thread(target=wake_word_listener)
         thread.daemon = True
         thread.start()
+        threading.Thread(target=self.keep_calibrated, name="recalibrate", daemon=True).start()
 
     def run(self):
         """Start the voice assistant"""
@@ -459,6 +839,12 @@ class ModernVoiceAssistant:
         self.root.mainloop()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mia Bhai voice assistant")
+    tracing.add_profile_argument(parser)
+    args = parser.parse_args()
+    if args.profile:
+        tracing.tracer.enable_profile(args.profile)
+
     try:
         assistant = ModernVoiceAssistant()
         assistant.run()
@@ -467,3 +853,8 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"❌ Error starting assistant: {e}")
         input("Press Enter to exit...")
+    finally:
+        if args.profile:
+            print(tracing.tracer.summary())
+            print(f"Trace written to {args.profile}")
+            tracing.tracer.close()
@@ -0,0 +1,162 @@
+import functools
+import itertools
+import queue
+import threading
+import time
+
+
+class Turn:
+    """One wake-word-to-answer interaction flowing through the pipeline"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.id = next(self._ids)
+        self.started = time.perf_counter()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+class Stage:
+    """A worker thread fed by a bounded queue.
+
+    ``handler(turn, payload)`` runs for every item whose turn has not been
+    cancelled; a non-None return value is forwarded to the next stage.
+    """
+
+    def __init__(self, name, handler, maxsize=4, next_stage=None):
+        self.name = name
+        self.handler = handler
+        self.next_stage = next_stage
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.thread = None
+        self.processed = 0
+        self.dropped = 0
+
+    def submit(self, turn, payload, timeout=None):
+        """Queue work for this stage; blocks while the queue is full (backpressure)"""
+        try:
+            self.queue.put((turn, payload), timeout=timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"⚠️ {self.name} stage is full, dropping turn {turn.id}")
+            return False
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"{self.name}-stage", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.queue.put(None)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            turn, payload = item
+            if turn.cancelled:
+                continue
+            try:
+                output = self.handler(turn, payload)
+            except Exception as e:
+                print(f"{self.name} stage error: {e}")
+                continue
+            self.processed += 1
+            if output is not None and self.next_stage and not turn.cancelled:
+                self.next_stage.submit(turn, output)
+
+
+class Pipeline:
+    """Chain of stages plus the turn currently in flight"""
+
+    def __init__(self):
+        self.stages = {}
+        self.current = None
+        self.lock = threading.Lock()
+
+    def add_stage(self, name, handler, maxsize=4):
+        """Append a stage; the previous stage forwards its output to it"""
+        stage = Stage(name, handler, maxsize)
+        if self.stages:
+            list(self.stages.values())[-1].next_stage = stage
+        self.stages[name] = stage
+        return stage
+
+    def __getitem__(self, name):
+        return self.stages[name]
+
+    def new_turn(self):
+        """Start a turn, cancelling whatever the previous one was still doing"""
+        turn = Turn()
+        with self.lock:
+            previous, self.current = self.current, turn
+        if previous:
+            previous.cancel()
+        return turn
+
+    def start(self):
+        for stage in self.stages.values():
+            stage.start()
+
+    def stop(self):
+        if self.current:
+            self.current.cancel()
+        for stage in self.stages.values():
+            stage.stop()
+
+
+class UiChannel:
+    """Marshals calls from worker threads onto Tk's event loop via ``after()``"""
+
+    def __init__(self, root, interval_ms=20, max_batch=50):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self.queue = queue.SimpleQueue()
+        self.ui_thread = threading.current_thread()
+        self.running = False
+
+    def on_ui_thread(self):
+        return threading.current_thread() is self.ui_thread
+
+    def post(self, fn, *args, **kwargs):
+        self.queue.put((fn, args, kwargs))
+
+    def start(self):
+        self.running = True
+        self.root.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        self.running = False
+
+    def _drain(self):
+        for _ in range(self.max_batch):
+            try:
+                fn, args, kwargs = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                print(f"UI update error: {e}")
+        if self.running:
+            self.root.after(self.interval_ms, self._drain)
+
+
+def ui_thread(method):
+    """Run a widget-touching method on the Tk thread, posting it there when called from a worker"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        ui = getattr(self, 'ui', None)
+        if ui is None or ui.on_ui_thread():
+            return method(self, *args, **kwargs)
+        ui.post(method, self, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,220 @@
+import threading
+import time
+
+import actions
+import config
+import llm_client
+import llm_stream
+from conversation_memory import estimate_tokens
+from llm_stream import ReplyError
+
+
+def response_schema(registry):
+    """The fields Gemini's JSON mode fills; without actions the action fields are left out.
+
+    "type" comes first so a streamed reply shows whether it is a command
+    before any content arrives.
+    """
+    properties = {'type': {'type': 'STRING', 'enum': ['command', 'response']}}
+    if registry.names():
+        properties['type']['enum'] = ['command', 'action', 'response']
+        properties['action'] = {'type': 'STRING', 'enum': registry.names()}
+        properties['args'] = {'type': 'OBJECT', 'properties': {name: {'type': 'STRING'} for name in registry.params()}}
+    properties.update(command={'type': 'STRING'}, fail_audio={'type': 'STRING'}, content={'type': 'STRING'})
+    return {'type': 'OBJECT', 'properties': properties, 'required': ['type'], 'property_ordering': list(properties)}
+
+
+NAME_REPLY = 'Mera name Mia bhai! ha to Mia bhai bhi use kro....'
+
+
+def system_instruction(operating_system, require_name=False, registry=None):
+    """The static rules, sent once per request as a system instruction instead of inside every turn"""
+    registry = actions.enabled_registry() if registry is None else registry
+    lines = [
+        f"You are Mia Bhai, an assistant on {operating_system}.",
+        "If the user asks to open something or do something on the computer, reply with type \"command\": "
+        f"a terminal command for {operating_system} that runs directly, and a short fail_audio message.",
+    ]
+    if registry.names():
+        lines.append("If one of these actions does the job, reply with type \"action\", the action name and its "
+                     "args instead, still giving the equivalent command as a fallback:\n" + registry.describe())
+    lines += [
+        "Otherwise reply with type \"response\" and the answer in content.",
+        "Never use markdown.",
+        "Earlier turns (and a summary of older ones) come first; answer with them in mind.",
+    ]
+    if require_name:
+        lines.append("If the message does not start with 'mia bhai' (understand 'miya bhai' and similar as "
+                     f"'mia bhai'), reply with type \"response\" and content '{NAME_REPLY}'.")
+    return "\n".join(lines)
+
+
+def validate_reply(result, registry=None):
+    """The reply reduced to the schema's fields; raises ReplyError when it can't be used.
+
+    An action reply needs an action from ``registry`` (the enabled actions by
+    default) or a command to fall back on.
+    """
+    registry = actions.enabled_registry() if registry is None else registry
+    if not isinstance(result, dict):
+        raise ReplyError(f"expected an object, got {type(result).__name__}")
+    kind = result.get('type')
+    if kind == 'command':
+        command = result.get('command')
+        if not isinstance(command, str) or not command.strip():
+            raise ReplyError("command reply without a command")
+        fail_audio = result.get('fail_audio')
+        return {'type': 'command', 'command': command.strip(),
+                'fail_audio': fail_audio if isinstance(fail_audio, str) and fail_audio else 'Command failed'}
+    if kind == 'action':
+        name, args = result.get('action'), result.get('args') or {}
+        command = result.get('command')
+        command = command.strip() if isinstance(command, str) else ""
+        if not isinstance(args, dict):
+            raise ReplyError("action args must be an object")
+        if not registry.get(name) and not command:
+            raise ReplyError(f"unknown action {name!r} without a command")
+        fail_audio = result.get('fail_audio')
+        return {'type': 'action', 'action': name, 'args': args, 'command': command,
+                'fail_audio': fail_audio if isinstance(fail_audio, str) and fail_audio else 'Command failed'}
+    if kind == 'response':
+        content = result.get('content')
+        if not isinstance(content, str) or not content.strip():
+            raise ReplyError("response reply without content")
+        return {'type': 'response', 'content': content}
+    raise ReplyError(f"unknown reply type {kind!r}")
+
+
+class Prompter:
+    """Sends turns to Gemini with the system instruction, response schema and validation.
+
+    The instruction goes in ``system_instruction`` rather than the user turn; when
+    it is long enough for Gemini's explicit context caching it is uploaded once
+    and referenced by name until the cache expires. Replies that don't match the
+    schema are retried (without streaming) up to ``max_retries`` times; network
+    and server errors are retried by the llm_client caller.
+    """
+
+    def __init__(self, client, instruction, model=None, max_retries=None, cache=None, caller=None, registry=None):
+        from google.genai import types
+
+        self.types = types
+        self.client = client
+        self.model = model or config.GEMINI_MODEL
+        self.instruction = instruction
+        # Must be the registry the instruction was built from and the ActionRunner uses
+        self.registry = actions.enabled_registry() if registry is None else registry
+        self.schema = response_schema(self.registry)
+        # Transient failures, slow replies and model fallback are handled here
+        self.caller = caller or llm_client.from_config(self.model)
+        self.max_retries = config.REPLY_RETRIES if max_retries is None else max_retries
+        if cache is None:
+            cache = config.PROMPT_CACHE and estimate_tokens(instruction) >= config.PROMPT_CACHE_MIN_TOKENS
+        self.use_cache = cache
+        self.cache_name = None
+        self.cache_expires = 0.0
+        self.lock = threading.Lock()
+        self.generation = types.GenerateContentConfig(
+            system_instruction=instruction,
+            response_mime_type='application/json',
+            response_schema=self.schema,
+        )
+        self.stats = {'requests': 0, 'retries': 0, 'malformed': 0, 'failed': 0,
+                      'cache_created': 0, 'cached_requests': 0}
+
+    def _cached_content(self):
+        """Name of a live cache holding the instruction, creating one when needed"""
+        with self.lock:
+            if not self.use_cache:
+                return None
+            if self.cache_name and time.monotonic() < self.cache_expires:
+                return self.cache_name
+            try:
+                cache = self.client.caches.create(model=self.model, config=self.types.CreateCachedContentConfig(
+                    system_instruction=self.instruction, ttl=f"{config.PROMPT_CACHE_TTL}s"))
+            except Exception as e:
+                print(f"⚠️ Prompt caching unavailable ({e}), sending the instruction with each request")
+                self.use_cache = False
+                return None
+            self.cache_name = cache.name
+            # Renew a little early so no request references an expired cache
+            self.cache_expires = time.monotonic() + config.PROMPT_CACHE_TTL * 0.9
+            self.stats['cache_created'] += 1
+            return self.cache_name
+
+    def _drop_cache(self, name):
+        with self.lock:
+            if self.cache_name == name:
+                self.cache_name = None
+
+    def _generation_config(self):
+        name = self._cached_content()
+        if not name:
+            return self.generation, None
+        return self.types.GenerateContentConfig(
+            cached_content=name,
+            response_mime_type='application/json',
+            response_schema=self.schema,
+        ), name
+
+    def _request(self, contents, streaming, on_text, on_sentence, should_stop):
+        from google.genai import errors
+
+        generation, cache_name = self._generation_config()
+        self.stats['requests'] += 1
+        if cache_name:
+            self.stats['cached_requests'] += 1
+
+        def send(generation):
+            def request(model, stop):
+                # A cache belongs to one model; the fallback gets the instruction inline
+                return self._send(contents, generation if model == self.model else self.generation, model,
+                                  streaming, on_text, on_sentence, stop)
+            return self.caller.call(request, should_stop)
+
+        try:
+            return send(generation)
+        except errors.ClientError:
+            if not cache_name:
+                raise
+            # The cache was deleted or expired server-side; send the instruction inline
+            self._drop_cache(cache_name)
+            return send(self.generation)
+
+    def _send(self, contents, generation, model, streaming, on_text, on_sentence, should_stop):
+        if streaming:
+            return llm_stream.stream_reply(self.client, model, contents, on_text=on_text,
+                                           on_sentence=on_sentence, config=generation,
+                                           should_stop=should_stop, strict=True)
+        start = time.perf_counter()
+        response = self.client.models.generate_content(model=model, contents=contents, config=generation)
+        timings = {'first_token': None, 'first_audio': None, 'total': time.perf_counter() - start}
+        return llm_stream.parse_reply(response.text or "", strict=True), timings
+
+    def ask(self, contents, on_text=None, on_sentence=None, should_stop=None, streaming=None):
+        """Returns ``(reply, timings)``; raises ReplyError once the retries are used up.
+
+        ``timings['streamed']`` is False when the reply did not come from the
+        stream the callbacks saw (a retry), so callers show it in full instead.
+        """
+        streaming = config.STREAMING if streaming is None else streaming
+        attempt = 0
+        while True:
+            try:
+                result, timings = self._request(contents, streaming and attempt == 0,
+                                                on_text, on_sentence, should_stop)
+                if should_stop and should_stop():
+                    timings.update(retries=attempt, streamed=streaming and attempt == 0)
+                    return result, timings
+                result = validate_reply(result, self.registry)
+            except ReplyError as e:
+                self.stats['malformed'] += 1
+                if attempt >= self.max_retries:
+                    self.stats['failed'] += 1
+                    raise
+                print(f"⚠️ Malformed reply ({e}), asking again")
+                attempt += 1
+                self.stats['retries'] += 1
+                continue
+            timings.update(retries=attempt, streamed=streaming and attempt == 0)
+            return result, timings
@@ -0,0 +1,327 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.ioloop
+import tornado.web
+import tornado.websocket
+
+import config
+import llm_client
+import main
+import tracing
+from conversation_memory import ConversationMemory
+
+
+class Busy(Exception):
+    """More requests are waiting for the model than the queue allows"""
+
+
+class Session:
+    """Conversation state of one client; its turns run one at a time"""
+
+    def __init__(self, session_id):
+        self.id = session_id
+        self.memory = ConversationMemory(token_budget=config.MEMORY_TOKEN_BUDGET)
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.turns = 0
+
+
+class SessionStore:
+    """Sessions by id, least recently used first; only touched from the event loop"""
+
+    def __init__(self, max_sessions=5000, idle_seconds=1800):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.sessions = OrderedDict()
+        self.stats = {'created': 0, 'evicted': 0, 'expired': 0}
+
+    def get(self, session_id=None):
+        """Existing session, or a new one (with a fresh id when none is given)"""
+        session_id = str(session_id) if session_id else uuid.uuid4().hex[:12]
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(session_id)
+            self.stats['created'] += 1
+        else:
+            self.sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.stats['evicted'] += 1
+        return session
+
+    def drop(self, session_id):
+        return self.sessions.pop(session_id, None) is not None
+
+    def expire(self):
+        """Forget sessions idle for longer than ``idle_seconds``"""
+        cutoff = time.monotonic() - self.idle_seconds
+        while self.sessions:
+            oldest = next(iter(self.sessions.values()))
+            if oldest.last_used > cutoff:
+                break
+            self.sessions.popitem(last=False)
+            self.stats['expired'] += 1
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+class LlmGate:
+    """Runs blocking Gemini calls on at most ``max_concurrent`` threads.
+
+    Calls beyond that wait in the pool's queue; once ``max_queue`` are waiting
+    new ones are refused with Busy so clients back off instead of piling up.
+    """
+
+    def __init__(self, max_concurrent=16, max_queue=512):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="llm")
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.peak_queued = 0
+        self.stats = {'accepted': 0, 'rejected': 0, 'failed': 0}
+
+    async def run(self, fn, *args, **kwargs):
+        with self.lock:
+            if self.queued >= self.max_queue:
+                self.stats['rejected'] += 1
+                raise Busy()
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+            self.stats['accepted'] += 1
+        submitted = time.perf_counter()
+
+        def call():
+            with self.lock:
+                self.queued -= 1
+                self.running += 1
+            tracing.record('server.queue_wait', time.perf_counter() - submitted, trace=False)
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                with self.lock:
+                    self.stats['failed'] += 1
+                raise
+            finally:
+                with self.lock:
+                    self.running -= 1
+
+        return await asyncio.wrap_future(self.pool.submit(call))
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats, running=self.running, queued=self.queued, peak_queued=self.peak_queued,
+                        max_concurrent=self.max_concurrent, max_queue=self.max_queue)
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class AssistantServer:
+    """Serves the main.py request/response contract to many sessions over HTTP and WebSocket.
+
+    Commands are returned to the client to run on its own machine; the server
+    never executes them. All sessions share one Gemini client, so connections
+    to the API are kept alive and reused.
+    """
+
+    def __init__(self, client, max_concurrent=16, max_queue=512, max_sessions=5000, idle_seconds=1800):
+        self.client = client
+        # One caller so retries, hedging and the p95 behind it cover every session
+        self.caller = llm_client.from_config()
+        self.prompters = OrderedDict()  # operating system -> main.create_prompter(...)
+        self.sessions = SessionStore(max_sessions, idle_seconds)
+        self.gate = LlmGate(max_concurrent, max_queue)
+        self.started = time.time()
+        self.stats = {'requests': 0, 'errors': 0, 'websockets_open': 0}
+
+    def prompter(self, operating_system=None):
+        """Prompter for a client's OS; the system instruction differs per OS, so a few are kept"""
+        operating_system = operating_system or main.operating_system
+        prompter = self.prompters.get(operating_system)
+        if prompter is None:
+            prompter = self.prompters[operating_system] = main.create_prompter(self.client, operating_system,
+                                                                               caller=self.caller)
+            while len(self.prompters) > 64:
+                self.prompters.popitem(last=False)
+        else:
+            self.prompters.move_to_end(operating_system)
+        return prompter
+
+    async def ask(self, session, command, operating_system=None, on_text=None):
+        """One turn for ``session``; raises Busy when the model queue is full"""
+        self.stats['requests'] += 1
+        async with session.lock:
+            try:
+                with tracing.span('server.turn'):
+                    result, _ = await self.gate.run(main.ask, self.prompter(operating_system), session.memory,
+                                                    command, on_text=on_text)
+            except Busy:
+                raise
+            except Exception:
+                self.stats['errors'] += 1
+                raise
+        session.turns += 1
+        session.last_used = time.monotonic()
+        return result
+
+    def prompt_stats(self):
+        totals = {}
+        for prompter in self.prompters.values():
+            for key, value in prompter.stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def metrics(self):
+        return {
+            'uptime_s': round(time.time() - self.started, 1),
+            'sessions': dict(self.sessions.stats, active=len(self.sessions)),
+            'llm': self.gate.snapshot(),
+            'prompts': self.prompt_stats(),
+            'gemini': self.caller.snapshot(),
+            **self.stats,
+            'latency': tracing.tracer.snapshot(),
+        }
+
+    def application(self):
+        return tornado.web.Application([
+            (r"/v1/ask", AskHandler),
+            (r"/v1/stream", StreamHandler),
+            (r"/v1/sessions/([^/]+)", SessionHandler),
+            (r"/metrics", MetricsHandler),
+        ], server=self, websocket_max_message_size=64 * 1024)
+
+
+def _parse_command(body):
+    """(command, os, session id) from a JSON request, or None if it is malformed"""
+    try:
+        request = json.loads(body or b"{}")
+        command = request['command'].strip()
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+    return (command, request.get('os'), request.get('session')) if command else None
+
+
+class AskHandler(tornado.web.RequestHandler):
+    """POST {"command": ..., "session": optional id, "os": optional platform} -> the reply dict"""
+
+    async def post(self):
+        server = self.settings['server']
+        parsed = _parse_command(self.request.body)
+        if parsed is None:
+            self.set_status(400)
+            self.finish({'error': 'expected JSON with a non-empty "command"'})
+            return
+        command, operating_system, session_id = parsed
+        session = server.sessions.get(session_id)
+        try:
+            result = await server.ask(session, command, operating_system)
+        except Busy:
+            self.set_status(503)
+            self.set_header('Retry-After', '1')
+            self.finish({'error': 'busy', 'session': session.id})
+            return
+        except Exception as e:
+            self.set_status(502)
+            self.finish({'error': str(e), 'session': session.id})
+            return
+        self.finish(dict(result, session=session.id))
+
+
+class StreamHandler(tornado.websocket.WebSocketHandler):
+    """Send {"command": ...}; get {"event": "text"} deltas as the reply streams, then {"event": "reply"}"""
+
+    def open(self):
+        self.server = self.settings['server']
+        self.session = self.server.sessions.get(self.get_argument('session', None))
+        self.server.stats['websockets_open'] += 1
+        self.send({'event': 'session', 'session': self.session.id})
+
+    async def on_message(self, message):
+        parsed = _parse_command(message)
+        if parsed is None:
+            self.send({'event': 'error', 'error': 'expected JSON with a non-empty "command"'})
+            return
+        command, operating_system, _ = parsed
+        loop = tornado.ioloop.IOLoop.current()
+
+        def on_text(delta):
+            # Called on an LLM worker thread
+            loop.add_callback(self.send, {'event': 'text', 'delta': delta})
+
+        try:
+            result = await self.server.ask(self.session, command, operating_system, on_text=on_text)
+        except Busy:
+            self.send({'event': 'busy', 'retry_after': 1})
+            return
+        except Exception as e:
+            self.send({'event': 'error', 'error': str(e)})
+            return
+        self.send({'event': 'reply', 'reply': result})
+
+    def send(self, message):
+        try:
+            self.write_message(message)
+        except tornado.websocket.WebSocketClosedError:
+            pass
+
+    def on_close(self):
+        self.server.stats['websockets_open'] -= 1
+
+
+class SessionHandler(tornado.web.RequestHandler):
+    def delete(self, session_id):
+        if not self.settings['server'].sessions.drop(session_id):
+            self.set_status(404)
+        self.finish()
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.finish(self.settings['server'].metrics())
+
+
+def serve(host, port, max_concurrent, max_queue):
+    client = llm_client.shared_client(max_connections=max_concurrent)
+    server = AssistantServer(client, max_concurrent=max_concurrent, max_queue=max_queue,
+                             max_sessions=config.SERVER_MAX_SESSIONS, idle_seconds=config.SERVER_SESSION_IDLE)
+    server.application().listen(port, host)
+    tornado.ioloop.PeriodicCallback(server.sessions.expire, 60 * 1000).start()
+    print(f"🌐 Mia Bhai server on http://{host}:{port} ({max_concurrent} concurrent model calls)")
+    try:
+        tornado.ioloop.IOLoop.current().start()
+    finally:
+        server.gate.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve Mia Bhai to many clients over HTTP and WebSocket")
+    parser.add_argument('--host', default=config.SERVER_HOST)
+    parser.add_argument('--port', type=int, default=config.SERVER_PORT)
+    parser.add_argument('--concurrency', type=int, default=config.SERVER_LLM_CONCURRENCY,
+                        help="model calls in flight at once")
+    parser.add_argument('--max-queue', type=int, default=config.SERVER_MAX_QUEUE,
+                        help="requests allowed to wait for a model slot before answering 503")
+    tracing.add_profile_argument(parser)
+    args = parser.parse_args()
+    if args.profile:
+        tracing.tracer.enable_profile(args.profile)
+
+    try:
+        serve(args.host, args.port, args.concurrency, args.max_queue)
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
+    finally:
+        if args.profile:
+            print(tracing.tracer.summary())
+            tracing.tracer.close()
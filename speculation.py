@@ -0,0 +1,159 @@
+import re
+import threading
+import time
+
+import config
+import tracing
+
+
+def normalize(text):
+    """Lowercase words without punctuation, for comparing a partial with the final transcript"""
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+class Speculation:
+    """One model request for a partial transcript, running on its own thread"""
+
+    def __init__(self, text, request, should_stop=None):
+        self.text = text
+        self.key = normalize(text)
+        self.started = time.perf_counter()
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+        self._cancelled = threading.Event()
+        self._should_stop = should_stop
+        threading.Thread(target=self._run, args=(request,), name="llm-speculate", daemon=True).start()
+
+    def _run(self, request):
+        try:
+            with tracing.span('llm.speculate'):
+                self.result = request(self.text, self.stopped)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = time.perf_counter()
+            self.done.set()
+
+    def stopped(self):
+        return self._cancelled.is_set() or bool(self._should_stop and self._should_stop())
+
+    def cancel(self):
+        self._cancelled.set()
+
+
+class SpeculativeTurn:
+    """Watches the partial transcripts of one utterance and speculates on a stable one.
+
+    ``feed`` is called for every captured frame with the new partial (None when
+    it didn't change). Once a partial has held for ``stable_seconds`` of audio a
+    request is started for it; if the partial then changes and settles again the
+    old request is cancelled and a new one started, up to ``max_requests``.
+    ``resolve`` hands back the reply when the final transcript matches.
+    """
+
+    def __init__(self, speculator, request, should_stop=None):
+        self.speculator = speculator
+        self.request = request
+        self.should_stop = should_stop
+        self.partial = ""
+        self.stable = 0.0
+        self.current = None
+        self.issued = 0
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def feed(self, partial, seconds):
+        speculator = self.speculator
+        with self.lock:
+            if self.closed:
+                return
+            if partial is not None and partial != self.partial:
+                self.partial = partial
+                self.stable = 0.0
+                return
+            self.stable += seconds
+            key = normalize(self.partial)
+            if self.stable < speculator.stable_seconds or len(key.split()) < speculator.min_words:
+                return
+            if (self.current and self.current.key == key) or self.issued >= speculator.max_requests:
+                return
+            if self.current:
+                self.current.cancel()
+                speculator.count('cancelled')
+            self.current = Speculation(self.partial, self.request, self.should_stop)
+            self.issued += 1
+            speculator.count('dispatched')
+
+    def resolve(self, final):
+        """The speculative reply if it was made for ``final``, else None (the caller asks again)"""
+        resolved = time.perf_counter()
+        with self.lock:
+            self.closed = True
+            speculation, self.current = self.current, None
+        if speculation is None:
+            return None
+        if normalize(final) != speculation.key:
+            speculation.cancel()
+            self.speculator.count('misses')
+            return None
+        speculation.done.wait()
+        if speculation.error or speculation.result is None or speculation.stopped():
+            self.speculator.count('failed')
+            return None
+        # The head start, or the whole request when it was done before the transcript was
+        saved = min(resolved, speculation.finished) - speculation.started
+        self.speculator.count('hits', saved)
+        tracing.record('speculation.saved', saved)
+        return speculation.result
+
+    def cancel(self):
+        """The utterance was dropped; stop any request still running"""
+        with self.lock:
+            self.closed = True
+            speculation, self.current = self.current, None
+        if speculation:
+            speculation.cancel()
+            self.speculator.count('cancelled')
+
+
+class Speculator:
+    """Settings and hit-rate counters shared by every utterance's SpeculativeTurn"""
+
+    def __init__(self, stable_seconds=0.3, min_words=2, max_requests=3):
+        self.stable_seconds = stable_seconds
+        self.min_words = min_words
+        self.max_requests = max_requests
+        self.lock = threading.Lock()
+        self.stats = {'dispatched': 0, 'hits': 0, 'misses': 0, 'cancelled': 0, 'failed': 0, 'saved_s': 0.0}
+
+    def begin(self, request, should_stop=None):
+        """Start watching an utterance; ``request(text, should_stop)`` returns the model's reply"""
+        return SpeculativeTurn(self, request, should_stop)
+
+    def count(self, key, saved=0.0):
+        with self.lock:
+            self.stats[key] += 1
+            self.stats['saved_s'] += saved
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        resolved = stats['hits'] + stats['misses'] + stats['failed']
+        stats['hit_rate'] = stats['hits'] / resolved if resolved else 0.0
+        stats['saved_per_hit_s'] = stats['saved_s'] / stats['hits'] if stats['hits'] else 0.0
+        return stats
+
+    def summary(self):
+        stats = self.snapshot()
+        return (f"🔮 Speculation: {stats['dispatched']} sent, {stats['hits']} used, {stats['misses']} missed, "
+                f"{stats['cancelled']} cancelled, hit rate {stats['hit_rate']:.0%}, "
+                f"{stats['saved_per_hit_s']:.2f}s saved per hit")
+
+
+def from_config():
+    """Speculator tuned from the environment, None when speculation is off"""
+    if not config.SPECULATE:
+        return None
+    return Speculator(config.SPECULATE_STABLE_SECONDS, config.SPECULATE_MIN_WORDS, config.SPECULATE_MAX_REQUESTS)
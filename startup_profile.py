@@ -0,0 +1,48 @@
+import json
+import threading
+from pathlib import Path
+
+import config
+import json_file
+
+
+class StartupProfile:
+    """Settings measured at startup (noise threshold, chosen voice) kept for the next start"""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.values = {}
+        self.lock = threading.Lock()
+        if self.path and self.path.exists():
+            self.load()
+
+    def get(self, key, default=None):
+        with self.lock:
+            return self.values.get(key, default)
+
+    def update(self, **values):
+        with self.lock:
+            self.values.update(values)
+            snapshot = dict(self.values)
+        if self.path:
+            self._write(snapshot)
+
+    def _write(self, snapshot):
+        """Atomically replace the profile file"""
+        try:
+            json_file.write(self.path, snapshot)
+        except OSError as e:
+            print(f"Could not save startup profile: {e}")
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            print(f"Could not load startup profile: {e}")
+            return
+        if isinstance(data, dict):
+            self.values = data
+
+
+def from_config():
+    return StartupProfile(config.DATA_DIR / "startup_profile.json")
@@ -0,0 +1,144 @@
+import json
+import math
+import threading
+import time
+
+_BUCKET_BASE = 1.05
+_LOG_BASE = math.log(_BUCKET_BASE)
+_BUCKETS = 500  # 1 µs up to about 11 hours at ±2.5% resolution
+
+
+class Histogram:
+    """Fixed-size log-bucketed latency histogram; recording is a couple of float ops"""
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        micros = seconds * 1e6
+        index = int(math.log(micros) / _LOG_BASE) if micros > 1 else 0
+        self.counts[min(index, _BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """Approximate percentile in seconds"""
+        if not self.count:
+            return 0.0
+        target = p / 100 * self.count
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= target:
+                # Geometric middle of the bucket, never above the true max
+                return min(_BUCKET_BASE ** (index + 0.5) / 1e6, self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class Span:
+    """Context manager returned by Tracer.span (a plain class is cheaper than @contextmanager)"""
+
+    __slots__ = ('tracer', 'name', 'trace', 'attrs', 'start')
+
+    def __init__(self, tracer, name, trace, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.trace = trace
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.record(self.name, time.perf_counter() - self.start, self.trace, **self.attrs)
+        return False
+
+
+class Tracer:
+    """Per-stage latency histograms, plus a JSONL trace file in profile mode"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.trace_file = None
+        self.origin = time.perf_counter()
+
+    def enable_profile(self, path):
+        """Write every span to ``path`` as one JSON object per line"""
+        self.trace_file = open(path, 'a', encoding='utf-8', buffering=1 << 16)
+
+    @property
+    def profiling(self):
+        return self.trace_file is not None
+
+    def record(self, name, seconds, trace=True, **attrs):
+        """Record a duration measured elsewhere"""
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(seconds)
+            if trace and self.trace_file:
+                event = {'name': name, 'end': round(time.perf_counter() - self.origin, 6),
+                         'ms': round(seconds * 1000, 3), 'thread': threading.current_thread().name}
+                if attrs:
+                    event.update(attrs)
+                self.trace_file.write(json.dumps(event) + "\n")
+
+    def span(self, name, trace=True, **attrs):
+        """Time the enclosed ``with`` block as one occurrence of stage ``name``"""
+        return Span(self, name, trace, attrs)
+
+    def summary(self):
+        """p50/p95/p99 table of every stage seen so far"""
+        with self.lock:
+            rows = sorted(self.histograms.items())
+        if not rows:
+            return "No spans recorded"
+        width = max(len(name) for name, _ in rows)
+        lines = [f"{'stage':<{width}} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for name, histogram in rows:
+            lines.append(f"{name:<{width}} {histogram.count:>7} "
+                         f"{histogram.percentile(50) * 1000:>9.1f} {histogram.percentile(95) * 1000:>9.1f} "
+                         f"{histogram.percentile(99) * 1000:>9.1f} {histogram.max * 1000:>9.1f}")
+        return "\n".join(lines)
+
+    def snapshot(self):
+        """Percentiles per stage as plain data (used by the benchmarks)"""
+        with self.lock:
+            rows = list(self.histograms.items())
+        return {name: {'count': h.count, 'mean_ms': h.mean() * 1000,
+                       'p50_ms': h.percentile(50) * 1000, 'p95_ms': h.percentile(95) * 1000,
+                       'p99_ms': h.percentile(99) * 1000, 'max_ms': h.max * 1000}
+                for name, h in rows}
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+
+    def close(self):
+        if self.trace_file:
+            self.trace_file.close()
+            self.trace_file = None
+
+
+tracer = Tracer()
+span = tracer.span
+record = tracer.record
+
+
+def add_profile_argument(parser):
+    parser.add_argument('--profile', nargs='?', const='mia_trace.jsonl', metavar='TRACE',
+                        help="write a JSONL trace (default mia_trace.jsonl) and print per-stage "
+                             "p50/p95/p99 on exit")
@@ -0,0 +1,126 @@
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class TranscriptStore:
+    """Append-only SQLite transcript of every chat message.
+
+    Appends are queued and written in batches by one writer thread; reads use a
+    separate connection, which WAL mode lets run alongside the writer. Search
+    uses an FTS5 index when SQLite has it and falls back to LIKE otherwise.
+    """
+
+    def __init__(self, path, batch_size=50, flush_interval=2.0):
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.session = uuid.uuid4().hex[:12]
+        self.pending = queue.Queue()
+        self.read_lock = threading.Lock()
+
+        self.reader = sqlite3.connect(self.path, check_same_thread=False)
+        self.reader.execute("PRAGMA journal_mode=WAL")
+        self.has_fts = self._create_schema(self.reader)
+        self.next_id = (self.reader.execute("SELECT MAX(id) FROM messages").fetchone()[0] or 0) + 1
+        self.id_lock = threading.Lock()
+
+        self.writer = threading.Thread(target=self._write_loop, name="transcript-writer", daemon=True)
+        self.writer.start()
+
+    @staticmethod
+    def _create_schema(db):
+        db.execute("""CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY, ts REAL NOT NULL, session TEXT NOT NULL,
+            sender TEXT NOT NULL, text TEXT NOT NULL)""")
+        try:
+            db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+                       "text, content='messages', content_rowid='id')")
+            db.execute("""CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text); END""")
+            has_fts = True
+        except sqlite3.OperationalError:
+            has_fts = False
+        db.commit()
+        return has_fts
+
+    def append(self, sender, text, ts=None):
+        """Queue a message for writing; returns its id right away"""
+        with self.id_lock:
+            message_id = self.next_id
+            self.next_id += 1
+        self.pending.put((message_id, ts or time.time(), self.session, sender, text))
+        return message_id
+
+    def _write_loop(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA synchronous=NORMAL")
+        running = True
+        while running:
+            batch = []
+            try:
+                item = self.pending.get(timeout=self.flush_interval)
+                batch.append(item)
+                # Gather whatever else is already waiting, up to a batch
+                while len(batch) < self.batch_size:
+                    batch.append(self.pending.get_nowait())
+            except queue.Empty:
+                pass
+            flush_events = [item for item in batch if isinstance(item, threading.Event)]
+            rows = [item for item in batch if isinstance(item, tuple)]
+            if any(item is None for item in batch):
+                running = False
+            if rows:
+                try:
+                    with db:
+                        db.executemany("INSERT INTO messages (id, ts, session, sender, text) "
+                                       "VALUES (?, ?, ?, ?, ?)", rows)
+                except sqlite3.Error as e:
+                    print(f"Transcript write failed: {e}")
+            for event in flush_events:
+                event.set()
+        db.close()
+
+    def flush(self, timeout=5):
+        """Block until everything appended so far is on disk"""
+        done = threading.Event()
+        self.pending.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self.pending.put(None)
+        self.writer.join(timeout=5)
+        self.reader.close()
+
+    def _query(self, sql, params):
+        with self.read_lock:
+            return self.reader.execute(sql, params).fetchall()
+
+    def recent(self, limit):
+        """Newest ``limit`` messages, oldest first"""
+        rows = self._query("SELECT id, ts, sender, text FROM messages ORDER BY id DESC LIMIT ?", (limit,))
+        return rows[::-1]
+
+    def before(self, message_id, limit):
+        """Up to ``limit`` messages older than ``message_id``, oldest first"""
+        rows = self._query("SELECT id, ts, sender, text FROM messages WHERE id < ? "
+                           "ORDER BY id DESC LIMIT ?", (message_id, limit))
+        return rows[::-1]
+
+    def search(self, text, limit=50):
+        """Full-text search across all sessions, newest first"""
+        if self.has_fts:
+            terms = " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+            if not terms:
+                return []
+            try:
+                return self._query(
+                    "SELECT m.id, m.ts, m.sender, m.text FROM messages_fts f "
+                    "JOIN messages m ON m.id = f.rowid WHERE messages_fts MATCH ? "
+                    "ORDER BY m.id DESC LIMIT ?", (terms, limit))
+            except sqlite3.OperationalError:
+                pass
+        return self._query("SELECT id, ts, sender, text FROM messages WHERE text LIKE ? "
+                           "ORDER BY id DESC LIMIT ?", (f"%{text}%", limit))
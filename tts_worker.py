@@ -0,0 +1,206 @@
+import hashlib
+import itertools
+import platform
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from pathlib import Path
+
+import tracing
+
+try:
+    import winsound
+except ImportError:
+    winsound = None
+
+URGENT = 0
+NORMAL = 1
+LOW = 2
+
+# Short replies worth rendering once and replaying instantly
+FIXED_PHRASES = [
+    "Yes, I'm listening!",
+    "Done!",
+    "I didn't catch that. Please try again.",
+    "Sorry, there was an error processing your request.",
+]
+
+
+class WavPlayer:
+    """Plays a WAV file in a way that can be stopped from the TTS thread"""
+
+    def __init__(self):
+        self.process = None
+        if winsound:
+            self.command = None
+        elif platform.system() == 'Darwin':
+            self.command = shutil.which('afplay')
+        else:
+            self.command = shutil.which('aplay') or shutil.which('paplay')
+
+    @property
+    def available(self):
+        return bool(winsound or self.command)
+
+    def play(self, path, should_stop):
+        """Play until finished or ``should_stop()``; returns False if interrupted"""
+        if winsound:
+            duration = _wav_duration(path)
+            winsound.PlaySound(str(path), winsound.SND_FILENAME | winsound.SND_ASYNC)
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                if should_stop():
+                    winsound.PlaySound(None, 0)
+                    return False
+                time.sleep(0.02)
+            return True
+
+        # Only ALSA's aplay takes -q; paplay (PulseAudio) rejects it
+        args = [self.command, '-q', str(path)] if Path(self.command).name == 'aplay' else [self.command, str(path)]
+        self.process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while self.process.poll() is None:
+                if should_stop():
+                    self.process.terminate()
+                    return False
+                time.sleep(0.02)
+            return True
+        finally:
+            self.process = None
+
+
+def _wav_duration(path):
+    with wave.open(str(path), 'rb') as wav:
+        return wav.getnframes() / float(wav.getframerate())
+
+
+class TtsWorker:
+    """Single thread that owns the pyttsx3 engine and serves a priority queue.
+
+    Fixed phrases are rendered to WAV files once and replayed from disk.
+    ``interrupt()`` implements barge-in: it drops queued speech and stops the
+    utterance in progress at the next word boundary.
+    """
+
+    def __init__(self, engine_factory, cache_dir=None, phrases=FIXED_PHRASES):
+        self.engine_factory = engine_factory
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.phrases = list(phrases)
+        self.rendered = {}  # phrase -> wav path
+        self.player = WavPlayer()
+        self.queue = queue.PriorityQueue()
+        self.sequence = itertools.count()
+        self.interrupted = threading.Event()
+        self.ready = threading.Event()
+        self.error = None
+        self.engine = None
+        self.thread = None
+        self.speaking = False
+        self.speaking_since = 0.0
+        self.spoke_until = 0.0
+        self.stats = {'spoken': 0, 'cached_plays': 0, 'interrupted': 0, 'skipped': 0}
+
+    def start(self, timeout=10):
+        self.thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+        self.thread.start()
+        self.ready.wait(timeout)
+        if self.error:
+            raise self.error
+
+    def say(self, text, priority=NORMAL, turn=None):
+        """Queue text; lower priority numbers are spoken first"""
+        self.queue.put((priority, next(self.sequence), turn, text))
+
+    def playback_started(self, tail=0.5):
+        """When the speech now playing started (monotonic), or None once it has been quiet ``tail`` seconds"""
+        if self.speaking or time.monotonic() - self.spoke_until < tail:
+            return self.speaking_since
+        return None
+
+    def interrupt(self):
+        """Barge-in: stop the current utterance and drop everything queued"""
+        self.interrupted.set()
+        while True:
+            try:
+                self.queue.get_nowait()
+                self.stats['skipped'] += 1
+            except queue.Empty:
+                break
+
+    def stop(self):
+        self.interrupt()
+        self.queue.put((LOW + 1, next(self.sequence), None, None))
+
+    def _run(self):
+        try:
+            self.engine = self.engine_factory()
+            # Word callbacks run inside runAndWait, the one safe place to call engine.stop()
+            self.engine.connect('started-word', self._on_word)
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+        self._prerender()
+
+        while True:
+            priority, _, turn, text = self.queue.get()
+            if text is None:
+                break
+            self.interrupted.clear()
+            if turn is not None and turn.cancelled:
+                self.stats['skipped'] += 1
+                continue
+            self.speaking_since = time.monotonic()
+            self.speaking = True
+            try:
+                self._speak(text)
+            except Exception as e:
+                print(f"TTS error: {e}")
+            finally:
+                self.speaking = False
+                self.spoke_until = time.monotonic()
+
+    def _speak(self, text):
+        path = self.rendered.get(text)
+        if path and self.player.available:
+            self.stats['cached_plays'] += 1
+            with tracing.span('tts.speak', cached=True):
+                finished = self.player.play(path, self.interrupted.is_set)
+            if not finished:
+                self.stats['interrupted'] += 1
+            return
+        with tracing.span('tts.speak', cached=False):
+            self.engine.say(text)
+            self.engine.runAndWait()
+        self.stats['spoken'] += 1
+
+    def _on_word(self, name, location, length):
+        if self.interrupted.is_set():
+            self.stats['interrupted'] += 1
+            self.engine.stop()
+
+    def _cache_path(self, text):
+        voice = self.engine.getProperty('voice')
+        rate = self.engine.getProperty('rate')
+        digest = hashlib.sha1(f"{voice}|{rate}|{text}".encode('utf-8')).hexdigest()[:16]
+        return self.cache_dir / f"{digest}.wav"
+
+    def _prerender(self):
+        """Render fixed phrases to WAV with save_to_file, reusing earlier renders"""
+        if not self.cache_dir or not self.player.available:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for text in self.phrases:
+                path = self._cache_path(text)
+                if not path.exists() or path.stat().st_size == 0:
+                    self.engine.save_to_file(text, str(path))
+                    self.engine.runAndWait()
+                if path.exists() and path.stat().st_size > 0:
+                    self.rendered[text] = path
+        except Exception as e:
+            print(f"Could not pre-render TTS phrases: {e}")
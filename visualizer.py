@@ -0,0 +1,152 @@
+import time
+from collections import deque
+
+import numpy as np
+
+
+class FrameStats:
+    """Rolling timings of UI frames in milliseconds"""
+
+    def __init__(self, window=600):
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def add(self, ms):
+        self.recent.append(ms)
+        self.count += 1
+        self.total += ms
+        self.worst = max(self.worst, ms)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def recent_mean(self):
+        return sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+    def p95(self):
+        return float(np.percentile(self.recent, 95)) if self.recent else 0.0
+
+    def report(self):
+        return (f"{self.count} frames, mean {self.mean():.2f} ms, "
+                f"p95 {self.p95():.2f} ms, max {self.worst:.2f} ms")
+
+
+class VoiceVisualizer:
+    """Spectrum bars driven by the live capture buffer.
+
+    Bars are created once and only moved with ``coords()``. Each frame does one
+    vectorized FFT of the newest audio; if frames start costing more than
+    ``budget_ms`` the refresh interval backs off so the UI cost stays capped.
+    """
+
+    def __init__(self, canvas, color, bars=8, interval_ms=50, budget_ms=4.0, fft_size=1024,
+                 x0=40, spacing=40, width=20, baseline=60, min_height=4, max_height=50):
+        self.canvas = canvas
+        self.bars = bars
+        self.base_interval = interval_ms
+        self.interval_ms = interval_ms
+        self.budget_ms = budget_ms
+        self.fft_size = fft_size
+        self.baseline = baseline
+        self.min_height = min_height
+        self.max_height = max_height
+        self.window = np.hanning(fft_size).astype(np.float32)
+        self.scale = 2.0 / self.window.sum() / 32768.0
+        self.levels = np.zeros(bars, dtype=np.float32)
+        self.left = x0 + spacing * np.arange(bars)
+        self.right = self.left + width
+        self.band_edges = None
+        self.ring = None
+        self.active = None
+        self.running = False
+        self.stats = FrameStats()
+        self.items = [canvas.create_rectangle(x, baseline, x + width, baseline, fill=color, outline="")
+                      for x in self.left]
+
+    def _bands(self, sample_rate):
+        """FFT bin index where each log-spaced band starts (100 Hz – 4 kHz)"""
+        edges_hz = np.geomspace(100, min(4000, sample_rate / 2), self.bars + 1)
+        starts = np.maximum(np.round(edges_hz[:-1] * self.fft_size / sample_rate).astype(int), 1)
+        # reduceat needs increasing starts; give narrow low bands at least one bin each
+        for i in range(1, len(starts)):
+            starts[i] = max(starts[i], starts[i - 1] + 1)
+        return starts
+
+    def start(self, ring, active):
+        """Animate while ``active()`` is true"""
+        self.ring = ring
+        self.active = active
+        if self.band_edges is None:
+            self.band_edges = self._bands(ring.sample_rate)
+        if not self.running:
+            self.running = True
+            self._tick()
+
+    def compute_levels(self, samples):
+        """Per-band levels in [0, 1] from the newest samples"""
+        if len(samples) < self.fft_size:
+            return np.zeros(self.bars, dtype=np.float32)
+        spectrum = np.abs(np.fft.rfft(samples[-self.fft_size:] * self.window)) * self.scale
+        bands = np.maximum.reduceat(spectrum, self.band_edges)[:self.bars]
+        decibels = 20 * np.log10(bands + 1e-6)
+        return np.clip((decibels + 70) / 55, 0.0, 1.0)
+
+    def _tick(self):
+        if not self.active or not self.active() or self.ring is None:
+            self.running = False
+            self.levels[:] = 0
+            self._draw()
+            return
+
+        started = time.perf_counter()
+        fresh = self.compute_levels(self.ring.latest(self.fft_size))
+        # Fast attack, slow release so the bars don't flicker
+        self.levels = np.maximum(fresh, self.levels * 0.8)
+        self._draw()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats.add(elapsed_ms)
+
+        # Refresh less often while frames cost more than the budget
+        if self.stats.recent_mean() > self.budget_ms:
+            self.interval_ms = min(self.interval_ms * 2, 400)
+        elif self.interval_ms > self.base_interval and self.stats.recent_mean() < self.budget_ms / 2:
+            self.interval_ms = max(self.base_interval, self.interval_ms // 2)
+        self.canvas.after(self.interval_ms, self._tick)
+
+    def _draw(self):
+        heights = self.min_height + self.levels * (self.max_height - self.min_height)
+        tops = self.baseline - heights
+        for item, left, right, top in zip(self.items, self.left, self.right, tops):
+            self.canvas.coords(item, left, top, right, self.baseline)
+
+
+class WindowFader:
+    """Fades a Tk window's alpha through ``after()`` instead of sleeping in the event loop"""
+
+    def __init__(self, root, step=0.05, interval_ms=10):
+        self.root = root
+        self.step = step
+        self.interval_ms = interval_ms
+        self.job = None
+
+    def fade(self, start, end, on_done=None):
+        """Animate alpha from start to end; a new fade replaces one in progress"""
+        if self.job:
+            self.root.after_cancel(self.job)
+            self.job = None
+        direction = 1 if end >= start else -1
+
+        def step(alpha):
+            self.root.attributes('-alpha', alpha)
+            if (end - alpha) * direction <= 1e-6:
+                self.job = None
+                if on_done:
+                    on_done()
+                return
+            following = alpha + direction * self.step
+            following = min(following, end) if direction > 0 else max(following, end)
+            self.job = self.root.after(self.interval_ms, step, following)
+
+        step(start)
@@ -0,0 +1,333 @@
+import wave
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+import config
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512  # samples per frame, matches Porcupine's frame size
+
+
+def pcm_to_samples(pcm):
+    """Interpret raw 16-bit little-endian PCM bytes as an int16 array (no copy)"""
+    return np.frombuffer(pcm, dtype=np.int16)
+
+
+def read_wav(path, sample_rate=SAMPLE_RATE):
+    """Load a WAV file as 16-bit mono samples at the given rate"""
+    with wave.open(str(path), 'rb') as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        data = wav.readframes(wav.getnframes())
+
+    if width != 2:
+        raise ValueError(f"{path}: only 16-bit WAV files are supported")
+
+    samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate and len(samples):
+        duration = len(samples) / rate
+        target = np.arange(int(duration * sample_rate)) / sample_rate
+        samples = np.interp(target, np.arange(len(samples)) / rate, samples)
+    return samples.astype(np.int16)
+
+
+class EnergyGate:
+    """Cheap energy-based voice activity check with an adaptive noise floor.
+
+    Quiet frames move the floor quickly; loud ones move it ``speech_alpha`` slowly,
+    so a room that is louder than ``min_rms`` all the time still closes the gate
+    after a while instead of looking like endless speech. ``seed`` starts the floor
+    from a calibration measurement.
+    """
+
+    def __init__(self, ratio=3.0, min_rms=150.0, floor_alpha=0.05, hangover_frames=8, speech_alpha=0.001):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.floor_alpha = floor_alpha
+        self.speech_alpha = speech_alpha
+        self.hangover_frames = hangover_frames
+        self.noise_floor = min_rms / ratio
+        self.hangover = 0
+
+    def __call__(self, samples):
+        """Return True while the frame looks like speech (plus a short hangover)"""
+        rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float32)))) if len(samples) else 0.0
+        speech = rms > max(self.min_rms, self.noise_floor * self.ratio)
+
+        if speech:
+            # Too slow to follow a spoken phrase, fast enough to learn a constantly loud room
+            self.noise_floor += self.speech_alpha * (rms - self.noise_floor)
+            self.hangover = self.hangover_frames
+            return True
+
+        # Only quiet frames update the noise floor so speech can't raise it
+        self.noise_floor += self.floor_alpha * (rms - self.noise_floor)
+        if self.hangover > 0:
+            self.hangover -= 1
+            return True
+        return False
+
+    def seed(self, ambient_rms):
+        """Start the noise floor from the measured background level"""
+        self.noise_floor = max(self.min_rms / self.ratio, ambient_rms)
+
+    def reset(self):
+        self.hangover = 0
+
+
+@lru_cache(maxsize=4)
+def _mel_filterbank(n_mels, n_fft, sample_rate):
+    """Triangular mel filters as an (n_mels, n_fft // 2 + 1) matrix"""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+
+    filters = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            filters[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            filters[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return filters
+
+
+@lru_cache(maxsize=4)
+def _dct_matrix(n_mels, n_mfcc):
+    """Type-II DCT basis used to turn log mel energies into cepstra"""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    return (np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels)) * np.sqrt(2.0 / n_mels)).astype(np.float32)
+
+
+def mfcc(samples, sample_rate=SAMPLE_RATE, n_mfcc=13, n_mels=26, n_fft=512,
+         win_length=400, hop_length=160):
+    """Vectorized MFCC features with cepstral mean normalization"""
+    signal = np.asarray(samples, dtype=np.float32) / 32768.0
+    if len(signal) < win_length:
+        signal = np.pad(signal, (0, win_length - len(signal)))
+    signal = np.append(signal[0], signal[1:] - 0.97 * signal[:-1])
+
+    n_frames = 1 + (len(signal) - win_length) // hop_length
+    index = np.arange(win_length)[None, :] + hop_length * np.arange(n_frames)[:, None]
+    frames = signal[index] * np.hamming(win_length).astype(np.float32)
+
+    power = np.abs(np.fft.rfft(frames, n_fft)) ** 2 / n_fft
+    mel = np.log(power @ _mel_filterbank(n_mels, n_fft, sample_rate).T + 1e-10)
+    cepstra = mel @ _dct_matrix(n_mels, n_mfcc).T
+    return cepstra - cepstra.mean(axis=0)
+
+
+def dtw_distance(a, b):
+    """Length-normalized dynamic time warping distance between two feature sequences"""
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+    n, m = cost.shape
+    acc = np.full((n + 1, m + 1), np.inf, dtype=np.float64)
+    acc[0, 0] = 0.0
+    for i in range(1, n + 1):
+        row = cost[i - 1]
+        prev = acc[i - 1]
+        # Diagonal and vertical moves vectorized, horizontal move scanned
+        best = np.minimum(prev[:-1], prev[1:]) + row
+        current = acc[i]
+        for j in range(1, m + 1):
+            current[j] = min(best[j - 1], current[j - 1] + row[j - 1])
+    return acc[n, m] / (n + m)
+
+
+def derive_threshold(templates, spread=1.5, noise_margin=0.8, seed=0):
+    """DTW distance threshold for a set of template feature sequences.
+
+    Distances scale with the speaker, microphone and clip length, so no fixed
+    number fits everyone. Templates of the same word are ``spread`` times their
+    furthest pairwise distance apart at most; white noise of the same lengths
+    sets the ceiling (``noise_margin`` of its closest distance), so noise can't
+    pass. A single template has no spread and gets half the noise distance.
+    """
+    rng = np.random.default_rng(seed)
+    noise = [mfcc(rng.normal(0, 3000, max(400, 160 * (len(t) - 1) + 400)).astype(np.int16)) for t in templates]
+    ceiling = noise_margin * min(dtw_distance(n, t) for n in noise for t in templates)
+    pairs = [dtw_distance(a, b) for i, a in enumerate(templates) for b in templates[i + 1:]]
+    if not pairs:
+        return 0.5 * ceiling
+    return min(spread * max(pairs), ceiling)
+
+
+class WakeWordDetector:
+    """Base class for local wake word engines fed with 16 kHz mono PCM frames"""
+
+    sample_rate = SAMPLE_RATE
+    frame_length = FRAME_LENGTH
+
+    def __init__(self, gate=None):
+        self.gate = gate or EnergyGate()
+        self.frames_seen = 0
+        self.frames_scored = 0
+
+    @property
+    def detection_lag(self):
+        """Seconds of audio after the wake word already read by the time it is reported"""
+        return 0.0
+
+    def process(self, pcm):
+        """Feed one frame of raw PCM; return True when the wake word is heard"""
+        samples = pcm_to_samples(pcm) if isinstance(pcm, (bytes, bytearray, memoryview)) else pcm
+        self.frames_seen += 1
+        return self.process_samples(samples, self.gate(samples))
+
+    def process_samples(self, samples, is_speech):
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget any partial state, e.g. after a detection"""
+        self.gate.reset()
+
+    def close(self):
+        pass
+
+
+class TemplateWakeWordDetector(WakeWordDetector):
+    """Matches gated speech segments against recorded wake word templates with MFCC + DTW"""
+
+    def __init__(self, templates, threshold=None, gate=None, max_segment_seconds=1.6):
+        super().__init__(gate)
+        if not templates:
+            raise ValueError("No wake word templates available")
+        self.max_segment_frames = int(max_segment_seconds * self.sample_rate / self.frame_length)
+        # Cut templates the way the gate cuts live audio, or every live segment looks far away
+        self.templates = [mfcc(self.gated(t)) for t in templates]
+        if threshold is None:
+            threshold = config.WAKE_TEMPLATE_THRESHOLD or derive_threshold(self.templates)
+        self.threshold = threshold
+        self.segment = []
+        self.last_distance = None
+
+    def gated(self, samples):
+        """The part of a recording a fresh copy of the energy gate would pass as one segment"""
+        gate = EnergyGate(self.gate.ratio, self.gate.min_rms, self.gate.floor_alpha, self.gate.hangover_frames)
+        n = len(samples) // self.frame_length
+        frames = np.asarray(samples[:n * self.frame_length]).reshape(n, self.frame_length)
+        if n:
+            gate.seed(float(np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1)).min()))
+        kept = [frame for frame in frames if gate(frame)]
+        return np.concatenate(kept[:self.max_segment_frames]) if kept else samples
+
+    @property
+    def detection_lag(self):
+        # A segment is only scored once the gate's hangover has run out
+        return self.gate.hangover_frames * self.frame_length / self.sample_rate
+
+    @classmethod
+    def from_directory(cls, directory=None, **kwargs):
+        """Load every WAV in the template directory"""
+        directory = Path(directory or config.WAKE_TEMPLATE_DIR)
+        templates = [read_wav(path) for path in sorted(directory.glob("*.wav"))]
+        return cls(templates, **kwargs)
+
+    def process_samples(self, samples, is_speech):
+        if is_speech:
+            self.segment.append(samples)
+            if len(self.segment) < self.max_segment_frames:
+                return False
+        elif not self.segment:
+            return False
+
+        # Segment ended (or got too long to be the wake word): score it once
+        segment = np.concatenate(self.segment)
+        self.segment = []
+        return self.score(segment)
+
+    def score(self, segment):
+        """Return True if the segment is close enough to any template"""
+        self.frames_scored += 1
+        features = mfcc(segment)
+        self.last_distance = min(dtw_distance(features, template) for template in self.templates)
+        return self.last_distance < self.threshold
+
+    def reset(self):
+        super().reset()
+        self.segment = []
+
+
+class PorcupineWakeWordDetector(WakeWordDetector):
+    """Runs Picovoice Porcupine on continuous audio, skipping only long quiet stretches.
+
+    Frames keep going to Porcupine for ``tail_seconds`` after the gate closes.
+    Quiet frames after that are held back, and the last ``preroll_seconds`` of
+    them are fed first when the gate opens again, so Porcupine hears the
+    keyword onset in context.
+    """
+
+    def __init__(self, access_key=None, keyword_path=None, sensitivity=None, gate=None,
+                 tail_seconds=1.0, preroll_seconds=0.5):
+        import pvporcupine
+
+        access_key = access_key or config.PORCUPINE_ACCESS_KEY
+        keyword_path = keyword_path or config.PORCUPINE_KEYWORD_PATH
+        if not access_key or not keyword_path:
+            raise ValueError("PICOVOICE_ACCESS_KEY and MIA_PORCUPINE_KEYWORD must be set")
+
+        self.porcupine = pvporcupine.create(
+            access_key=access_key,
+            keyword_paths=[keyword_path],
+            sensitivities=[config.PORCUPINE_SENSITIVITY if sensitivity is None else sensitivity],
+        )
+        self.sample_rate = self.porcupine.sample_rate
+        self.frame_length = self.porcupine.frame_length
+        super().__init__(gate)
+        seconds_per_frame = self.frame_length / self.sample_rate
+        self.tail_frames = int(tail_seconds / seconds_per_frame)
+        self.held = deque(maxlen=max(1, int(preroll_seconds / seconds_per_frame)))
+        self.quiet_frames = 0
+
+    def process_samples(self, samples, is_speech):
+        if len(samples) != self.frame_length:
+            return False
+        if is_speech:
+            self.quiet_frames = 0
+        else:
+            self.quiet_frames += 1
+            if self.quiet_frames > self.tail_frames:
+                # Long quiet stretch: hold the frame back (a copy, the ring buffer moves on)
+                self.held.append(np.array(samples))
+                return False
+        detected = False
+        while self.held:
+            detected = self._feed(self.held.popleft()) or detected
+        return self._feed(samples) or detected
+
+    def _feed(self, samples):
+        self.frames_scored += 1
+        return self.porcupine.process(samples) >= 0
+
+    def reset(self):
+        super().reset()
+        self.held.clear()
+        self.quiet_frames = 0
+
+    def close(self):
+        self.porcupine.delete()
+
+
+def create_detector(engine=None):
+    """Build the configured local wake word detector, or None to fall back to Google"""
+    engine = (engine or config.WAKE_ENGINE).lower()
+    try:
+        if engine == 'porcupine':
+            return PorcupineWakeWordDetector()
+        if engine == 'template':
+            return TemplateWakeWordDetector.from_directory()
+    except Exception as e:
+        print(f"⚠️ Local wake word engine '{engine}' unavailable ({e}), using Google recognition")
+    return None